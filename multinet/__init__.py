@@ -12,7 +12,7 @@ from typing import Optional, MutableMapping, Any, Tuple, Union
 from multinet import auth
 from multinet.auth import google
 from multinet import api
-from multinet.db import register_legacy_workspaces
+from multinet.db import register_legacy_workspaces, ensure_user_indexes
 from multinet import uploaders, downloaders
 from multinet.errors import ServerError
 from multinet.util import load_secret_key, regex_allowed_origins, get_allowed_origins
@@ -49,17 +49,20 @@ def create_app(config: Optional[MutableMapping] = None) -> Flask:
     app.register_blueprint(uploaders.newick.bp, url_prefix="/api/newick")
     app.register_blueprint(uploaders.nested_json.bp, url_prefix="/api/nested_json")
     app.register_blueprint(uploaders.d3_json.bp, url_prefix="/api/d3_json")
+    app.register_blueprint(uploaders.arrow.bp, url_prefix="/api/arrow")
 
     app.register_blueprint(uploaders.multipart_upload.bp, url_prefix="/api/uploads")
 
     app.register_blueprint(downloaders.csv.bp, url_prefix="/api")
     app.register_blueprint(downloaders.d3_json.bp, url_prefix="/api")
+    app.register_blueprint(downloaders.arrow.bp, url_prefix="/api")
 
     app.register_blueprint(auth.bp, url_prefix="/api/user")
     app.register_blueprint(google.bp, url_prefix="/api/user/oauth/google")
 
     google.init_oauth(app)
     register_legacy_workspaces()
+    ensure_user_indexes()
 
     # Register error handler.
     @app.errorhandler(ServerError)
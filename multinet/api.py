@@ -16,6 +16,7 @@ from multinet.auth.util import (
 )
 
 from multinet import util
+from multinet.compression import compress_response
 from multinet.errors import (
     BadQueryArgument,
     MalformedRequestBody,
@@ -23,9 +24,11 @@ from multinet.errors import (
     RequiredParamsMissing,
 )
 
+from multinet.db import aql_query_options
 from multinet.db.models.workspace import Workspace
 
 bp = Blueprint("multinet", __name__)
+bp.after_request(compress_response)
 
 
 @bp.route("/workspaces", methods=["GET"])
@@ -47,7 +50,7 @@ def get_workspaces() -> Any:
 @swag_from("swagger/get_workspace_permissions.yaml")
 def get_workspace_permissions(workspace: str) -> Any:
     """Retrieve the permissions of a workspace."""
-    perms = Workspace(workspace).permissions
+    perms = util.get_workspace(workspace).permissions
     return util.expand_user_permissions(perms)
 
 
@@ -66,7 +69,7 @@ def set_workspace_permissions(workspace: str) -> Any:
         raise MalformedRequestBody(request.json)
 
     perms = util.contract_user_permissions(request.json)
-    return Workspace(workspace).set_permissions(perms).__dict__
+    return util.get_workspace(workspace).set_permissions(perms).__dict__
 
 
 @bp.route("/workspaces/<workspace>/tables", methods=["GET"])
@@ -75,7 +78,7 @@ def set_workspace_permissions(workspace: str) -> Any:
 @swag_from("swagger/workspace_tables.yaml")
 def get_workspace_tables(workspace: str, type: TableType = "all") -> Any:  # noqa: A002
     """Retrieve the tables of a single workspace."""
-    tables = Workspace(workspace).tables(type)
+    tables = util.get_workspace(workspace).tables(type)
     return util.stream(tables)
 
 
@@ -86,18 +89,24 @@ def get_workspace_tables(workspace: str, type: TableType = "all") -> Any:  # noq
 def create_aql_table(workspace: str, table: str) -> Any:
     """Create a table from an AQL query."""
     aql = request.data.decode()
-    Workspace(workspace).create_aql_table(table, aql)
+    util.get_workspace(workspace).create_aql_table(table, aql)
 
     return table
 
 
 @bp.route("/workspaces/<workspace>/tables/<table>", methods=["GET"])
 @require_reader
-@use_kwargs({"offset": fields.Int(), "limit": fields.Int()})
+@use_kwargs({"offset": fields.Int(), "limit": fields.Int(), "cursor": fields.Str()})
 @swag_from("swagger/table_rows.yaml")
-def get_table_rows(workspace: str, table: str, offset: int = 0, limit: int = 30) -> Any:
+def get_table_rows(
+    workspace: str,
+    table: str,
+    offset: int = 0,
+    limit: int = 30,
+    cursor: Optional[str] = None,
+) -> Any:
     """Retrieve the rows and headers of a table."""
-    return Workspace(workspace).table(table).rows(offset, limit)
+    return util.get_workspace(workspace).table(table).rows(offset, limit, cursor)
 
 
 @bp.route("/workspaces/<workspace>/tables/<table>/metadata", methods=["GET"])
@@ -105,7 +114,7 @@ def get_table_rows(workspace: str, table: str, offset: int = 0, limit: int = 30)
 @swag_from("swagger/get_metadata.yaml")
 def get_table_metadata(workspace: str, table: str) -> Any:
     """Retrieve the metadata of a table, if it exists."""
-    return Workspace(workspace).table(table).get_metadata().dict()
+    return util.get_workspace(workspace).table(table).get_metadata().dict()
 
 
 @bp.route("/workspaces/<workspace>/tables/<table>/metadata", methods=["PUT"])
@@ -113,7 +122,7 @@ def get_table_metadata(workspace: str, table: str) -> Any:
 @swag_from("swagger/set_metadata.yaml")
 def set_table_metadata(workspace: str, table: str) -> Any:
     """Retrieve the rows and headers of a table."""
-    return Workspace(workspace).table(table).set_metadata(request.json).dict()
+    return util.get_workspace(workspace).table(table).set_metadata(request.json).dict()
 
 
 @bp.route("/workspaces/<workspace>/graphs", methods=["GET"])
@@ -121,7 +130,7 @@ def set_table_metadata(workspace: str, table: str) -> Any:
 @swag_from("swagger/workspace_graphs.yaml")
 def get_workspace_graphs(workspace: str) -> Any:
     """Retrieve the graphs of a single workspace."""
-    return util.stream((g["name"] for g in Workspace(workspace).graphs()))
+    return util.stream((g["name"] for g in util.get_workspace(workspace).graphs()))
 
 
 @bp.route("/workspaces/<workspace>/graphs/<graph>", methods=["GET"])
@@ -129,8 +138,8 @@ def get_workspace_graphs(workspace: str) -> Any:
 @swag_from("swagger/workspace_graph.yaml")
 def get_workspace_graph(workspace: str, graph: str) -> Any:
     """Retrieve information about a graph."""
-    node_tables = Workspace(workspace).graph(graph).node_tables()
-    edge_table = Workspace(workspace).graph(graph).edge_table()
+    node_tables = util.get_workspace(workspace).graph(graph).node_tables()
+    edge_table = util.get_workspace(workspace).graph(graph).edge_table()
     return {"edgeTable": edge_table, "nodeTables": node_tables}
 
 
@@ -142,7 +151,7 @@ def get_graph_nodes(
     workspace: str, graph: str, offset: int = 0, limit: int = 30
 ) -> Any:
     """Retrieve the nodes of a graph."""
-    return Workspace(workspace).graph(graph).nodes(offset, limit)
+    return util.get_workspace(workspace).graph(graph).nodes(offset, limit)
 
 
 @bp.route(
@@ -153,7 +162,7 @@ def get_graph_nodes(
 @swag_from("swagger/node_data.yaml")
 def get_node_data(workspace: str, graph: str, table: str, node: str) -> Any:
     """Return the attributes associated with a node."""
-    return Workspace(workspace).graph(graph).node_attributes(table, node)
+    return util.get_workspace(workspace).graph(graph).node_attributes(table, node)
 
 
 @bp.route(
@@ -177,7 +186,7 @@ def get_node_edges(
         raise BadQueryArgument("direction", direction)
 
     return (
-        Workspace(workspace)
+        util.get_workspace(workspace)
         .graph(graph)
         .node_edges(table, node, direction, offset, limit)
     )
@@ -198,23 +207,116 @@ def create_workspace(workspace: str) -> Any:
 
 @bp.route("/workspaces/<workspace>/aql", methods=["POST"])
 @require_reader
+@use_kwargs(
+    {
+        "batch_size": fields.Int(location="query"),
+        "max_runtime": fields.Float(location="query"),
+        "max_rows": fields.Int(location="query"),
+    }
+)
 @swag_from("swagger/aql.yaml")
-def aql(workspace: str) -> Any:
-    """Perform an AQL query in the given workspace."""
+def aql(
+    workspace: str,
+    batch_size: Optional[int] = None,
+    max_runtime: Optional[float] = None,
+    max_rows: Optional[int] = None,
+) -> Any:
+    """
+    Perform an AQL query in the given workspace.
+
+    Results are read through a streaming cursor, and sent as they arrive. The
+    requested limits can only tighten the ones configured on the server, and queries
+    estimated to be too expensive are rejected before they run.
+
+    Results of deterministic queries are cached until a table they read changes.
+    """
     query = request.data.decode("utf8")
     if not query:
         raise MalformedRequestBody(query)
 
-    result = Workspace(workspace).run_query(query)
+    options = aql_query_options(batch_size, max_runtime, max_rows)
+    result = util.get_workspace(workspace).run_query(
+        query, options=options, cache=True, guard=True
+    )
     return util.stream(result)
 
 
+@bp.route("/workspaces/<workspace>/queries", methods=["GET"])
+@require_reader
+@swag_from("swagger/workspace_queries.yaml")
+def get_saved_queries(workspace: str) -> Any:
+    """Retrieve the queries saved in a workspace."""
+    return [q.dict() for q in util.get_workspace(workspace).saved_queries()]
+
+
+@bp.route("/workspaces/<workspace>/queries/<query>", methods=["GET"])
+@require_reader
+@swag_from("swagger/get_query.yaml")
+def get_saved_query(workspace: str, query: str) -> Any:
+    """Retrieve a saved query."""
+    return util.get_workspace(workspace).saved_query(query).dict()
+
+
+@bp.route("/workspaces/<workspace>/queries/<query>", methods=["POST"])
+@require_writer
+@swag_from("swagger/save_query.yaml")
+def save_query(workspace: str, query: str) -> Any:
+    """Validate an AQL query, and save it in the workspace to be run by name."""
+    aql = request.data.decode("utf8")
+    if not aql:
+        raise MalformedRequestBody(aql)
+
+    return util.get_workspace(workspace).save_query(query, aql).dict()
+
+
+@bp.route("/workspaces/<workspace>/queries/<query>/run", methods=["POST"])
+@require_reader
+@use_kwargs(
+    {
+        "batch_size": fields.Int(location="query"),
+        "max_runtime": fields.Float(location="query"),
+        "max_rows": fields.Int(location="query"),
+    }
+)
+@swag_from("swagger/run_query.yaml")
+def run_saved_query(
+    workspace: str,
+    query: str,
+    batch_size: Optional[int] = None,
+    max_runtime: Optional[float] = None,
+    max_rows: Optional[int] = None,
+) -> Any:
+    """
+    Run a saved query, with the bind vars passed in the request body.
+
+    Saved queries were validated when they were saved, so they're executed directly.
+    """
+    bind_vars = request.get_json(silent=True) if request.data else {}
+    if not isinstance(bind_vars, dict):
+        raise MalformedRequestBody(request.data.decode("utf8", errors="replace"))
+
+    options = aql_query_options(batch_size, max_runtime, max_rows)
+    result = util.get_workspace(workspace).run_saved_query(
+        query, bind_vars, options=options, cache=True
+    )
+    return util.stream(result)
+
+
+@bp.route("/workspaces/<workspace>/queries/<query>", methods=["DELETE"])
+@require_writer
+@swag_from("swagger/delete_query.yaml")
+def delete_saved_query(workspace: str, query: str) -> Any:
+    """Delete a saved query."""
+    util.get_workspace(workspace).delete_saved_query(query)
+    return query
+
+
 @bp.route("/workspaces/<workspace>", methods=["DELETE"])
 @require_owner
 @swag_from("swagger/delete_workspace.yaml")
 def delete_workspace(workspace: str) -> Any:
     """Delete a workspace."""
-    Workspace(workspace).delete()
+    util.get_workspace(workspace).delete()
     return workspace
 
 
@@ -224,7 +326,7 @@ def delete_workspace(workspace: str) -> Any:
 @swag_from("swagger/rename_workspace.yaml")
 def rename_workspace(workspace: str, name: str) -> Any:
     """Delete a workspace."""
-    Workspace(workspace).rename(name)
+    util.get_workspace(workspace).rename(name)
     return name
 
 
@@ -237,11 +339,11 @@ def create_graph(workspace: str, graph: str, edge_table: Optional[str] = None) -
     if not edge_table:
         raise RequiredParamsMissing(["edge_table"])
 
-    loaded_workspace = Workspace(workspace)
+    loaded_workspace = util.get_workspace(workspace)
     if loaded_workspace.has_graph(graph):
         raise AlreadyExists("Graph", graph)
 
-    Workspace(workspace).create_graph(graph, edge_table)
+    util.get_workspace(workspace).create_graph(graph, edge_table)
     return graph
 
 
@@ -250,7 +352,7 @@ def create_graph(workspace: str, graph: str, edge_table: Optional[str] = None) -
 @swag_from("swagger/delete_graph.yaml")
 def delete_graph(workspace: str, graph: str) -> Any:
     """Delete a graph."""
-    Workspace(workspace).delete_graph(graph)
+    util.get_workspace(workspace).delete_graph(graph)
     return graph
 
 
@@ -259,5 +361,5 @@ def delete_graph(workspace: str, graph: str) -> Any:
 @swag_from("swagger/delete_table.yaml")
 def delete_table(workspace: str, table: str) -> Any:
     """Delete a table."""
-    Workspace(workspace).delete_table(table)
+    util.get_workspace(workspace).delete_table(table)
     return table
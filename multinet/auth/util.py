@@ -4,11 +4,11 @@ import functools
 import jwt
 import calendar
 from jwt.exceptions import InvalidSignatureError, ExpiredSignatureError, DecodeError
-from flask import request
+from flask import g, request
 from datetime import datetime, timedelta
 
 from multinet.errors import Unauthorized
-from multinet.util import get_secret_key
+from multinet.util import get_secret_key, get_workspace
 from multinet.db.models.workspace import Workspace
 from multinet.db.models.user import User
 from multinet.auth.types import LoginSessionDict
@@ -62,7 +62,7 @@ def require_reader(f: Any) -> Any:
     @functools.wraps(f)
     def wrapper(workspace: str, *args: Any, **kwargs: Any) -> Any:
         user = current_user()
-        if not is_reader(user, Workspace(workspace)):
+        if not is_reader(user, get_workspace(workspace)):
             raise Unauthorized(f"You must be a reader of workspace '{workspace}'")
 
         return f(workspace, *args, **kwargs)
@@ -88,7 +88,7 @@ def require_writer(f: Any) -> Any:
     @functools.wraps(f)
     def wrapper(workspace: str, *args: Any, **kwargs: Any) -> Any:
         user = current_user()
-        if not is_writer(user, Workspace(workspace)):
+        if not is_writer(user, get_workspace(workspace)):
             raise Unauthorized(f"You must be a writer of workspace '{workspace}'")
 
         return f(workspace, *args, **kwargs)
@@ -115,7 +115,7 @@ def require_maintainer(f: Any) -> Any:
     def wrapper(workspace: str, *args: Any, **kwargs: Any) -> Any:
         user = current_user()
 
-        if not is_maintainer(user, Workspace(workspace)):
+        if not is_maintainer(user, get_workspace(workspace)):
             raise Unauthorized(f"You must be a maintainer of workspace '{workspace}'")
 
         return f(workspace, *args, **kwargs)
@@ -141,7 +141,7 @@ def require_owner(f: Any) -> Any:
     @functools.wraps(f)
     def wrapper(workspace: str, *args: Any, **kwargs: Any) -> Any:
         user = current_user()
-        if not is_owner(user, Workspace(workspace)):
+        if not is_owner(user, get_workspace(workspace)):
             raise Unauthorized(f"You must be the owner of workspace '{workspace}'")
 
         return f(workspace, *args, **kwargs)
@@ -151,11 +151,12 @@ def require_owner(f: Any) -> Any:
 
 def current_login_token() -> Optional[LoginSessionDict]:
     """If the current request contains the correct header, decode the token."""
-    token = request.cookies.get(MULTINET_LOGIN_TOKEN)
-    if not token:
-        return None
+    # The decoded token is memoized for the rest of the request
+    if "login_token" not in g:
+        token = request.cookies.get(MULTINET_LOGIN_TOKEN)
+        g.login_token = decode_auth_token(token) if token else None
 
-    return decode_auth_token(token)
+    return g.login_token
 
 
 def encode_auth_token(token_dict: LoginSessionDict) -> str:
@@ -197,8 +198,11 @@ def create_login_token(session_str: str) -> LoginSessionDict:
 
 def current_user() -> Optional[User]:
     """Return the logged in user (if any) from the current session."""
-    session_dict = current_login_token()
-    if session_dict is None:
-        return None
-
-    return User.from_session(session_dict["session"])
+    # The user is looked up at most once per request
+    if "user" not in g:
+        session_dict = current_login_token()
+        g.user = (
+            None if session_dict is None else User.from_session(session_dict["session"])
+        )
+
+    return g.user
@@ -0,0 +1,163 @@
+"""Bounded, expiring caches for metadata shared across requests."""
+import time
+import functools
+from collections import OrderedDict
+from threading import RLock
+from typing import (
+    Any,
+    Callable,
+    Generic,
+    Hashable,
+    NamedTuple,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+T = TypeVar("T")
+
+# Marks a missing entry, since `None` is a legitimate cached value
+_missing = object()
+
+
+class CacheInfo(NamedTuple):
+    """Statistics describing the use of a cache."""
+
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+
+class TTLCache:
+    """A thread-safe LRU cache whose entries expire `ttl` seconds after being set."""
+
+    def __init__(self, maxsize: int = 128, ttl: float = 300):
+        """Create an empty cache holding at most `maxsize` entries."""
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = RLock()
+        self._entries: OrderedDict[Hashable, Tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the live entry for `key`, or `default` if there isn't one."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store `value` under `key`, evicting the least recently used entry if full."""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        """Remove the entry for `key`, if present."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        with self._lock:
+            self._entries.clear()
+
+    def info(self) -> CacheInfo:
+        """Return statistics describing the use of this cache."""
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.maxsize, len(self._entries))
+
+
+class TTLCachedFunction(Generic[T]):
+    """
+    A function whose results are held in a `TTLCache`.
+
+    If `revision` is given, it's called at most once every `revalidate` seconds to
+    obtain a stamp for the underlying data; whenever the stamp changes, every cached
+    result is discarded. This allows changes made by other processes to be seen
+    without waiting for entries to expire.
+    """
+
+    def __init__(
+        self,
+        func: Callable[..., T],
+        maxsize: int,
+        ttl: float,
+        revision: Optional[Callable[[], Hashable]] = None,
+        revalidate: float = 0,
+    ):
+        """Wrap `func` in a cache."""
+        functools.update_wrapper(self, func)
+        self.__wrapped__ = func
+
+        self.cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.revision = revision
+        self.revalidate = revalidate
+
+        self._lock = RLock()
+        self._stamp: Any = _missing
+        self._checked = 0.0
+
+    def _check_revision(self) -> None:
+        if self.revision is None:
+            return
+
+        with self._lock:
+            now = time.monotonic()
+            if self._stamp is not _missing and now - self._checked < self.revalidate:
+                return
+
+            stamp = self.revision()
+            if stamp != self._stamp:
+                self.cache.clear()
+
+            self._stamp = stamp
+            self._checked = now
+
+    def __call__(self, *args: Any, **kwargs: Any) -> T:
+        """Return the cached result for these arguments, computing it if needed."""
+        self._check_revision()
+
+        key = (args, tuple(sorted(kwargs.items())))
+        result = self.cache.get(key, _missing)
+        if result is _missing:
+            result = self.__wrapped__(*args, **kwargs)
+            self.cache.set(key, result)
+
+        return result
+
+    def cache_clear(self) -> None:
+        """Discard every cached result, and re-check the revision on the next call."""
+        with self._lock:
+            self.cache.clear()
+            self._stamp = _missing
+
+    def cache_info(self) -> CacheInfo:
+        """Return statistics describing the use of the cache."""
+        return self.cache.info()
+
+
+def ttl_cache(
+    maxsize: int = 128,
+    ttl: float = 300,
+    revision: Optional[Callable[[], Hashable]] = None,
+    revalidate: float = 0,
+) -> Callable[[Callable[..., T]], TTLCachedFunction[T]]:
+    """Cache the results of the decorated function; see `TTLCachedFunction`."""
+
+    def decorator(func: Callable[..., T]) -> TTLCachedFunction[T]:
+        return TTLCachedFunction(func, maxsize, ttl, revision, revalidate)
+
+    return decorator
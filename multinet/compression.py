@@ -0,0 +1,145 @@
+"""Compression of responses, negotiated through the Accept-Encoding header."""
+import os
+import zlib
+from flask import Response, request
+
+from typing import Any, Generator, Iterable, List, Optional
+
+try:
+    import zstandard  # type: ignore
+except ImportError:
+    zstandard = None  # type: ignore
+
+# The compression level used for responses, from 1 (fastest) to 9 (smallest). For
+# zstd, this is passed through as the zstd level.
+COMPRESSION_LEVEL = int(os.getenv("COMPRESSION_LEVEL", "6"))
+
+# Responses smaller than this many bytes are sent uncompressed
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+
+# Mimetypes of the responses that are worth compressing
+compressible_mimetypes = {"application/json", "text/csv", "text/plain"}
+
+
+class Compressor:
+    """Incrementally compresses data with a given content encoding."""
+
+    def __init__(self, encoding: str, level: int):
+        """Start compressing data as `encoding`."""
+        self.encoding = encoding
+        self.compressor: Any
+
+        if encoding == "zstd":
+            self.compressor = zstandard.ZstdCompressor(level=level).compressobj()
+        else:
+            # A wbits value of 31 produces a gzip header and trailer
+            self.compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        """Compress a chunk of data, returning any output that is ready."""
+        return self.compressor.compress(data)
+
+    def sync(self) -> bytes:
+        """Return the output for all the data so far, without ending the stream."""
+        if self.encoding == "zstd":
+            return self.compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+        return self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def flush(self) -> bytes:
+        """Finish compressing, returning the rest of the output."""
+        return self.compressor.flush()
+
+
+def available_encodings() -> List[str]:
+    """Return the supported content encodings, in order of preference."""
+    if zstandard is not None:
+        return ["zstd", "gzip"]
+
+    return ["gzip"]
+
+
+def negotiate_encoding() -> Optional[str]:
+    """Return the encoding best suited to the current request, if any."""
+    return request.accept_encodings.best_match(available_encodings())
+
+
+def close_iterable(iterable: Iterable) -> None:
+    """Close an iterable (such as a generator), if it can be closed."""
+    close = getattr(iterable, "close", None)
+    if close is not None:
+        close()
+
+
+def encode_chunks(chunks: Iterable[Any], charset: str) -> Generator[bytes, None, None]:
+    """Encode the chunks of a streamed response as bytes."""
+    try:
+        for chunk in chunks:
+            yield chunk.encode(charset) if isinstance(chunk, str) else chunk
+    finally:
+        close_iterable(chunks)
+
+
+def compress_chunks(
+    chunks: Generator[bytes, None, None], compressor: Compressor
+) -> Generator[bytes, None, None]:
+    """
+    Compress a stream of chunks, yielding the compressed output of each in turn.
+
+    Each chunk is flushed through the compressor as it's read, so that the client
+    can decode every chunk sent so far without waiting for the rest of the stream.
+    """
+    try:
+        for chunk in chunks:
+            if chunk:
+                yield compressor.compress(chunk) + compressor.sync()
+
+        yield compressor.flush()
+    finally:
+        chunks.close()
+
+
+def compress_response(response: Response) -> Response:
+    """
+    Compress a response, if the client accepts a supported encoding.
+
+    Responses shorter than `COMPRESSION_MIN_SIZE` are sent uncompressed. Streamed
+    responses are compressed incrementally as they're sent, and only sent
+    uncompressed if they declare a shorter Content-Length. Their body isn't read
+    here, so that an error raised while streaming it is handled the same way
+    whether or not the response is compressed.
+    """
+    if (
+        response.status_code < 200
+        or response.status_code in (204, 304)
+        or response.direct_passthrough
+        or "Content-Encoding" in response.headers
+        or response.mimetype not in compressible_mimetypes
+    ):
+        return response
+
+    response.vary.add("Accept-Encoding")
+
+    encoding = negotiate_encoding()
+    if encoding is None:
+        return response
+
+    compressor = Compressor(encoding, COMPRESSION_LEVEL)
+
+    if response.is_streamed:
+        length = response.content_length
+        if length is not None and length < COMPRESSION_MIN_SIZE:
+            return response
+
+        chunks = encode_chunks(response.response, response.charset)
+        response.response = compress_chunks(chunks, compressor)
+        response.headers.pop("Content-Length", None)
+    else:
+        data = response.get_data()
+        if len(data) < COMPRESSION_MIN_SIZE:
+            return response
+
+        response.set_data(compressor.compress(data) + compressor.flush())
+
+    response.headers["Content-Encoding"] = encoding
+    return response
@@ -1,25 +1,40 @@
 """Low-level database operations."""
 import os
+import json
+import time
+from threading import Timer
 from functools import lru_cache
 from uuid import uuid4
 
 from arango import ArangoClient
+from arango.http import DefaultHTTPClient
 from arango.database import StandardDatabase
 from arango.collection import StandardCollection
 from arango.aql import AQL
 from arango.cursor import Cursor
-
-from arango.exceptions import AQLQueryValidateError, AQLQueryExecuteError
+from arango.request import Request
+from arango.response import Response
+
+from arango.exceptions import (
+    AQLQueryExecuteError,
+    AQLQueryExplainError,
+    AQLQueryValidateError,
+    ArangoServerError,
+)
+from requests.adapters import HTTPAdapter
 from requests.exceptions import ConnectionError
 
-from typing import Any, List, Dict, Optional
+from pydantic import BaseModel
+from typing import Any, Generator, Iterable, List, Dict, Optional, Set
 from typing_extensions import TypedDict
 
+from multinet.cache import TTLCache, ttl_cache
 from multinet.errors import (
     UploadNotFound,
     AlreadyExists,
     AQLExecutionError,
     AQLValidationError,
+    QueryTooExpensive,
 )
 
 
@@ -28,13 +43,70 @@ GraphSpec = TypedDict("GraphSpec", {"nodeTables": List[str], "edgeTable": str})
 GraphNodesSpec = TypedDict("GraphNodesSpec", {"count": int, "nodes": List[str]})
 GraphEdgesSpec = TypedDict("GraphEdgesSpec", {"count": int, "edges": List[str]})
 
+
+class AQLQueryOptions(BaseModel):
+    """
+    Options controlling how an AQL query is executed, and how much it may return.
+
+    `max_runtime` (in seconds) is enforced by the server, and `max_rows` as the
+    results are read; the cursor is closed once the rows have been read.
+    """
+
+    batch_size: Optional[int] = None
+    stream: bool = False
+    ttl: Optional[int] = None
+    memory_limit: int = 0
+    max_runtime: Optional[float] = None
+    max_rows: Optional[int] = None
+
+
+# Limits applied to queries run through the API. A limit of 0 is disabled.
+AQL_BATCH_SIZE = int(os.environ.get("AQL_BATCH_SIZE", "1000"))
+AQL_TTL = int(os.environ.get("AQL_TTL", "30"))
+AQL_MEMORY_LIMIT = int(os.environ.get("AQL_MEMORY_LIMIT", "0"))
+AQL_MAX_RUNTIME = float(os.environ.get("AQL_MAX_RUNTIME", "300"))
+AQL_MAX_ROWS = int(os.environ.get("AQL_MAX_ROWS", "0"))
+
+# Limits on the cost of queries run through the API, as estimated by the query
+# optimizer, and on the number of full collection scans they make. A limit of 0 is
+# disabled. Queries within the limits aren't estimated again for AQL_ADMISSION_TTL
+# seconds.
+AQL_MAX_ESTIMATED_COST = float(os.environ.get("AQL_MAX_ESTIMATED_COST", "100000000"))
+AQL_MAX_FULL_SCANS = int(os.environ.get("AQL_MAX_FULL_SCANS", "0"))
+AQL_ADMISSION_TTL = float(os.environ.get("AQL_ADMISSION_TTL", "60"))
+
+
+class PooledHTTPClient(DefaultHTTPClient):
+    """HTTP client whose connections to ArangoDB are pooled and kept alive."""
+
+    def __init__(self, pool_size: int, keep_alive: bool = True):
+        """Mount a connection pool of `pool_size` connections on the session."""
+        super().__init__()
+
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+        if not keep_alive:
+            self._session.headers["Connection"] = "close"
+
+
+# A single client (and so a single connection pool) is shared by every database
+# handle in the process.
 arango = ArangoClient(
     host=os.environ.get("ARANGO_HOST", "localhost"),
     port=int(os.environ.get("ARANGO_PORT", "8529")),
     protocol=os.environ.get("ARANGO_PROTOCOL", "http"),
+    http_client=PooledHTTPClient(
+        pool_size=int(os.environ.get("ARANGO_POOL_SIZE", "10")),
+        keep_alive=os.environ.get("ARANGO_KEEP_ALIVE", "true").lower() == "true",
+    ),
 )
 
 
+# Database handles are cheap to keep, so they're cached for the life of the process.
+# Call `db.cache_clear()` whenever a database is removed.
+@lru_cache(maxsize=int(os.environ.get("ARANGO_HANDLE_CACHE_SIZE", "256")))
 def db(name: str, readonly: bool = True) -> StandardDatabase:
     """Return a handle for Arango database `name`."""
 
@@ -89,8 +161,15 @@ def workspace_mapping_collection(readonly: bool = True) -> StandardCollection:
     return sysdb.collection("workspace_mapping")
 
 
-# Caches the document that maps an external workspace name to it's internal one
-@lru_cache()
+# Caches the document that maps an external workspace name to it's internal one. The
+# cache is bounded and expires entries, and is dropped whenever the revision of the
+# mapping collection changes, so that changes made by other workers are picked up.
+@ttl_cache(
+    maxsize=int(os.environ.get("WORKSPACE_CACHE_SIZE", "1024")),
+    ttl=float(os.environ.get("WORKSPACE_CACHE_TTL", "300")),
+    revision=lambda: workspace_mapping_collection().revision(),
+    revalidate=float(os.environ.get("WORKSPACE_CACHE_REVALIDATE", "2")),
+)
 def workspace_mapping(name: str) -> Optional[Dict]:
     """
     Get the document containing the workspace mapping for :name: (if it exists).
@@ -116,18 +195,303 @@ def user_collection() -> StandardCollection:
     return sysdb.collection("users")
 
 
-def _run_aql_query(
+def ensure_user_indexes() -> None:
+    """Ensure that users can be looked up by `sub` and session without a scan."""
+    coll = user_collection()
+
+    # Adding an index that already exists is a no-op
+    coll.add_persistent_index(["sub"])
+    coll.add_persistent_index(["multinet.session"], sparse=True)
+
+
+def _capped(requested: Optional[Any], limit: Any) -> Optional[Any]:
+    """Return `requested`, capped at `limit` (unless it's 0)."""
+    if not limit:
+        return requested
+    if requested is None:
+        return limit
+
+    return min(requested, limit)
+
+
+def aql_query_options(
+    batch_size: Optional[int] = None,
+    max_runtime: Optional[float] = None,
+    max_rows: Optional[int] = None,
+) -> AQLQueryOptions:
+    """Return options for a streaming query, capping the requested limits."""
+    return AQLQueryOptions(
+        batch_size=_capped(batch_size, AQL_BATCH_SIZE),
+        stream=True,
+        ttl=AQL_TTL or None,
+        memory_limit=AQL_MEMORY_LIMIT,
+        max_runtime=_capped(max_runtime, AQL_MAX_RUNTIME),
+        max_rows=_capped(max_rows, AQL_MAX_ROWS),
+    )
+
+
+# Queries that were found to be within the cost limits
+_admitted_queries = TTLCache(maxsize=1024, ttl=AQL_ADMISSION_TTL)
+
+
+def _explain_query(
     aql: AQL, query: str, bind_vars: Optional[Dict[str, Any]] = None
+) -> Dict:
+    """
+    Return the optimizer's plan for `query`, with values for its bind vars.
+
+    The request is built here, rather than with `AQL.explain`, since python-arango
+    can't pass bind vars to it.
+    """
+    data: Dict[str, Any] = {"query": query}
+    if bind_vars:
+        data["bindVars"] = bind_vars
+
+    request = Request(method="post", endpoint="/_api/explain", data=data)
+
+    def response_handler(resp: Response) -> Dict:
+        if not resp.is_success:
+            raise AQLQueryExplainError(resp, request)
+
+        return resp.body["plan"]
+
+    return aql._execute(request, response_handler)
+
+
+def admit_aql_query(
+    handle: StandardDatabase, query: str, bind_vars: Optional[Dict[str, Any]] = None
+) -> None:
+    """
+    Check the optimizer's estimate of the cost of `query` against the cost limits.
+
+    Raises `QueryTooExpensive` if it's over either limit. Since the plan depends on
+    the values of the query's bind vars, they must all be given.
+    """
+    if not (AQL_MAX_ESTIMATED_COST or AQL_MAX_FULL_SCANS):
+        return
+
+    key = (handle.name, query, json.dumps(bind_vars or {}, sort_keys=True, default=str))
+    if _admitted_queries.get(key):
+        return
+
+    try:
+        plan = _explain_query(handle.aql, query, bind_vars)
+    except AQLQueryExplainError as e:
+        raise AQLValidationError(str(e))
+
+    estimated_cost = plan.get("estimatedCost", 0)
+    full_scans = [
+        node["collection"]
+        for node in plan.get("nodes", [])
+        if node.get("type") == "EnumerateCollectionNode"
+    ]
+
+    if (AQL_MAX_ESTIMATED_COST and estimated_cost > AQL_MAX_ESTIMATED_COST) or (
+        AQL_MAX_FULL_SCANS and len(full_scans) > AQL_MAX_FULL_SCANS
+    ):
+        raise QueryTooExpensive(
+            estimated_cost, AQL_MAX_ESTIMATED_COST, full_scans, AQL_MAX_FULL_SCANS
+        )
+
+    _admitted_queries.set(key, True)
+
+
+def _kill_query_after(aql: AQL, tag: str, max_runtime: float) -> Timer:
+    """
+    Kill the query starting with `tag`, if it's still running after `max_runtime`.
+
+    The server only lists the start of long queries, so a query is found by a tag
+    at its start, unique to one run.
+    """
+
+    def kill() -> None:
+        try:
+            for running in aql.queries():
+                if running["query"].startswith(tag):
+                    aql.kill(running["id"])
+        except ArangoServerError:
+            # The query may have finished in the meantime
+            pass
+
+    timer = Timer(max_runtime, kill)
+    timer.daemon = True
+    timer.start()
+
+    return timer
+
+
+class QueryResults:
+    """
+    The results of a running query, read through its cursor.
+
+    At most `max_rows` rows are returned, and `truncated` is True if rows are
+    dropped to keep to that limit. The first batch must hold more than `max_rows`
+    rows if there are that many, so that this is known before any rows are sent.
+
+    Once the server has returned the last batch, the query has finished, so the
+    deadline (and the watchdog) no longer apply to reading the rest of the rows.
+    """
+
+    def __init__(
+        self,
+        cursor: Cursor,
+        max_rows: Optional[int],
+        deadline: Optional[float],
+        watchdog: Optional[Timer],
+    ):
+        """Wrap a cursor holding the first batch of results of a query."""
+        self.cursor = cursor
+        self.max_rows = max_rows
+        self.deadline = deadline
+        self.watchdog = watchdog
+
+        self.truncated = max_rows is not None and len(cursor.batch()) > max_rows
+
+    def _expired(self) -> bool:
+        return self.deadline is not None and time.monotonic() > self.deadline
+
+    def _finished(self) -> None:
+        self.deadline = None
+        if self.watchdog is not None:
+            self.watchdog.cancel()
+
+    def __iter__(self) -> Generator[Any, None, None]:
+        """Yield the rows of the query, closing the cursor once they're read."""
+        try:
+            for index, row in enumerate(self.cursor):
+                if self.max_rows is not None and index >= self.max_rows:
+                    return
+
+                if not self.cursor.has_more():
+                    self._finished()
+                elif self._expired():
+                    raise AQLExecutionError("Query exceeded its maximum runtime")
+
+                yield row
+        except ArangoServerError as e:
+            # The query is killed on the server once it runs out of time
+            if self._expired():
+                raise AQLExecutionError("Query exceeded its maximum runtime")
+
+            raise AQLExecutionError(str(e))
+        finally:
+            if self.watchdog is not None:
+                self.watchdog.cancel()
+
+            self.cursor.close(ignore_missing=True)
+
+
+def _execute_query(
+    aql: AQL,
+    query: str,
+    bind_vars: Optional[Dict[str, Any]],
+    options: AQLQueryOptions,
+    batch_size: Optional[int],
 ) -> Cursor:
+    """
+    Start `query` through the cursor API, returning a cursor with its first batch.
+
+    The request is built here, rather than with `AQL.execute`, since python-arango
+    can't pass a maximum runtime to the server.
+    """
+    data: Dict[str, Any] = {"query": query}
+    if bind_vars:
+        data["bindVars"] = bind_vars
+    if batch_size:
+        data["batchSize"] = batch_size
+    if options.ttl:
+        data["ttl"] = options.ttl
+    if options.memory_limit:
+        data["memoryLimit"] = options.memory_limit
+
+    query_options: Dict[str, Any] = {}
+    if options.stream:
+        query_options["stream"] = True
+    if options.max_runtime is not None:
+        query_options["maxRuntime"] = options.max_runtime
+    if query_options:
+        data["options"] = query_options
+
+    request = Request(method="post", endpoint="/_api/cursor", data=data)
+
+    def response_handler(resp: Response) -> Cursor:
+        if not resp.is_success:
+            raise AQLQueryExecuteError(resp, request)
+
+        return Cursor(aql._conn, resp.body)
+
+    return aql._execute(request, response_handler)
+
+
+def _validate_aql_query(aql: AQL, query: str) -> Dict:
     try:
-        aql.validate(query)
-        cursor = aql.execute(query, bind_vars=bind_vars)
+        return aql.validate(query)
     except AQLQueryValidateError as e:
         raise AQLValidationError(str(e))
+
+
+def _run_aql_query(
+    aql: AQL,
+    query: str,
+    bind_vars: Optional[Dict[str, Any]] = None,
+    options: Optional[AQLQueryOptions] = None,
+    validate: bool = True,
+) -> Iterable[Any]:
+    if validate:
+        _validate_aql_query(aql, query)
+
+    if options is None:
+        options = AQLQueryOptions()
+
+    # The server stops queries that run past their maximum runtime, but servers
+    # older than ArangoDB 3.6 ignore it, so a watchdog kills them as well
+    deadline = None
+    watchdog = None
+    if options.max_runtime is not None:
+        # The query is tagged, so that the watchdog kills this run and no other
+        tag = f"/* {uuid4().hex} */"
+        query = f"{tag}\n{query}"
+
+        deadline = time.monotonic() + options.max_runtime
+        watchdog = _kill_query_after(aql, tag, options.max_runtime)
+
+    # The first batch is made large enough to show whether the results will be
+    # truncated, before any are sent
+    batch_size = options.batch_size
+    max_rows = options.max_rows
+    if max_rows is not None:
+        batch_size = max(batch_size or 0, max_rows + 1)
+
+    try:
+        cursor = _execute_query(aql, query, bind_vars, options, batch_size)
     except AQLQueryExecuteError as e:
+        if watchdog is not None:
+            watchdog.cancel()
+
+        if deadline is not None and time.monotonic() > deadline:
+            raise AQLExecutionError("Query exceeded its maximum runtime")
+
         raise AQLExecutionError(str(e))
 
-    return cursor
+    if max_rows is None and deadline is None:
+        return cursor
+
+    return QueryResults(cursor, max_rows, deadline, watchdog)
+
+
+# The server's own queries are constant, so each only needs validating once
+_validated_queries: Set[str] = set()
+
+
+def _run_internal_query(
+    aql: AQL, query: str, bind_vars: Optional[Dict[str, Any]] = None
+) -> Iterable[Any]:
+    """Run a query built into the server, validating it only on its first run."""
+    if query not in _validated_queries:
+        _validate_aql_query(aql, query)
+        _validated_queries.add(query)
+
+    return _run_aql_query(aql, query, bind_vars, validate=False)
 
 
 # TODO: Refactor the below functions into an `Upload` class
@@ -0,0 +1,148 @@
+"""Batched, concurrent bulk loading of documents into ArangoDB collections."""
+import os
+import itertools
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from pydantic import BaseModel, Field
+from arango.collection import StandardCollection
+
+from multinet.validation import InsertFailure
+
+from typing import Callable, Deque, Dict, Iterable, List, Optional
+from typing_extensions import Literal
+
+# The number of documents sent to ArangoDB in each import request
+BULK_INSERT_BATCH_SIZE = int(os.getenv("BULK_INSERT_BATCH_SIZE", "5000"))
+
+# The number of import requests that may be in flight at once
+BULK_INSERT_THREADS = int(os.getenv("BULK_INSERT_THREADS", "4"))
+
+OnDuplicate = Literal["error", "update", "replace", "ignore"]
+
+
+class BatchResult(BaseModel):
+    """The outcome of importing a single batch of documents."""
+
+    batch: int
+    created: int = 0
+    errors: int = 0
+    empty: int = 0
+    updated: int = 0
+    ignored: int = 0
+    details: List[str] = Field(default_factory=list)
+
+
+class BulkInsertResult(BaseModel):
+    """The combined outcome of importing every batch of a bulk insert."""
+
+    created: int = 0
+    errors: int = 0
+    updated: int = 0
+    ignored: int = 0
+    batches: List[BatchResult] = Field(default_factory=list)
+
+    def add(self, batch: BatchResult) -> None:
+        """Accumulate the result of one batch."""
+        self.created += batch.created
+        self.errors += batch.errors
+        self.updated += batch.updated
+        self.ignored += batch.ignored
+        self.batches.append(batch)
+
+    def failures(self) -> List[InsertFailure]:
+        """Describe each document that failed to insert, in batch order."""
+        failures: List[InsertFailure] = []
+        for batch in self.batches:
+            failures.extend(
+                InsertFailure(batch=batch.batch, message=message)
+                for message in batch.details
+            )
+
+            # Make sure every failed document is accounted for, even if the
+            # database didn't describe it
+            for _ in range(batch.errors - len(batch.details)):
+                failures.append(
+                    InsertFailure(batch=batch.batch, message="document not inserted")
+                )
+
+        return failures
+
+
+BulkInsertProgress = Callable[[BatchResult], None]
+
+
+def import_batch(
+    collection: StandardCollection,
+    index: int,
+    documents: List[Dict],
+    on_duplicate: Optional[OnDuplicate] = None,
+) -> BatchResult:
+    """Import one batch of documents with a single request to the import API."""
+    result = collection.import_bulk(
+        documents, halt_on_error=False, details=True, on_duplicate=on_duplicate
+    )
+
+    return BatchResult(batch=index, **result)
+
+
+def bulk_insert(
+    collection: StandardCollection,
+    documents: Iterable[Dict],
+    batch_size: Optional[int] = None,
+    threads: Optional[int] = None,
+    on_duplicate: Optional[OnDuplicate] = None,
+    progress: Optional[BulkInsertProgress] = None,
+) -> BulkInsertResult:
+    """
+    Insert `documents` into `collection` in batches, sent over a thread pool.
+
+    Documents are consumed from `documents` lazily, and only a bounded number of
+    batches are held in memory at once. Per-batch results are recorded (and passed
+    to `progress`, if given) in batch order, regardless of completion order.
+
+    Errors for individual documents don't halt the import; they are counted and
+    described in the result instead.
+    """
+    batch_size = batch_size or BULK_INSERT_BATCH_SIZE
+    threads = threads or BULK_INSERT_THREADS
+
+    result = BulkInsertResult()
+
+    def record(batch: BatchResult) -> None:
+        result.add(batch)
+        if progress is not None:
+            progress(batch)
+
+    iterator = iter(documents)
+    batches = iter(lambda: list(itertools.islice(iterator, batch_size)), [])
+
+    if threads <= 1:
+        for index, batch in enumerate(batches):
+            record(import_batch(collection, index, batch, on_duplicate))
+
+        return result
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        pending: Deque[Future] = deque()
+        try:
+            for index, batch in enumerate(batches):
+                pending.append(
+                    executor.submit(
+                        import_batch, collection, index, batch, on_duplicate
+                    )
+                )
+
+                # Wait on the oldest batch before reading too far ahead
+                if len(pending) >= 2 * threads:
+                    record(pending.popleft().result())
+
+            while pending:
+                record(pending.popleft().result())
+        except BaseException:
+            # Don't start any more batches once the import has failed
+            for future in pending:
+                future.cancel()
+
+            raise
+
+    return result
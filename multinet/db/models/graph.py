@@ -7,7 +7,7 @@ from arango.exceptions import DocumentGetError
 from multinet.types import EdgeDirection
 from multinet.errors import TableNotFound, NodeNotFound
 
-from typing import Any, Dict, Iterable, Optional
+from typing import Any, Dict, Iterable, List, Optional
 
 # This maps the terminology of our API to that of python-arango
 edge_direction_map = {"all": "any", "incoming": "inbound", "outgoing": "outbound"}
@@ -36,27 +36,54 @@ class Graph:
     def nodes(
         self, offset: Optional[int] = None, limit: Optional[int] = None
     ) -> Dict[str, Any]:
-        """Return nodes in this graph."""
+        """
+        Return nodes in this graph.
+
+        The node tables are paginated as if they were a single table (each ordered by
+        `_key`, in the order of `node_tables`), so `offset` and `limit` apply across
+        all of them. The page is fetched with a single query, containing only the
+        slices of the tables that fall within it.
+        """
         coll_names = self.handle.vertex_collections()
+        counts = [self.handle.vertex_collection(name).count() for name in coll_names]
+        result_set_size = sum(counts)
+
+        start = offset or 0
+        end = result_set_size if limit is None else start + limit
+
+        subqueries: List[str] = []
+        bind_vars: Dict[str, Any] = {}
+
+        # The position of the current table's first node, across all node tables
+        position = 0
+        for i, (coll_name, count) in enumerate(zip(coll_names, counts)):
+            coll_start = max(start - position, 0)
+            coll_end = min(end - position, count)
+            position += count
 
-        result_set_size = 0
-        query_size = 0
-        total_nodes = []
+            if coll_end <= coll_start:
+                continue
 
-        for coll_name in coll_names:
-            coll = self.handle.vertex_collection(coll_name)
-            result_set_size += coll.all().count()
+            bind_vars[f"@coll{i}"] = coll_name
+            bind_vars[f"offset{i}"] = coll_start
+            bind_vars[f"limit{i}"] = coll_end - coll_start
+            subqueries.append(
+                f"(FOR doc IN @@coll{i} SORT doc._key "
+                f"LIMIT @offset{i}, @limit{i} RETURN doc)"
+            )
 
-            if limit is None or query_size < limit:
-                remaining_limit = min(limit, limit - query_size) if limit else None
-                cur = coll.all(skip=offset, limit=remaining_limit)
+        if not subqueries:
+            return {"count": result_set_size, "nodes": []}
 
-                query_size += cur.count()
-                total_nodes.extend(list(cur))
+        query = f"""
+        FOR doc IN FLATTEN([{", ".join(subqueries)}], 1)
+            RETURN doc
+        """
 
         # Because we're embedding a list in a dictionary, we can't take full advantage
         # of cursors. If this isn't required in the future, this may be more efficient
-        return {"count": result_set_size, "nodes": list(total_nodes)}
+        cur = self.aql.execute(query, bind_vars=bind_vars)
+        return {"count": result_set_size, "nodes": list(cur)}
 
     def node_tables(self) -> Iterable[str]:
         """Return all node tables in this graph."""
@@ -95,21 +122,24 @@ class Graph:
         limit: Optional[int] = None,
     ) -> Dict:
         """Return the edges of the node `node` from table `table`."""
-        node_id = f"{table}/{node}"
-        edge_table = self.edge_table()
-
-        query_direction = edge_direction_map[direction]
-        if query_direction == "inbound":
-            query_filter = f'e._to == "{node_id}"'
-        elif query_direction == "outbound":
-            query_filter = f'e._from == "{node_id}"'
-        elif query_direction == "all":
-            query_filter = f'e._from == "{node_id}" || e._to == "{node_id}"'
-
+        bind_vars: Dict[str, Any] = {
+            "node": f"{table}/{node}",
+            "graph": self.name,
+        }
+
+        limit_clause = ""
+        if limit is not None:
+            limit_clause = "LIMIT @offset, @limit"
+            bind_vars["offset"] = offset or 0
+            bind_vars["limit"] = limit
+
+        # The direction is a keyword taken from `edge_direction_map`, and can't be
+        # passed as a bind parameter. Everything else is bound, so that each of the
+        # three resulting queries can be planned once and cached by ArangoDB.
+        query_direction = edge_direction_map[direction].upper()
         query = f"""
-        FOR e IN {edge_table}
-            FILTER {query_filter}
-            LIMIT {offset}, {limit}
+        FOR v, e IN 1..1 {query_direction} @node GRAPH @graph
+            {limit_clause}
             RETURN {{
                 "edge": e._id,
                 "from": e._from,
@@ -117,14 +147,13 @@ class Graph:
             }}
         """
 
-        count_query = f"""
-        FOR e IN {edge_table}
-            FILTER {query_filter}
-            COLLECT WITH COUNT INTO count
-            RETURN count
-        """
+        # `full_count` returns the number of matching edges before the LIMIT was
+        # applied, so the page and the count come back with a single request
+        cursor = self.aql.execute(query, bind_vars=bind_vars, full_count=True)
+        edges = list(cursor)
 
-        query_cur = self.aql.execute(query)
-        count_cur = self.aql.execute(count_query)
+        count = len(edges)
+        if limit is not None:
+            count = cursor.statistics()["fullCount"]
 
-        return {"count": next(count_cur), "edges": list(query_cur)}
+        return {"count": count, "edges": edges}
@@ -3,9 +3,16 @@ from __future__ import annotations  # noqa: T484
 
 from arango.collection import StandardCollection
 from arango.aql import AQL
+from arango.cursor import Cursor
 from pydantic import ValidationError as PydanticValidationError
 
 from multinet import util
+from multinet.db.bulk import (
+    BulkInsertProgress,
+    BulkInsertResult,
+    OnDuplicate,
+    bulk_insert,
+)
 from multinet.db.models import workspace
 from multinet.types import (
     EdgeTableProperties,
@@ -13,9 +20,9 @@ from multinet.types import (
     EntityMetadata,
     TableMetadata,
 )
-from multinet.errors import ServerError, FlaskTuple, InvalidMetadata
+from multinet.errors import ServerError, FlaskTuple, InvalidMetadata, ValidationFailed
 
-from typing import List, Set, Dict, Iterable, Union, Optional
+from typing import Any, List, Set, Dict, Iterable, Sequence, Union, Optional
 
 
 def table_metadata_from_dict(raw_data: Dict) -> TableMetadata:
@@ -59,12 +66,76 @@ class Table:
         # Used for running AQL queries when necessary
         self.aql: AQL = workspace.handle.aql
 
-    def rows(self, offset: Optional[int] = None, limit: Optional[int] = None) -> Dict:
-        """Return the desired rows in a table."""
-        rows = self.handle.find({}, skip=offset, limit=limit)
-        count = self.handle.all().count()
+    def rows(
+        self,
+        offset: Optional[int] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> Dict:
+        """
+        Return the desired rows in a table.
+
+        When paginating, rows are ordered by `_key`, and the result contains a `next`
+        token. Passing that token back as `cursor` returns the following page,
+        starting after the last row of the previous one. Unlike `offset`, this lets
+        the database seek directly to the page through the primary index.
+        """
+        count = self.row_count()
+
+        if offset is None and limit is None and cursor is None:
+            return {"count": count, "rows": list(self.handle.all())}
+
+        bind_vars: Dict[str, Any] = {"@table": self.name, "offset": offset or 0}
+
+        key_filter = ""
+        if cursor is not None:
+            key_filter = "FILTER doc._key > @after"
+            bind_vars["after"] = util.decode_cursor(cursor)
 
-        return {"count": count, "rows": list(rows)}
+        # AQL has no way to skip rows without also limiting them
+        page_size = limit if limit is not None else count
+
+        # One extra row is read, to tell whether any rows follow this page
+        bind_vars["limit"] = page_size + 1
+
+        query = f"""
+        FOR doc IN @@table
+            {key_filter}
+            SORT doc._key
+            LIMIT @offset, @limit
+            RETURN doc
+        """
+
+        rows = list(self.aql.execute(query, bind_vars=bind_vars))
+
+        next_cursor = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            if rows:
+                next_cursor = util.encode_cursor(rows[-1]["_key"])
+
+        return {"count": count, "rows": rows, "next": next_cursor}
+
+    def stream_rows(
+        self,
+        batch_size: Optional[int] = None,
+        exclude: Sequence[str] = ("_id", "_rev"),
+    ) -> Cursor:
+        """
+        Return a cursor over every row in this table, without the `exclude` fields.
+
+        Rows are fetched from the database `batch_size` at a time, as the cursor is
+        consumed, so the table is never held in memory all at once.
+        """
+        query = """
+        FOR doc IN @@table
+            RETURN UNSET(doc, @exclude)
+        """
+
+        bind_vars = {"@table": self.name, "exclude": list(exclude)}
+        return self.aql.execute(
+            query, bind_vars=bind_vars, batch_size=batch_size, stream=True
+        )
 
     def row(self, doc: Union[Dict, str]) -> Optional[Dict]:
         """Return a specific document, or `None` if not present."""
@@ -79,7 +150,12 @@ class Table:
         return self.handle.keys()
 
     def headers(self) -> List[str]:
-        """Return the fields present on each row in this table."""
+        """
+        Return the fields present on any row in this table.
+
+        The fields of the first row come first, in their order, followed by the
+        fields found only on other rows, sorted.
+        """
         keys = []
         cur = self.handle.find({}, limit=1)
 
@@ -87,6 +163,20 @@ class Table:
             doc: Dict = next(cur)
             keys = list(util.filter_unwanted_keys(doc).keys())
 
+        # Rows needn't share their fields, so every row is checked for others
+        query = """
+        FOR doc IN @@table
+            FOR key IN ATTRIBUTES(doc)
+                FILTER key NOT IN @exclude
+                COLLECT field = key
+                RETURN field
+        """
+        bind_vars = {
+            "@table": self.name,
+            "exclude": sorted({*keys, *util.restricted_document_keys}),
+        }
+        keys.extend(self.aql.execute(query, bind_vars=bind_vars))
+
         return keys
 
     def get_metadata(self) -> ArangoEntityDocument:
@@ -118,13 +208,28 @@ class Table:
         self.handle.rename(new_name)
         self.name = new_name
 
-    def insert(self, rows: List[Dict]) -> List[Dict]:
+    def insert(
+        self,
+        rows: Iterable[Dict],
+        on_duplicate: Optional[OnDuplicate] = None,
+        progress: Optional[BulkInsertProgress] = None,
+    ) -> BulkInsertResult:
         """
         Insert rows into this table.
 
-        Returns the metadata from the documents inserted.
+        Rows are sent to the database in batches, several at a time. Returns the
+        number of documents created for each batch. If any row is rejected by the
+        database, a ValidationFailed error describing each rejection is raised
+        once every batch has been sent.
         """
-        return self.handle.insert_many(rows)
+        result = bulk_insert(
+            self.handle, rows, on_duplicate=on_duplicate, progress=progress
+        )
+
+        if result.errors:
+            raise ValidationFailed(errors=result.failures())
+
+        return result
 
     def edge_properties(self) -> EdgeTableProperties:
         """
@@ -1,17 +1,26 @@
 """User data and functions."""
 from __future__ import annotations  # noqa: T484
 
+import os
 import json
 
 from uuid import uuid4
 from copy import copy
 from pydantic import BaseModel
-from arango.cursor import Cursor
 
-from multinet.db import user_collection, system_db, _run_aql_query
+from multinet.cache import TTLCache
+from multinet.db import user_collection, system_db, _run_internal_query
 from multinet.auth.types import LoginSessionDict
 
-from typing import Optional, Dict, Generator, Any
+from typing import Optional, Dict, Generator, Iterable, Any
+
+# Maps session ids to user documents, so that authenticating a request doesn't need
+# to query the database. Sessions ended in another process stay valid here until
+# their entry expires, so the TTL should be kept short.
+session_cache = TTLCache(
+    maxsize=int(os.getenv("USER_SESSION_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("USER_SESSION_CACHE_TTL", "60")),
+)
 
 
 class MultinetInfo(BaseModel):
@@ -94,14 +103,18 @@ class User:
     @staticmethod
     def from_session(session_id: str) -> Optional[User]:
         """Return a User from the session, if it exists."""
-        coll = user_collection()
+        doc = session_cache.get(session_id)
+        if doc is None:
+            coll = user_collection()
 
-        try:
-            return User.from_dict(
-                next(coll.find({"multinet.session": session_id}, limit=1))
-            )
-        except StopIteration:
-            return None
+            try:
+                doc = next(coll.find({"multinet.session": session_id}, limit=1))
+            except StopIteration:
+                return None
+
+            session_cache.set(session_id, doc)
+
+        return User.from_dict(doc)
 
     @staticmethod
     def from_token(token: LoginSessionDict) -> Optional[User]:
@@ -120,7 +133,7 @@ class User:
         return user
 
     @staticmethod
-    def search(query: str) -> Cursor:
+    def search(query: str) -> Iterable[Any]:
         """Search for users given a partial string."""
 
         coll = user_collection()
@@ -136,10 +149,12 @@ class User:
             RETURN doc
         """
 
-        return _run_aql_query(aql, query, bind_vars)
+        return _run_internal_query(aql, query, bind_vars)
 
     def save(self) -> None:
         """Save this user into the user collection."""
+        self.forget_session()
+
         coll = user_collection()
         user_as_dict = self.asdict()
 
@@ -152,6 +167,8 @@ class User:
 
     def delete(self) -> None:
         """Delete this user from the database."""
+        self.forget_session()
+
         coll = user_collection()
         doc = User.get(self.sub)
         if doc:
@@ -178,6 +195,8 @@ class User:
 
     def set_session(self, session: str) -> None:
         """Set the login session of a user."""
+        self.forget_session()
+
         if self.multinet is None:
             self.multinet = MultinetInfo(session=session)
         else:
@@ -188,9 +207,15 @@ class User:
     def delete_session(self) -> None:
         """Delete the login session of a user."""
         if self.multinet is not None:
+            self.forget_session()
             self.multinet.session = None
             self.save()
 
+    def forget_session(self) -> None:
+        """Drop this user's current session from the session cache."""
+        if self.multinet is not None and self.multinet.session is not None:
+            session_cache.pop(self.multinet.session)
+
     def asjson(self) -> str:
         """Return this user as JSON."""
         return json.dumps(self.asdict())
@@ -220,4 +245,4 @@ class User:
             RETURN w
         """
 
-        return (x["name"] for x in _run_aql_query(sysdb.aql, query, bind_vars))
+        return (x["name"] for x in _run_internal_query(sysdb.aql, query, bind_vars))
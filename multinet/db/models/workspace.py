@@ -1,10 +1,10 @@
 """Operations that deal with workspaces."""
 from __future__ import annotations  # noqa: T484
 
+import re
 import copy
 from pydantic import BaseModel, Field
 from arango.exceptions import DatabaseCreateError, EdgeDefinitionCreateError
-from arango.cursor import Cursor
 from arango.collection import StandardCollection
 
 from multinet import util
@@ -17,9 +17,18 @@ from multinet.db import (
     db,
     system_db,
     _run_aql_query,
+    _validate_aql_query,
+    admit_aql_query,
+    AQLQueryOptions,
+    AQL_MAX_RUNTIME,
 )
+from multinet.db.query_cache import query_cache
 from multinet.errors import (
     AlreadyExists,
+    BadQueryArgument,
+    InvalidName,
+    NotFound,
+    RequiredParamsMissing,
     ValidationFailed,
     InternalServerError,
     WorkspaceNotFound,
@@ -31,7 +40,7 @@ from multinet.db.models.user import User
 from multinet.db.models.graph import Graph
 from multinet.db.models.table import Table
 
-from typing import Any, List, Dict, Generator, Optional
+from typing import Any, List, Dict, Generator, Iterable, Optional
 
 
 class WorkspacePermissions(BaseModel):
@@ -46,6 +55,25 @@ class WorkspacePermissions(BaseModel):
     public: bool = False
 
 
+class SavedQuery(BaseModel):
+    """An AQL query saved in a workspace, with the bind vars it requires."""
+
+    name: str
+    query: str
+    bind_vars: List[str] = Field(default_factory=list)
+
+    @staticmethod
+    def from_document(doc: Dict) -> SavedQuery:
+        """Read a saved query from its document."""
+        return SavedQuery(
+            name=doc["_key"], query=doc["query"], bind_vars=doc.get("bind_vars", [])
+        )
+
+
+# Saved query names are used as document keys, so they follow ArangoDB's key rules
+valid_query_name = re.compile(r"^[a-zA-Z0-9_\-:.@()+,=;$!*'%]{1,254}$")
+
+
 class Workspace:
     """Workspaces contain Multinet Tables and Graphs."""
 
@@ -172,6 +200,7 @@ class Workspace:
 
         # Invalidate the cache for things changed by this function
         workspace_mapping.cache_clear()
+        db.cache_clear()
 
     def delete(self) -> None:
         """Delete this workspace."""
@@ -185,6 +214,7 @@ class Workspace:
 
         # Invalidate the cache for things changed by this function
         workspace_mapping.cache_clear()
+        db.cache_clear()
 
     def get_metadata(self) -> Dict:
         """Fetch and return the metadata for this workspace."""
@@ -202,6 +232,13 @@ class Workspace:
 
         return self.handle.collection("_metadata")
 
+    def saved_queries_collection(self) -> StandardCollection:
+        """Return the collection handle for saved queries."""
+        if not self.readonly_handle.has_collection("_queries"):
+            return self.handle.create_collection("_queries", system=True)
+
+        return self.handle.collection("_queries")
+
     def graphs(self) -> List[Dict]:
         """Return the graphs in this workspace."""
         return self.readonly_handle.graphs()
@@ -276,16 +313,21 @@ class Workspace:
         return self.handle.delete_graph(name)
 
     def tables(self, table_type: TableType = "all") -> Generator[str, None, None]:
-        """Return all tables of the specified type."""
+        """
+        Return all tables of the specified type.
+
+        The type of each table is read from the collection listing, so that listing
+        tables takes a single request however many there are.
+        """
 
         def pass_all(x: Dict[str, Any]) -> bool:
             return True
 
         def is_edge(x: Dict[str, Any]) -> bool:
-            return x["edge"]
+            return x["type"] == "edge"
 
         def is_node(x: Dict[str, Any]) -> bool:
-            return not x["edge"]
+            return x["type"] != "edge"
 
         if table_type == "all":
             desired_type = pass_all
@@ -297,10 +339,7 @@ class Workspace:
         tables = (
             table["name"]
             for table in self.readonly_handle.collections()
-            if not table["system"]
-            and desired_type(
-                self.readonly_handle.collection(table["name"]).properties()
-            )
+            if not table["system"] and desired_type(table)
         )
 
         return tables
@@ -328,14 +367,19 @@ class Workspace:
 
         # In the future, the result of this validation can be
         # used to determine dependencies in virtual tables
-        rows = list(self.run_query(aql_query))
+        options = AQLQueryOptions(max_runtime=AQL_MAX_RUNTIME or None)
+        rows = list(self.run_query(aql_query, options=options, guard=True))
 
         errors = validate_csv(rows, "_key", False)
         if errors:
             raise ValidationFailed(errors=errors)
 
         loaded_table = self.create_table(table, False)
-        loaded_table.insert(rows)
+        try:
+            loaded_table.insert(rows)
+        except ValidationFailed:
+            self.delete_table(table)
+            raise
 
         return loaded_table
 
@@ -346,6 +390,120 @@ class Workspace:
 
         self.handle.delete_collection(table)
 
-    def run_query(self, query: str, bind_vars: Optional[Dict] = None) -> Cursor:
-        """Run an aql query on this workspace."""
-        return _run_aql_query(self.readonly_handle.aql, query, bind_vars=bind_vars)
+    def run_query(
+        self,
+        query: str,
+        bind_vars: Optional[Dict] = None,
+        options: Optional[AQLQueryOptions] = None,
+        cache: bool = False,
+        validate: bool = True,
+        guard: bool = False,
+    ) -> Iterable[Any]:
+        """
+        Run an aql query on this workspace.
+
+        If `cache` is true, the results may be served from the query cache. If
+        `validate` is false, the query is assumed to have been validated already. If
+        `guard` is true, queries estimated to be too expensive are rejected.
+        """
+        if guard:
+            admit_aql_query(self.readonly_handle, query, bind_vars)
+
+        def execute() -> Iterable[Any]:
+            return _run_aql_query(
+                self.readonly_handle.aql,
+                query,
+                bind_vars=bind_vars,
+                options=options,
+                validate=validate and not cache,
+            )
+
+        if not cache:
+            return execute()
+
+        max_rows = options.max_rows if options is not None else None
+        return query_cache.run(
+            self.readonly_handle, query, bind_vars, execute, key_extra=max_rows
+        )
+
+    def saved_queries(self) -> List[SavedQuery]:
+        """Return the queries saved in this workspace."""
+        coll = self.saved_queries_collection()
+        return [SavedQuery.from_document(doc) for doc in coll.all()]
+
+    def saved_query(self, name: str) -> SavedQuery:
+        """Return a saved query."""
+        coll = self.saved_queries_collection()
+        doc = coll.get(name) if valid_query_name.match(name) else None
+        if doc is None:
+            raise NotFound("query", name)
+
+        return SavedQuery.from_document(doc)
+
+    def save_query(self, name: str, query: str) -> SavedQuery:
+        """
+        Validate and save a query, to be run later by name.
+
+        The bind vars declared by the query are recorded, so that they can be
+        checked without validating the query again each time it's run. Queries
+        estimated to be too expensive are rejected; a query with bind vars can only
+        be estimated once it's run with values for them.
+        """
+        if not valid_query_name.match(name):
+            raise InvalidName(name)
+
+        coll = self.saved_queries_collection()
+        if coll.has(name):
+            raise AlreadyExists("query", name)
+
+        parsed = _validate_aql_query(self.readonly_handle.aql, query)
+        saved = SavedQuery(
+            name=name, query=query, bind_vars=sorted(parsed.get("bind_vars", []))
+        )
+
+        if not saved.bind_vars:
+            admit_aql_query(self.readonly_handle, query)
+
+        coll.insert({"_key": name, "query": saved.query, "bind_vars": saved.bind_vars})
+        return saved
+
+    def delete_saved_query(self, name: str) -> None:
+        """Delete a saved query."""
+        coll = self.saved_queries_collection()
+        if not valid_query_name.match(name) or not coll.has(name):
+            raise NotFound("query", name)
+
+        coll.delete(name)
+
+    def run_saved_query(
+        self,
+        name: str,
+        bind_vars: Optional[Dict] = None,
+        options: Optional[AQLQueryOptions] = None,
+        cache: bool = False,
+    ) -> Iterable[Any]:
+        """
+        Run a saved query, with values for each of its bind vars.
+
+        The query isn't validated again, but its cost is checked again, since it
+        depends on the bind vars and on the data the query reads.
+        """
+        saved = self.saved_query(name)
+        bind_vars = bind_vars or {}
+
+        missing = [var for var in saved.bind_vars if var not in bind_vars]
+        if missing:
+            raise RequiredParamsMissing(missing)
+
+        for var in bind_vars:
+            if var not in saved.bind_vars:
+                raise BadQueryArgument("bind_vars", var)
+
+        return self.run_query(
+            saved.query,
+            bind_vars,
+            options=options,
+            cache=cache,
+            validate=False,
+            guard=True,
+        )
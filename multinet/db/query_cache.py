@@ -0,0 +1,298 @@
+"""A cache of AQL query results, invalidated by the revisions of what they read."""
+import os
+import re
+import time
+from threading import Lock
+from arango.database import StandardDatabase
+from arango.exceptions import ArangoServerError
+
+from multinet.cache import CacheInfo, TTLCache
+from multinet.db import _validate_aql_query
+
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generator,
+    Hashable,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+)
+
+Stamp = Tuple[Tuple[str, str], ...]
+
+# The number of query results held in the cache (0 disables it), and the number of
+# seconds a result is kept.
+AQL_CACHE_SIZE = int(os.getenv("AQL_CACHE_SIZE", "256"))
+AQL_CACHE_TTL = float(os.getenv("AQL_CACHE_TTL", "300"))
+
+# The number of seconds a cached result is served for before the revisions of the
+# collections it read are checked again
+AQL_CACHE_REVALIDATE = float(os.getenv("AQL_CACHE_REVALIDATE", "1"))
+
+# Results with more rows than this are streamed, rather than cached
+AQL_CACHE_MAX_ROWS = int(os.getenv("AQL_CACHE_MAX_ROWS", "10000"))
+
+# Functions whose results can change without any collection changing, or that read
+# collections that can't be known before the query runs
+uncacheable_functions = {
+    "APPLY",
+    "CALL",
+    "COLLECTIONS",
+    "COLLECTION_COUNT",
+    "CURRENT_DATABASE",
+    "CURRENT_USER",
+    "DATE_NOW",
+    "DOCUMENT",
+    "FAIL",
+    "RAND",
+    "RANDOM_TOKEN",
+    "SLEEP",
+    "UUID",
+    "V8",
+}
+
+# Traversals and path searches read vertex collections that aren't listed by the
+# parser. They're recognized by their node types in the parsed query, and by their
+# keywords in case the parser names a node type differently.
+traversal_node_types = {"traversal", "shortest path", "k shortest paths", "k paths"}
+traversal_pattern = re.compile(
+    r"\b(GRAPH|OUTBOUND|INBOUND|SHORTEST_PATH|K_SHORTEST_PATHS|K_PATHS)\b",
+    re.IGNORECASE,
+)
+
+
+class QueryPlan(NamedTuple):
+    """The collections a query reads, and whether its results can be cached."""
+
+    cacheable: bool
+    collections: Tuple[str, ...]
+    traversal: bool
+
+
+class CachedResult(NamedTuple):
+    """A query result, with the revisions of the collections it was read from."""
+
+    stamp: Stamp
+    checked: float
+    rows: List[Any]
+
+
+def _walk(node: Dict) -> Iterable[Dict]:
+    """Yield `node` and every node beneath it in a parsed query."""
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(node.get("subNodes", []))
+
+
+def _function_name(node: Dict) -> Optional[str]:
+    if node.get("type") == "function call":
+        return node.get("name", "").upper()
+    if node.get("type") == "user function call":
+        # User functions are assumed to be non-deterministic
+        return "CALL"
+
+    return None
+
+
+def _freeze(value: Any) -> Hashable:
+    """Convert a bind var value into a hashable equivalent."""
+    if isinstance(value, dict):
+        return ("dict", tuple(sorted((k, _freeze(v)) for k, v in value.items())))
+    if isinstance(value, list):
+        return ("list", tuple(_freeze(v) for v in value))
+
+    return value
+
+
+def plan_query(handle: StandardDatabase, query: str) -> QueryPlan:
+    """Parse `query`, and determine the collections it reads."""
+    parsed = _validate_aql_query(handle.aql, query)
+
+    functions: Set[str] = set()
+    traversal = bool(traversal_pattern.search(query))
+    for root in parsed.get("ast", []):
+        for node in _walk(root):
+            name = _function_name(node)
+            if name is not None:
+                functions.add(name)
+            if node.get("type") in traversal_node_types:
+                traversal = True
+
+    return QueryPlan(
+        cacheable=not functions & uncacheable_functions,
+        collections=tuple(sorted(parsed.get("collections", []))),
+        traversal=traversal,
+    )
+
+
+class QueryResultCache:
+    """
+    A bounded cache of AQL query results, keyed by database, query and bind vars.
+
+    Each result is stored with the revisions of the collections the query read. A
+    result is served without contacting the database for `revalidate` seconds after
+    it was last checked; after that, it's only served if those revisions haven't
+    changed.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, revalidate: float, max_rows: int):
+        """Create an empty cache."""
+        self.results = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.plans = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.revalidate = revalidate
+        self.max_rows = max_rows
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = Lock()
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def plan(self, handle: StandardDatabase, query: str) -> QueryPlan:
+        """Return the plan of `query`, parsing it on first use."""
+        key = (handle.name, query)
+        query_plan = self.plans.get(key)
+        if query_plan is None:
+            query_plan = plan_query(handle, query)
+            self.plans.set(key, query_plan)
+
+        return query_plan
+
+    def stamp(
+        self, handle: StandardDatabase, query_plan: QueryPlan, bind_vars: Dict
+    ) -> Optional[Stamp]:
+        """
+        Return the current revisions of the collections a query reads.
+
+        Returns None if they can't be read (e.g. if a collection doesn't exist).
+        """
+        names = set(query_plan.collections)
+
+        # Collections may also be passed as bind vars (e.g. `@@table`)
+        names.update(v for k, v in bind_vars.items() if k.startswith("@"))
+
+        try:
+            # The collections a traversal reads can't be known before it runs
+            if query_plan.traversal:
+                collections = handle.collections()
+                names.update(c["name"] for c in collections if not c["system"])
+
+            return tuple(
+                (name, handle.collection(name).revision()) for name in sorted(names)
+            )
+        except ArangoServerError:
+            return None
+
+    def get(
+        self,
+        handle: StandardDatabase,
+        key: Hashable,
+        query_plan: QueryPlan,
+        bind_vars: Dict,
+    ) -> Optional[List[Any]]:
+        """Return the cached rows for `key`, if they're still current."""
+        cached: Optional[CachedResult] = self.results.get(key)
+        if cached is None:
+            self._count(False)
+            return None
+
+        now = time.monotonic()
+        if now - cached.checked >= self.revalidate:
+            if self.stamp(handle, query_plan, bind_vars) != cached.stamp:
+                self.results.pop(key)
+                self._count(False)
+                return None
+
+            self.results.set(key, cached._replace(checked=now))
+
+        self._count(True)
+        return cached.rows
+
+    def run(
+        self,
+        handle: StandardDatabase,
+        query: str,
+        bind_vars: Optional[Dict[str, Any]],
+        execute: Callable[[], Iterable[Any]],
+        key_extra: Hashable = None,
+    ) -> Iterable[Any]:
+        """
+        Return the results of `query`, from the cache if possible.
+
+        On a miss, `execute` is called to run the query, and its results are
+        streamed. They're cached once they've all been read, if there are few
+        enough of them. `key_extra` holds anything else that affects the results,
+        such as a row cap.
+
+        The query is always validated here, so `execute` needn't validate it again.
+        """
+        query_plan = self.plan(handle, query)
+        if self.results.maxsize <= 0 or not query_plan.cacheable:
+            return execute()
+
+        bind_vars = bind_vars or {}
+        key = (handle.name, query, _freeze(bind_vars), key_extra)
+
+        rows = self.get(handle, key, query_plan, bind_vars)
+        if rows is not None:
+            return rows
+
+        # The revisions are read first, so a change made while the query runs only
+        # leads to the result being refreshed early
+        stamp = self.stamp(handle, query_plan, bind_vars)
+        if stamp is None:
+            return execute()
+
+        results = execute()
+        if getattr(results, "truncated", False):
+            # Truncated results are passed through, so the truncation is reported
+            return results
+
+        return self._fill(key, stamp, results)
+
+    def _fill(
+        self, key: Hashable, stamp: Stamp, results: Iterable[Any]
+    ) -> Generator[Any, None, None]:
+        """Yield `results`, caching them once they're all read, if they fit."""
+        rows: Optional[List[Any]] = []
+        for row in results:
+            if rows is not None:
+                rows.append(row)
+                if len(rows) > self.max_rows:
+                    rows = None
+
+            yield row
+
+        if rows is not None:
+            self.results.set(key, CachedResult(stamp, time.monotonic(), rows))
+
+    def clear(self) -> None:
+        """Discard every cached result."""
+        self.results.clear()
+        self.plans.clear()
+
+    def info(self) -> CacheInfo:
+        """Return statistics describing the use of the cache."""
+        results = self.results.info()
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, results.maxsize, results.currsize)
+
+
+query_cache = QueryResultCache(
+    maxsize=AQL_CACHE_SIZE,
+    ttl=AQL_CACHE_TTL,
+    revalidate=AQL_CACHE_REVALIDATE,
+    max_rows=AQL_CACHE_MAX_ROWS,
+)
@@ -0,0 +1,270 @@
+"""Multinet downloader for Arrow IPC and Parquet files."""
+import io
+import os
+import json
+import zipfile
+from datetime import datetime, timezone
+from flasgger import swag_from
+
+from multinet.db.models.table import Table
+from multinet.types import ColumnType
+from multinet.util import require_db, get_workspace, batched
+from multinet.errors import (
+    BadQueryArgument,
+    DependencyMissing,
+    NetworkNotFound,
+    NotFound,
+)
+
+from flask import Blueprint, Response
+
+# Import types
+from typing import IO, Any, Callable, Dict, Generator, List, Optional, Tuple, cast
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None  # type: ignore
+
+
+bp = Blueprint("download_arrow", __name__)
+bp.before_request(require_db)
+
+# The number of rows fetched from the database, and written as one record batch (or
+# Parquet row group), at a time
+ARROW_DOWNLOAD_BATCH_SIZE = int(os.getenv("ARROW_DOWNLOAD_BATCH_SIZE", "65536"))
+
+# The mimetype and file extension of each supported format
+file_formats = {
+    "arrow": ("application/vnd.apache.arrow.stream", "arrow"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+EntryConverter = Callable[[Any], Any]
+
+
+@bp.before_request
+def require_pyarrow() -> None:
+    """Ensure that pyarrow is installed."""
+    if pyarrow is None:
+        raise DependencyMissing("pyarrow")
+
+
+class ChunkSink(io.RawIOBase):
+    """A write-only, unseekable file whose contents are taken out in chunks."""
+
+    def __init__(self) -> None:
+        """Create an empty sink."""
+        self.chunks: List[bytes] = []
+        self.position = 0
+
+    def writable(self) -> bool:
+        """Indicate that this file can be written."""
+        return True
+
+    def write(self, data: Any) -> int:
+        """Append `data` to the sink."""
+        self.chunks.append(bytes(data))
+        self.position += len(self.chunks[-1])
+        return len(self.chunks[-1])
+
+    def tell(self) -> int:
+        """Return the number of bytes written so far."""
+        return self.position
+
+    def take(self) -> bytes:
+        """Remove and return everything written since the last call."""
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def to_float(entry: Any) -> Optional[float]:
+    """Convert an entry of a number column, or return None if it isn't a number."""
+    try:
+        return float(entry)
+    except (TypeError, ValueError):
+        return None
+
+
+def to_bool(entry: Any) -> Optional[bool]:
+    """Convert an entry of a boolean column, or return None if it isn't a boolean."""
+    return entry if isinstance(entry, bool) else None
+
+
+def to_datetime(entry: Any) -> Optional[datetime]:
+    """Convert an entry of a date column to a naive UTC datetime, if possible."""
+    try:
+        date = datetime.fromisoformat(entry)
+    except (TypeError, ValueError):
+        return None
+
+    if date.tzinfo is not None:
+        date = date.astimezone(timezone.utc).replace(tzinfo=None)
+
+    return date
+
+
+def to_string(entry: Any) -> Optional[str]:
+    """Convert an entry of any other column to a string, encoding non-strings."""
+    if entry is None or isinstance(entry, str):
+        return entry
+
+    return json.dumps(entry)
+
+
+def arrow_column(column_type: Optional[ColumnType]) -> Tuple[Any, EntryConverter]:
+    """Return the Arrow type for a column type, and the converter for its entries."""
+    if column_type == "number":
+        return (pyarrow.float64(), to_float)
+    if column_type == "boolean":
+        return (pyarrow.bool_(), to_bool)
+    if column_type == "date":
+        return (pyarrow.timestamp("us"), to_datetime)
+
+    return (pyarrow.string(), to_string)
+
+
+def write_table(
+    loaded_table: Table, file_format: str, sink: ChunkSink
+) -> Generator[None, None, None]:
+    """
+    Write a table to `sink` in `file_format`, typed according to its metadata.
+
+    The schema has a column for every field found on any row of the table, since
+    it can't change once writing has begun; rows without a field have a null entry.
+
+    Each batch of rows is written as it's read from the database; the generator
+    yields after each write, so that the sink can be emptied.
+
+    Entries that don't match the type of their column are written as nulls.
+    """
+    metadata = loaded_table.get_metadata().table
+    column_types: Dict[str, ColumnType] = (
+        {col.key: col.type for col in metadata.columns} if metadata else {}
+    )
+
+    keys = loaded_table.headers()
+    columns = [arrow_column(column_types.get(key)) for key in keys]
+    schema = pyarrow.schema(
+        [(key, arrow_type) for key, (arrow_type, _) in zip(keys, columns)]
+    )
+
+    if file_format == "parquet":
+        writer = pyarrow.parquet.ParquetWriter(sink, schema)
+    else:
+        writer = pyarrow.ipc.new_stream(sink, schema)
+
+    cursor = loaded_table.stream_rows(batch_size=ARROW_DOWNLOAD_BATCH_SIZE)
+    try:
+        for rows in batched(cursor, ARROW_DOWNLOAD_BATCH_SIZE):
+            arrays = [
+                pyarrow.array([convert(row.get(key)) for row in rows], type=arrow_type)
+                for key, (arrow_type, convert) in zip(keys, columns)
+            ]
+
+            batch = pyarrow.RecordBatch.from_arrays(arrays, schema=schema)
+            writer.write_table(pyarrow.Table.from_batches([batch]))
+            yield
+
+        writer.close()
+        yield
+    finally:
+        # Release the cursor on the server, in case the download was cut short
+        cursor.close(ignore_missing=True)
+
+
+def check_format(file_format: str) -> Tuple[str, str]:
+    """Return the mimetype and extension of `file_format`, if it's supported."""
+    if file_format not in file_formats:
+        raise BadQueryArgument("file_format", file_format)
+
+    return file_formats[file_format]
+
+
+@bp.route(
+    "/workspaces/<workspace>/tables/<table>/download/<file_format>", methods=["GET"]
+)
+@swag_from("swagger/arrow_table.yaml")
+def download_table(workspace: str, table: str, file_format: str) -> Any:
+    """
+    Download a table as an Arrow IPC stream, or a Parquet file.
+
+    `workspace` - the target workspace
+    `table` - the target table
+    `file_format` - either "arrow" or "parquet"
+    """
+    mimetype, extension = check_format(file_format)
+
+    loaded_workspace = get_workspace(workspace)
+    if not loaded_workspace.has_table(table):
+        raise NotFound("table", table)
+
+    loaded_table = loaded_workspace.table(table)
+
+    def table_generator() -> Generator[bytes, None, None]:
+        sink = ChunkSink()
+        for _ in write_table(loaded_table, file_format, sink):
+            data = sink.take()
+            if data:
+                yield data
+
+    response = Response(table_generator(), mimetype=mimetype)
+    response.headers[
+        "Content-Disposition"
+    ] = f"attachment; filename={table}.{extension}"
+
+    return response
+
+
+@bp.route(
+    "/workspaces/<workspace>/graphs/<graph>/download/<file_format>", methods=["GET"]
+)
+@swag_from("swagger/arrow_graph.yaml")
+def download_graph(workspace: str, graph: str, file_format: str) -> Any:
+    """
+    Download a graph as a zip archive of Arrow IPC streams, or Parquet files.
+
+    The archive holds a file for each node table under `nodes/`, and one for the
+    edge table under `edges/`.
+
+    `workspace` - the target workspace
+    `graph` - the target graph
+    `file_format` - either "arrow" or "parquet"
+    """
+    _, extension = check_format(file_format)
+
+    loaded_workspace = get_workspace(workspace)
+    if not loaded_workspace.has_graph(graph):
+        raise NetworkNotFound(workspace, graph)
+
+    loaded_graph = loaded_workspace.graph(graph)
+    entries = [("nodes", table) for table in loaded_graph.node_tables()]
+    entries.append(("edges", loaded_graph.edge_table()))
+
+    def graph_generator() -> Generator[bytes, None, None]:
+        sink = ChunkSink()
+
+        # Since the sink can't seek, each entry is written with a data descriptor
+        with zipfile.ZipFile(cast(IO[bytes], sink), "w") as archive:
+            for directory, table in entries:
+                table_sink = ChunkSink()
+                name = f"{directory}/{table}.{extension}"
+
+                with archive.open(name, "w", force_zip64=True) as entry:
+                    loaded_table = loaded_workspace.table(table)
+                    for _ in write_table(loaded_table, file_format, table_sink):
+                        entry.write(table_sink.take())
+
+                        data = sink.take()
+                        if data:
+                            yield data
+
+        yield sink.take()
+
+    response = Response(graph_generator(), mimetype="application/zip")
+    response.headers["Content-Disposition"] = f"attachment; filename={graph}.zip"
+
+    return response
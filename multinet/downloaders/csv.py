@@ -1,11 +1,12 @@
 """Multinet uploader for CSV files."""
 import csv
+import os
 from flasgger import swag_from
 from io import StringIO
 
-from multinet.util import require_db, generate_filtered_docs
+from multinet.util import require_db, get_workspace
+from multinet.compression import compress_response
 from multinet.errors import NotFound
-from multinet.db.models.workspace import Workspace
 
 from flask import Blueprint, Response
 
@@ -15,6 +16,13 @@ from typing import Any, Generator
 
 bp = Blueprint("download_csv", __name__)
 bp.before_request(require_db)
+bp.after_request(compress_response)
+
+# The number of rows fetched from the database at a time
+CSV_DOWNLOAD_BATCH_SIZE = int(os.getenv("CSV_DOWNLOAD_BATCH_SIZE", "1000"))
+
+# The number of characters of CSV data sent to the client at a time
+CSV_DOWNLOAD_CHUNK_SIZE = int(os.getenv("CSV_DOWNLOAD_CHUNK_SIZE", "65536"))
 
 
 @bp.route("/workspaces/<workspace>/tables/<table>/download", methods=["GET"])
@@ -26,26 +34,38 @@ def download(workspace: str, table: str) -> Any:
     `workspace` - the target workspace
     `table` - the target table
     """
-    loaded_workspace = Workspace(workspace)
+    loaded_workspace = get_workspace(workspace)
     if not loaded_workspace.has_table(table):
         raise NotFound("table", table)
 
     loaded_table = loaded_workspace.table(table)
-    table_rows = loaded_table.rows()["rows"]
+    table_rows = loaded_table.stream_rows(batch_size=CSV_DOWNLOAD_BATCH_SIZE)
 
     fields = loaded_table.headers()
 
     def csv_row_generator() -> Generator[str, None, None]:
-        header_line = StringIO()
-        writer = csv.DictWriter(header_line, fieldnames=fields)
-        writer.writeheader()
-        yield header_line.getvalue()
-
-        for csv_row in generate_filtered_docs(table_rows):
-            line = StringIO()
-            writer = csv.DictWriter(line, fieldnames=fields)
-            writer.writerow(csv_row)
-            yield line.getvalue()
+        buffer = StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=fields)
+
+        def flush() -> str:
+            data = buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            return data
+
+        try:
+            writer.writeheader()
+            yield flush()
+
+            for csv_row in table_rows:
+                writer.writerow(csv_row)
+                if buffer.tell() >= CSV_DOWNLOAD_CHUNK_SIZE:
+                    yield flush()
+
+            yield flush()
+        finally:
+            # Release the cursor on the server, in case the download was cut short
+            table_rows.close(ignore_missing=True)
 
     response = Response(csv_row_generator(), mimetype="text/csv")
     response.headers["Content-Disposition"] = f"attachment; filename={table}.csv"
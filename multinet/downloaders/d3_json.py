@@ -1,44 +1,75 @@
 """Multinet downloader for nested JSON files."""
+import os
 import re
-import json
 
 from flasgger import swag_from
 
 from multinet.db.models.workspace import Workspace
 from multinet.db.models.graph import Graph
-from multinet.util import require_db
+from multinet.util import require_db, get_workspace, batched, prefetch
+from multinet.compression import compress_response
+from multinet.serialization import get_encoder
 from multinet.errors import NetworkNotFound
 
 from flask import Blueprint, Response
 
 # Import types
-from typing import Any, Generator, List
+from typing import Any, Dict, Generator, List
 
 bp = Blueprint("download_d3_json", __name__)
 bp.before_request(require_db)
+bp.after_request(compress_response)
+
+# The number of nodes or links fetched from the database, and encoded, at a time
+D3_DOWNLOAD_BATCH_SIZE = int(os.getenv("D3_DOWNLOAD_BATCH_SIZE", "1000"))
+
+# The number of batches fetched ahead of the one being encoded
+D3_DOWNLOAD_PREFETCH = int(os.getenv("D3_DOWNLOAD_PREFETCH", "2"))
+
+
+def table_batches(
+    loaded_workspace: Workspace, table: str
+) -> Generator[List[Dict], None, None]:
+    """
+    Generate the rows of a table in batches.
+
+    The next batches are fetched on a background thread while each one is used.
+    """
+    cursor = loaded_workspace.table(table).stream_rows(
+        batch_size=D3_DOWNLOAD_BATCH_SIZE, exclude=[]
+    )
+
+    try:
+        yield from prefetch(
+            batched(cursor, D3_DOWNLOAD_BATCH_SIZE), maxsize=D3_DOWNLOAD_PREFETCH
+        )
+    finally:
+        # Release the cursor on the server, in case the download was cut short
+        cursor.close(ignore_missing=True)
 
 
 def node_generator(
     loaded_workspace: Workspace, loaded_graph: Graph
-) -> Generator[str, None, None]:
+) -> Generator[bytes, None, None]:
     """Generate the JSON list of nodes."""
 
-    comma = ""
+    encode = get_encoder()
+    comma = b""
     node_tables = loaded_graph.node_tables()
     for node_table in node_tables:
-        table_nodes = loaded_workspace.table(node_table).rows()["rows"]
+        for table_nodes in table_batches(loaded_workspace, node_table):
+            for node in table_nodes:
+                node["id"] = node["_key"]
+                del node["_key"]
 
-        for node in table_nodes:
-            node["id"] = node["_key"]
-            del node["_key"]
-
-            yield f"{comma}{json.dumps(node, separators=(',', ':'))}"
-            comma = comma or ","
+            # Strip the brackets from the encoded batch, leaving the nodes
+            yield comma + encode(table_nodes)[1:-1]
+            comma = b","
 
 
 def link_generator(
     loaded_workspace: Workspace, loaded_graph: Graph
-) -> Generator[str, None, None]:
+) -> Generator[bytes, None, None]:
     """Generate the JSON list of links."""
 
     # Checks for node tables that have a `_nodes` suffix.
@@ -48,27 +79,27 @@ def link_generator(
     # Done this way to preserve logic in the future case of multiple edge tables
     edge_tables: List[str] = [loaded_graph.edge_table()]
 
-    comma = ""
+    encode = get_encoder()
+    comma = b""
     for edge_table in edge_tables:
-        edges = loaded_workspace.table(edge_table).rows()["rows"]
-
-        for edge in edges:
-            source = edge["_from"]
-            target = edge["_to"]
-            source_match = table_nodes_pattern.search(source)
-            target_match = table_nodes_pattern.search(target)
+        for edges in table_batches(loaded_workspace, edge_table):
+            for edge in edges:
+                source = edge["_from"]
+                target = edge["_to"]
+                source_match = table_nodes_pattern.search(source)
+                target_match = table_nodes_pattern.search(target)
 
-            if source_match and target_match:
-                source = "".join(source_match.groups())
-                target = "".join(target_match.groups())
+                if source_match and target_match:
+                    source = "".join(source_match.groups())
+                    target = "".join(target_match.groups())
 
-            edge["source"] = source
-            edge["target"] = target
-            del edge["_from"]
-            del edge["_to"]
+                edge["source"] = source
+                edge["target"] = target
+                del edge["_from"]
+                del edge["_to"]
 
-            yield f"{comma}{json.dumps(edge, separators=(',', ':'))}"
-            comma = comma or ","
+            yield comma + encode(edges)[1:-1]
+            comma = b","
 
 
 @bp.route("/workspaces/<workspace>/graphs/<graph>/download", methods=["GET"])
@@ -80,18 +111,18 @@ def download(workspace: str, graph: str) -> Any:
     `graph` - the target graph
     """
 
-    loaded_workspace = Workspace(workspace)
+    loaded_workspace = get_workspace(workspace)
     if not loaded_workspace.has_graph(graph):
         raise NetworkNotFound(workspace, graph)
 
     loaded_graph = loaded_workspace.graph(graph)
 
-    def d3_json_generator() -> Generator[str, None, None]:
-        yield """{"nodes":["""
+    def d3_json_generator() -> Generator[bytes, None, None]:
+        yield b"""{"nodes":["""
         yield from node_generator(loaded_workspace, loaded_graph)
-        yield """],"links":["""
+        yield b"""],"links":["""
         yield from link_generator(loaded_workspace, loaded_graph)
-        yield "]}"
+        yield b"]}"
 
     response = Response(d3_json_generator(), mimetype="application/json")
     response.headers["Content-Disposition"] = f"attachment; filename={graph}.json"
@@ -208,6 +208,18 @@ class DatabaseNotLive(ServerError):
         return ("", "500 Database Not Live")
 
 
+class DependencyMissing(ServerError):
+    """Exception for using a feature whose optional dependency isn't installed."""
+
+    def __init__(self, package: str):
+        """Initialize the exception with the name of the missing package."""
+        self.package = package
+
+    def flask_response(self) -> FlaskTuple:
+        """Generate a 501 error."""
+        return (self.package, "501 Dependency Not Installed")
+
+
 class DecodeFailed(ServerError):
     """Exception for reporting decoding errors."""
 
@@ -256,6 +268,33 @@ class AQLExecutionError(ServerError):
         return (self.message, "400 Error during AQL Execution")
 
 
+class QueryTooExpensive(ServerError):
+    """Exception for aql queries whose estimated cost exceeds the server's limits."""
+
+    def __init__(
+        self,
+        estimated_cost: float,
+        max_estimated_cost: float,
+        full_scans: List[str],
+        max_full_scans: int,
+    ):
+        """Initialize the exception with the query's cost, and the limits it broke."""
+        self.estimated_cost = estimated_cost
+        self.max_estimated_cost = max_estimated_cost
+        self.full_scans = full_scans
+        self.max_full_scans = max_full_scans
+
+    def flask_response(self) -> FlaskTuple:
+        """Generate a 400 error describing the query's cost."""
+        payload = {
+            "estimated_cost": self.estimated_cost,
+            "max_estimated_cost": self.max_estimated_cost,
+            "full_scans": self.full_scans,
+            "max_full_scans": self.max_full_scans,
+        }
+        return (payload, "400 Query Too Expensive")
+
+
 class UploadNotFound(NotFound):
     """Exception for attempting to upload a chunk to a nonexistant upload collection."""
 
@@ -1,88 +1,102 @@
 """Functions for processing multinet data."""
 from multinet.validation import ValidationFailure, TypeConversionFailure, MissingColumn
 from multinet.processing.processors import (
-    process_number_entry,
-    process_boolean_entry,
-    process_date_entry,
+    process_number_column,
+    process_boolean_column,
+    process_date_column,
 )
 from multinet.types import ColumnMetadata
 from multinet.processing.types import (
     UnprocessedTableRow,
     ProcessedTableRow,
-    TableRowEntryProcessor,
+    TableColumnProcessor,
 )
 
 # Import types
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
 
 
-# Maps types to the functions responsible for processing their entries
-entry_processing_dict: Dict[str, TableRowEntryProcessor] = {
-    "number": process_number_entry,
-    "boolean": process_boolean_entry,
-    "date": process_date_entry,
+# Maps types to the functions responsible for processing whole columns of entries
+column_processing_dict: Dict[str, TableColumnProcessor] = {
+    "number": process_number_column,
+    "boolean": process_boolean_column,
+    "date": process_date_column,
 }
 
 
-def process_row(
-    row_index: int, row: UnprocessedTableRow, columns: List[ColumnMetadata]
-) -> Tuple[ProcessedTableRow, List[ValidationFailure]]:
-    """Process a single row, returning the processed row, and any errors."""
-    validation_errors: List[ValidationFailure] = []
-
-    # Copy row
-    new_row: ProcessedTableRow = dict(row)
+def process_rows(
+    initial_rows: List[UnprocessedTableRow],
+    col_metadata: List[ColumnMetadata],
+    start: int = 0,
+) -> Tuple[List[ProcessedTableRow], List[ValidationFailure]]:
+    """
+    Perform any processing of table rows with the supplied metadata.
 
-    for col in columns:
-        entry = row.get(col.key)
+    Rows are processed a column at a time. Errors are reported in row order, then
+    column order, as if each row had been processed in turn.
 
-        # If any of the following conditions are met, skip processing the entry
-        if entry is None:
-            validation_errors.append(MissingColumn(key=col.key))
-            continue
+    `start` is the index of the first of `initial_rows` within the whole table, so
+    that errors are reported with the correct row when processing in batches.
+    """
+    # Copy rows to ensure consistent behavior, even if no change is applied
+    rows: List[ProcessedTableRow] = [dict(row) for row in initial_rows]
+    if not col_metadata or not initial_rows:
+        return (rows, [])
 
-        process_entry = entry_processing_dict.get(col.type)
-        if process_entry is None:
-            # This happens on any type not defined in `entry_processing_dict`
-            # E.g. label, category
+    # Each error is stored along with its row and column position, for sorting
+    located_errors: List[Tuple[int, int, ValidationFailure]] = []
+
+    for col_index, col in enumerate(col_metadata):
+        process_column: Optional[TableColumnProcessor] = column_processing_dict.get(
+            col.type
+        )
+
+        # The non-empty entries of this column, and the rows they belong to
+        entries: List[str] = []
+        positions: List[int] = []
+
+        for i, row in enumerate(initial_rows):
+            entry = row.get(col.key)
+
+            if entry is None:
+                located_errors.append((i, col_index, MissingColumn(key=col.key)))
+            elif process_column is None:
+                # This happens on any type not defined in `column_processing_dict`
+                # E.g. label, category
+                continue
+            elif entry:
+                entries.append(entry)
+                positions.append(i)
+            else:
+                # If the entry is an empty string, replace with None (null)
+                rows[i][col.key] = None
+
+        if process_column is None or not entries:
             continue
 
-        # Attempt normal entry processing
-        try:
-            # If the entry is an empty string, replace with None (null)
-            processed_entry = process_entry(entry) if entry else None
-
-            # Processing successful, update row entry with its new value
-            new_row[col.key] = processed_entry
-        except ValueError:
-            # Error in processing entry. Add error, leave entry unchanged
-            validation_errors.append(
-                TypeConversionFailure(
-                    message=f"Cannot convert entry '{entry}' to type: {col.type}",
-                    row=row_index,
-                    column=col.key,
+        # Entries that fail processing are left unchanged
+        processed, failed = process_column(entries)
+        unchanged = set(failed)
+        for index, (i, processed_entry) in enumerate(zip(positions, processed)):
+            if index not in unchanged:
+                rows[i][col.key] = processed_entry
+
+        for index in failed:
+            i = positions[index]
+            located_errors.append(
+                (
+                    i,
+                    col_index,
+                    TypeConversionFailure(
+                        message=(
+                            f"Cannot convert entry '{entries[index]}' to type: "
+                            f"{col.type}"
+                        ),
+                        row=start + i,
+                        column=col.key,
+                    ),
                 )
             )
 
-    return (new_row, validation_errors)
-
-
-def process_rows(
-    initial_rows: List[UnprocessedTableRow], col_metadata: List[ColumnMetadata]
-) -> Tuple[List[ProcessedTableRow], List[ValidationFailure]]:
-    """Perform any processing of table rows with the supplied metadata."""
-    if not col_metadata or not initial_rows:
-        # Copy rows to ensure consistent behavior, no change applied
-        rows: List[ProcessedTableRow] = [dict(row) for row in initial_rows]
-        return (rows, [])
-
-    rows = []
-    validation_errors: List[ValidationFailure] = []
-
-    for i, init_row in enumerate(initial_rows):
-        row, errors = process_row(i, init_row, col_metadata)
-
-        rows.append(row)
-        validation_errors.extend(errors)
-
-    return (rows, validation_errors)
+    located_errors.sort(key=lambda located: located[:2])
+    return (rows, [error for _, _, error in located_errors])
@@ -0,0 +1,113 @@
+"""Processing and validation of large uploads across a pool of worker processes."""
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from multinet.processing import process_rows
+from multinet.processing.types import UnprocessedTableRow, ProcessedTableRow
+from multinet.types import ColumnMetadata
+from multinet.validation import ValidationFailure
+from multinet.validation.csv import validate_edge_table, validate_unique_keys
+
+from typing import List, Optional, Set, Tuple
+
+# The number of worker processes used to process uploads. Parallel processing is
+# disabled if this is 0.
+UPLOAD_WORKER_PROCESSES = int(os.getenv("UPLOAD_WORKER_PROCESSES", "0"))
+
+# The number of rows sent to a worker process at a time
+UPLOAD_WORKER_CHUNK_SIZE = int(os.getenv("UPLOAD_WORKER_CHUNK_SIZE", "1000"))
+
+ProcessedBatch = Tuple[
+    List[ProcessedTableRow], List[ValidationFailure], List[ValidationFailure]
+]
+
+
+# The pool is started on first use, and shared by every upload in the process
+@lru_cache(maxsize=1)
+def upload_executor() -> Optional[ProcessPoolExecutor]:
+    """Return the pool of upload worker processes, if parallel processing is on."""
+    if UPLOAD_WORKER_PROCESSES <= 0:
+        return None
+
+    # Workers are spawned rather than forked, since the server process may be
+    # running other threads (and holding open connections) when the pool starts
+    return ProcessPoolExecutor(
+        max_workers=UPLOAD_WORKER_PROCESSES,
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+
+
+def process_chunk(
+    rows: List[UnprocessedTableRow],
+    columns: List[ColumnMetadata],
+    edge: bool,
+    start: int,
+) -> ProcessedBatch:
+    """
+    Process and validate a chunk of rows that can be checked independently.
+
+    Returns the processed rows, any processing errors, and (if `edge` is true) any
+    errors from validating the rows as edges.
+    """
+    processed, processing_errors = process_rows(rows, columns, start)
+    validation_errors = validate_edge_table(processed, start) if edge else []
+
+    return (processed, processing_errors, validation_errors)
+
+
+def process_table_batch(
+    rows: List[UnprocessedTableRow],
+    columns: List[ColumnMetadata],
+    key_field: str,
+    edge: bool,
+    start: int,
+    unique_keys: Set[str],
+    validate: bool = True,
+) -> ProcessedBatch:
+    """
+    Process and validate a batch of table rows, in parallel if enabled.
+
+    The batch is split into chunks that are processed by the worker pool, and the
+    results are merged in order, so that they're identical to processing the batch
+    in one go. `start` is the index of the first row of the batch within the whole
+    table, and `unique_keys` holds the keys seen in previous batches.
+
+    If `validate` is false, the rows are processed but not validated.
+    """
+    executor = upload_executor()
+    check_edges = validate and edge
+
+    if executor is None or len(rows) <= UPLOAD_WORKER_CHUNK_SIZE:
+        results = [process_chunk(rows, columns, check_edges, start)]
+    else:
+        chunk_size = UPLOAD_WORKER_CHUNK_SIZE
+        futures = [
+            executor.submit(
+                process_chunk,
+                rows[i : i + chunk_size],
+                columns,
+                check_edges,
+                start + i,
+            )
+            for i in range(0, len(rows), chunk_size)
+        ]
+        results = [future.result() for future in futures]
+
+    processed: List[ProcessedTableRow] = []
+    processing_errors: List[ValidationFailure] = []
+    validation_errors: List[ValidationFailure] = []
+
+    for chunk_rows, chunk_processing_errors, chunk_validation_errors in results:
+        processed.extend(chunk_rows)
+        processing_errors.extend(chunk_processing_errors)
+        validation_errors.extend(chunk_validation_errors)
+
+    # Duplicate keys may span chunks, so they're checked once the chunks are merged
+    if validate and not edge:
+        validation_errors.extend(
+            validate_unique_keys(processed, key_field, unique_keys)
+        )
+
+    return (processed, processing_errors, validation_errors)
@@ -1,43 +1,62 @@
 """Functions that process raw table entries."""
-import json
 from dateutil import parser as dateutilparser
 from datetime import datetime
 
+from multinet.processing.types import TableRowEntry, TableRowEntryProcessor
+
 # Import types
-from typing import Optional, Union
+from typing import Callable, Dict, List, Optional, Tuple, Union, cast
 
+DateParser = Callable[[str], datetime]
 
-def process_boolean_entry(entry: str) -> bool:
-    """Try to determine base format of boolean so it can be converted properly."""
 
-    def from_int(x: str) -> Optional[bool]:
-        if x == "0" or x == "1":
-            return bool(int(x))
-        return None
+# Every accepted spelling of a boolean (integer, JSON and YAML style)
+boolean_entries: Dict[str, bool] = {
+    "0": False,
+    "1": True,
+    "false": False,
+    "true": True,
+    "no": False,
+    "off": False,
+    "yes": True,
+    "on": True,
+}
 
-    def from_json_bool(x: str) -> Optional[bool]:
-        if x == "true" or x == "false":
-            return json.loads(x)
-        return None
+# Formats that a column of dates may be inferred to have. These are only ever used if
+# they read a sample of the column exactly as dateutil does.
+date_formats = [
+    "%Y-%m-%d",
+    "%Y-%m-%d %H:%M",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%d %H:%M:%S.%f",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y-%m-%dT%H:%M:%S.%f",
+    "%Y/%m/%d",
+    "%Y/%m/%d %H:%M:%S",
+    "%m/%d/%Y",
+    "%m/%d/%Y %H:%M",
+    "%m/%d/%Y %H:%M:%S",
+    "%b %d %Y",
+    "%b %d, %Y",
+    "%d %b %Y",
+    "%B %d, %Y",
+    "%d %B %Y",
+]
 
-    def from_yaml_bool(x: str) -> Optional[bool]:
-        if x == "no" or x == "off":
-            return False
-        if x == "yes" or x == "on":
-            return True
+# The number of distinct dates used to infer the format of a column
+DATE_FORMAT_SAMPLE_SIZE = 100
 
-        return None
+# Stand in for entries that are unconverted, or that fail conversion
+_missing = object()
+_failed = object()
 
-    def cast_col_entry(x: str) -> bool:
-        casters = [from_int, from_json_bool, from_yaml_bool]
-        for caster in casters:
-            cast_row = caster(x)
-            if cast_row is not None:
-                return cast_row
 
-        raise ValueError
-
-    return cast_col_entry(entry)
+def process_boolean_entry(entry: str) -> bool:
+    """Try to determine base format of boolean so it can be converted properly."""
+    try:
+        return boolean_entries[entry]
+    except KeyError:
+        raise ValueError(f"Not a boolean: {entry}")
 
 
 def process_date_entry(entry: str) -> str:
@@ -51,9 +70,133 @@ def process_date_entry(entry: str) -> str:
         return dateutilparser.parse(entry).isoformat()
 
 
+def strptime_parser(date_format: str) -> DateParser:
+    """Return a function that parses dates in `date_format`."""
+
+    def parse(entry: str) -> datetime:
+        return datetime.strptime(entry, date_format)
+
+    return parse
+
+
+def infer_date_format(sample: List[str]) -> Optional[DateParser]:
+    """
+    Infer the format of the dates in `sample`.
+
+    Returns a parser that reads every entry of `sample` just as dateutil does, or
+    None if no known format does.
+    """
+    expected: Dict[str, datetime] = {}
+    for entry in sample:
+        try:
+            expected[entry] = dateutilparser.parse(entry)
+        except (ValueError, OverflowError):
+            # Entries dateutil can't read are errors regardless of format
+            continue
+
+    if not expected:
+        return None
+
+    candidates = [datetime.fromisoformat] + [strptime_parser(f) for f in date_formats]
+    for parse in candidates:
+        try:
+            if all(parse(entry) == date for entry, date in expected.items()):
+                return parse
+        except ValueError:
+            continue
+
+    return None
+
+
 def process_number_entry(entry: str) -> Union[int, float]:
     """Try to read a number from a given string."""
     try:
         return int(entry)
     except ValueError:
         return float(entry)
+
+
+def process_entries(
+    process_entry: TableRowEntryProcessor, entries: List[str]
+) -> Tuple[List[TableRowEntry], List[int]]:
+    """
+    Convert a column of entries with `process_entry`.
+
+    Each distinct entry is only converted once, so columns with repeated values
+    (e.g. dates or categories) are converted through a lookup table.
+    """
+    memo: Dict[str, object] = {}
+    processed: List[TableRowEntry] = []
+    failed: List[int] = []
+
+    for i, entry in enumerate(entries):
+        value = memo.get(entry, _missing)
+        if value is _missing:
+            try:
+                value = process_entry(entry)
+            except ValueError:
+                value = _failed
+
+            memo[entry] = value
+
+        if value is _failed:
+            failed.append(i)
+            processed.append(entry)
+        else:
+            processed.append(cast(TableRowEntry, value))
+
+    return (processed, failed)
+
+
+def process_boolean_column(entries: List[str]) -> Tuple[List[TableRowEntry], List[int]]:
+    """Convert a column of booleans by looking up each entry."""
+    lookup = boolean_entries.get
+    processed: List[TableRowEntry] = [lookup(entry, entry) for entry in entries]
+    failed = [i for i, entry in enumerate(entries) if entry not in boolean_entries]
+
+    return (processed, failed)
+
+
+def process_date_column(entries: List[str]) -> Tuple[List[TableRowEntry], List[int]]:
+    """
+    Convert a column of dates to ISO 8601 strings.
+
+    The format of the column is inferred from a sample of its dates, so that most
+    entries can be read with a fast, fixed-format parser. Entries that don't match
+    the format fall back to the same handling as `process_date_entry`.
+    """
+    sample: Dict[str, None] = {}
+    for entry in entries:
+        if len(sample) >= DATE_FORMAT_SAMPLE_SIZE:
+            break
+
+        try:
+            float(entry)
+        except ValueError:
+            sample[entry] = None
+
+    parse_date = infer_date_format(list(sample))
+    if parse_date is None:
+        return process_entries(process_date_entry, entries)
+
+    def process_entry(entry: str) -> str:
+        try:
+            return datetime.fromtimestamp(float(entry)).isoformat()
+        except ValueError:
+            pass
+
+        try:
+            return parse_date(entry).isoformat()
+        except ValueError:
+            return dateutilparser.parse(entry).isoformat()
+
+    return process_entries(process_entry, entries)
+
+
+def process_number_column(entries: List[str]) -> Tuple[List[TableRowEntry], List[int]]:
+    """Convert a column of numbers, keeping integers as integers."""
+    # Most numeric columns are entirely integers, which can be converted in one pass
+    try:
+        return (list(map(int, entries)), [])
+    except ValueError:
+        return process_entries(process_number_entry, entries)
@@ -1,7 +1,11 @@
 """Types used when processing multinet data."""
-from typing import Dict, Callable, Union, Optional
+from typing import Dict, Callable, List, Tuple, Union, Optional
 
 TableRowEntry = Optional[Union[str, float, int, bool]]
 TableRowEntryProcessor = Callable[[str], TableRowEntry]
 UnprocessedTableRow = Dict[str, str]
 ProcessedTableRow = Dict[str, TableRowEntry]
+
+# Converts a column of entries, returning the converted entries and the indices of
+# any that couldn't be converted (which are returned unchanged)
+TableColumnProcessor = Callable[[List[str]], Tuple[List[TableRowEntry], List[int]]]
@@ -0,0 +1,128 @@
+"""JSON encoding of streamed responses, using a fast encoder where one is installed."""
+import os
+import json
+import math
+import itertools
+
+from multinet.errors import DependencyMissing
+
+from typing import Any, Callable, Dict, Generator, Iterable, Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore
+
+# The encoder used for JSON responses: "json", "orjson", or "auto" to use orjson if
+# it's installed
+JSON_ENCODER = os.getenv("JSON_ENCODER", "auto")
+
+# The number of bytes of JSON collected into each chunk of a streamed response
+JSON_STREAM_BUFFER_SIZE = int(os.getenv("JSON_STREAM_BUFFER_SIZE", "65536"))
+
+# The number of rows encoded at a time. Encoding a list of rows in one call is much
+# faster than encoding each row separately.
+JSON_ENCODE_BATCH_SIZE = int(os.getenv("JSON_ENCODE_BATCH_SIZE", "256"))
+
+Encoder = Callable[[Any], bytes]
+
+
+def finite(value: Any) -> Any:
+    """Return a copy of `value` with each NaN or infinite float replaced by None."""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {k: finite(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [finite(v) for v in value]
+
+    return value
+
+
+def stdlib_dumps(value: Any) -> bytes:
+    """
+    Encode `value` as compact JSON with the standard library.
+
+    NaN and infinite floats, which JSON can't represent, are encoded as null, as
+    orjson encodes them.
+    """
+    try:
+        encoded = json.dumps(
+            value, separators=(",", ":"), ensure_ascii=False, allow_nan=False
+        )
+    except ValueError:
+        encoded = json.dumps(finite(value), separators=(",", ":"), ensure_ascii=False)
+
+    return encoded.encode()
+
+
+def orjson_dumps(value: Any) -> bytes:
+    """Encode `value` as JSON with orjson."""
+    try:
+        return orjson.dumps(value)
+    except TypeError:
+        # orjson rejects some values the standard library accepts, such as integers
+        # wider than 64 bits
+        return stdlib_dumps(value)
+
+
+# The available encoders, by name. Other encoders can be added here.
+encoders: Dict[str, Encoder] = {"json": stdlib_dumps}
+if orjson is not None:
+    encoders["orjson"] = orjson_dumps
+
+
+def get_encoder(name: Optional[str] = None) -> Encoder:
+    """Return the named encoder, or the configured one if `name` isn't given."""
+    name = name or JSON_ENCODER
+    if name == "auto":
+        name = "orjson" if "orjson" in encoders else "json"
+
+    if name not in encoders:
+        raise DependencyMissing(name)
+
+    return encoders[name]
+
+
+def dumps(value: Any) -> bytes:
+    """Encode `value` as JSON with the configured encoder."""
+    return get_encoder()(value)
+
+
+def encode_json_list(
+    iterable: Iterable[Any],
+    encoder: Optional[Encoder] = None,
+    buffer_size: Optional[int] = None,
+) -> Generator[bytes, None, None]:
+    """
+    Encode the items of `iterable` as a JSON list, yielding it in large chunks.
+
+    Items are encoded in batches, and the output is collected until it reaches
+    `buffer_size` bytes, so that a long stream is sent in few chunks rather than
+    one per item. The first batch is yielded as soon as it's encoded, so that the
+    start of the list isn't held back.
+    """
+    encode = encoder or get_encoder()
+    size = buffer_size or JSON_STREAM_BUFFER_SIZE
+
+    iterator = iter(iterable)
+    buffer = bytearray(b"[")
+    separator = b""
+
+    while True:
+        batch = list(itertools.islice(iterator, JSON_ENCODE_BATCH_SIZE))
+        if not batch:
+            break
+
+        # Strip the brackets from the encoded batch, leaving the items
+        first = not separator
+        buffer += separator
+        buffer += encode(batch)[1:-1]
+        separator = b","
+
+        if first or len(buffer) >= size:
+            yield bytes(buffer)
+            buffer.clear()
+
+    buffer += b"]"
+    yield bytes(buffer)
@@ -1,2 +1,2 @@
 """Uploader blueprints for various filetypes."""
-from . import csv, nested_json, newick, d3_json, multipart_upload  # noqa: F401
+from . import csv, nested_json, newick, d3_json, multipart_upload, arrow  # noqa: F401
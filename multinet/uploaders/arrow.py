@@ -0,0 +1,262 @@
+"""Multinet uploader for Parquet and Arrow IPC files."""
+import os
+import math
+import base64
+import shutil
+import tempfile
+from datetime import date, datetime, time
+from decimal import Decimal
+from flasgger import swag_from
+
+from multinet import util
+from multinet.db.models.table import Table
+from multinet.auth.util import require_writer
+from multinet.errors import (
+    AlreadyExists,
+    DependencyMissing,
+    FlaskTuple,
+    ServerError,
+    ValidationFailed,
+)
+from multinet.types import ColumnMetadata, ColumnType, TableMetadata
+from multinet.validation import ValidationFailure
+from multinet.validation.csv import (
+    MissingBody,
+    has_edge_fields,
+    validate_csv_header,
+    validate_csv_batch,
+)
+
+from flask import Blueprint, request
+from flask import current_app as app
+from webargs import fields as webarg_fields
+from webargs.flaskparser import use_kwargs
+
+# Import types
+from typing import IO, Any, Dict, Iterator, List, Optional, Set
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+    import pyarrow.types
+except ImportError:
+    pyarrow = None  # type: ignore
+
+
+bp = Blueprint("arrow", __name__)
+bp.before_request(util.require_db)
+
+# The number of rows read from a Parquet file, and inserted, at a time
+ARROW_UPLOAD_BATCH_SIZE = int(os.getenv("ARROW_UPLOAD_BATCH_SIZE", "65536"))
+
+# The magic bytes at the start of each supported file format
+PARQUET_MAGIC = b"PAR1"
+ARROW_FILE_MAGIC = b"ARROW1"
+
+
+class ArrowReadError(ServerError):
+    """Exception for unreadable Parquet or Arrow data."""
+
+    def flask_response(self) -> FlaskTuple:
+        """Generate a 415 error for the read failure."""
+        return ("Could not read Parquet or Arrow data", "415 Unsupported Media Type")
+
+
+@bp.before_request
+def require_pyarrow() -> None:
+    """Ensure that pyarrow is installed."""
+    if pyarrow is None:
+        raise DependencyMissing("pyarrow")
+
+
+def column_type(arrow_type: Any) -> Optional[ColumnType]:
+    """Return the column type matching an Arrow type, if there is one."""
+    types = pyarrow.types
+
+    if types.is_boolean(arrow_type):
+        return "boolean"
+    if types.is_integer(arrow_type) or types.is_floating(arrow_type):
+        return "number"
+    if types.is_decimal(arrow_type):
+        return "number"
+    if types.is_timestamp(arrow_type) or types.is_date(arrow_type):
+        return "date"
+    if types.is_dictionary(arrow_type):
+        return "category"
+
+    return None
+
+
+def table_metadata(schema: Any) -> TableMetadata:
+    """Return the table metadata describing the columns of an Arrow schema."""
+    columns = []
+    for field in schema:
+        col_type = column_type(field.type)
+        if col_type is not None:
+            columns.append(ColumnMetadata(key=field.name, type=col_type))
+
+    return TableMetadata(columns=columns)
+
+
+def document_value(value: Any) -> Any:
+    """Convert a value read from Arrow data into one that can be stored as JSON."""
+    if isinstance(value, float):
+        # JSON has no representation of NaN or infinity
+        return value if math.isfinite(value) else None
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return document_value(float(value))
+    if isinstance(value, bytes):
+        return base64.b64encode(value).decode()
+    if isinstance(value, dict):
+        return {k: document_value(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        # Map entries are read as (key, value) tuples
+        return [document_value(v) for v in value]
+
+    return value
+
+
+def needs_conversion(arrow_type: Any) -> bool:
+    """Indicate whether values of an Arrow type need converting to be stored."""
+    types = pyarrow.types
+    if types.is_dictionary(arrow_type):
+        return needs_conversion(arrow_type.value_type)
+
+    return not (
+        types.is_boolean(arrow_type)
+        or types.is_integer(arrow_type)
+        or types.is_string(arrow_type)
+        or types.is_large_string(arrow_type)
+    )
+
+
+def read_batches(body: IO[bytes]) -> Iterator[Any]:
+    """Return an iterator of the record batches in Parquet or Arrow (IPC) data."""
+    magic = body.read(len(ARROW_FILE_MAGIC))
+    body.seek(0)
+
+    if magic.startswith(PARQUET_MAGIC):
+        parquet_file = pyarrow.parquet.ParquetFile(body)
+        return parquet_file.iter_batches(batch_size=ARROW_UPLOAD_BATCH_SIZE)
+
+    if magic == ARROW_FILE_MAGIC:
+        reader = pyarrow.ipc.open_file(body)
+        return (reader.get_batch(i) for i in range(reader.num_record_batches))
+
+    return iter(pyarrow.ipc.open_stream(body))
+
+
+def batch_rows(batch: Any, key: str) -> List[Dict]:
+    """Convert a record batch into table rows, setting `_key` from `key`."""
+    rows = batch.to_pylist()
+
+    converted = [f.name for f in batch.schema if needs_conversion(f.type)]
+    for row in rows:
+        for name in converted:
+            row[name] = document_value(row[name])
+
+        # Keys are always strings, whatever the type of the key column
+        if row.get(key) is not None:
+            row["_key"] = str(row[key])
+
+    return rows
+
+
+@bp.route("/<workspace>/<table>", methods=["POST"])
+@use_kwargs(
+    {
+        "key": webarg_fields.Str(location="query"),
+        "overwrite": webarg_fields.Bool(location="query"),
+    }
+)
+@require_writer
+@swag_from("swagger/arrow.yaml")
+def upload(
+    workspace: str, table: str, key: str = "_key", overwrite: bool = False
+) -> Any:
+    """
+    Store a Parquet or Arrow IPC file into the database as a node or edge table.
+
+    The table metadata is set from the types of the file's columns, and values are
+    stored as they're typed in the file, without further processing.
+
+    `workspace` - the target workspace
+    `table` - the target table
+    `data` - the Parquet or Arrow data, passed in the request body. If the data
+             contains `_from` and `_to` columns, it will be treated as an edge table.
+    """
+    loaded_workspace = util.get_workspace(workspace)
+
+    if loaded_workspace.has_table(table):
+        raise AlreadyExists("table", table)
+
+    app.logger.info("Bulk Loading")
+
+    loaded_table: Optional[Table] = None
+    count = 0
+    rows_read = 0
+    unique_keys: Set[str] = set()
+    validation_errors: List[ValidationFailure] = []
+
+    def discard_table() -> None:
+        if loaded_table is not None:
+            loaded_workspace.delete_table(table)
+
+    # Parquet files are read from the end, so the body is spooled to a file first
+    with tempfile.TemporaryFile() as body:
+        shutil.copyfileobj(request.stream, body)
+        if not body.tell():
+            raise ValidationFailed(errors=[MissingBody()])
+
+        body.seek(0)
+
+        try:
+            batches = read_batches(body)
+            schema = None
+            edge = False
+
+            for batch in batches:
+                if schema is None:
+                    schema = batch.schema
+                    edge = has_edge_fields(schema.names)
+                    validation_errors = validate_csv_header(
+                        schema.names, key, overwrite
+                    )
+                    if validation_errors:
+                        break
+
+                rows = batch_rows(batch, key)
+                validation_errors.extend(
+                    validate_csv_batch(rows, key, edge, rows_read, unique_keys)
+                )
+                rows_read += len(rows)
+
+                # Once any error has been found, keep going so that every error in
+                # the file is reported, but stop inserting data
+                if validation_errors or not rows:
+                    continue
+
+                # Create table and set its metadata once the first batch is validated
+                if loaded_table is None:
+                    loaded_table = loaded_workspace.create_table(table, edge=edge)
+                    loaded_table.set_metadata(table_metadata(schema).dict())
+
+                count += loaded_table.insert(rows).created
+        except pyarrow.ArrowException:
+            discard_table()
+            raise ArrowReadError()
+        except Exception:
+            discard_table()
+            raise
+
+    if not rows_read and not validation_errors:
+        validation_errors = [MissingBody()]
+
+    if validation_errors:
+        discard_table()
+        raise ValidationFailed(errors=validation_errors)
+
+    return {"count": count}
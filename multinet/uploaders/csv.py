@@ -1,12 +1,11 @@
 """Multinet uploader for CSV files."""
 import csv
 import json
+import os
 from flasgger import swag_from
-from io import StringIO
 
 from multinet import util
-from multinet.db.models.workspace import Workspace
-from multinet.db.models.table import table_metadata_from_dict
+from multinet.db.models.table import Table, table_metadata_from_dict
 from multinet.auth.util import require_writer
 from multinet.errors import (
     AlreadyExists,
@@ -16,9 +15,14 @@ from multinet.errors import (
     ValidationFailed,
 )
 from multinet.util import decode_data
-from multinet.processing import process_rows
-from multinet.processing.types import UnprocessedTableRow, ProcessedTableRow
-from multinet.validation.csv import validate_csv, is_edge_table
+from multinet.processing.parallel import process_table_batch
+from multinet.processing.types import ProcessedTableRow
+from multinet.validation import ValidationFailure
+from multinet.validation.csv import (
+    MissingBody,
+    has_edge_fields,
+    validate_csv_header,
+)
 
 from flask import Blueprint, request
 from flask import current_app as app
@@ -26,12 +30,15 @@ from webargs import fields as webarg_fields
 from webargs.flaskparser import use_kwargs
 
 # Import types
-from typing import Any, List, Optional
+from typing import Any, List, Optional, Set
 
 
 bp = Blueprint("csv", __name__)
 bp.before_request(util.require_db)
 
+# The number of rows processed, validated and inserted at a time
+CSV_UPLOAD_BATCH_SIZE = int(os.getenv("CSV_UPLOAD_BATCH_SIZE", "5000"))
+
 
 class CSVReadError(ServerError):
     """Exception for unprocessable CSV data."""
@@ -42,14 +49,11 @@ class CSVReadError(ServerError):
 
 
 def set_table_key(rows: List[ProcessedTableRow], key: str) -> List[ProcessedTableRow]:
-    """Update the _key field in each row."""
-    new_rows: List[ProcessedTableRow] = []
+    """Update the _key field in each row, in place."""
     for row in rows:
-        new_row = dict(row)
-        new_row["_key"] = new_row[key]
-        new_rows.append(new_row)
+        row["_key"] = row[key]
 
-    return new_rows
+    return rows
 
 
 @bp.route("/<workspace>/<table>", methods=["POST"])
@@ -77,22 +81,13 @@ def upload(
     `data` - the CSV data, passed in the request body. If the CSV data contains
              `_from` and `_to` fields, it will be treated as an edge table.
     """
-    loaded_workspace = Workspace(workspace)
+    loaded_workspace = util.get_workspace(workspace)
 
     if loaded_workspace.has_table(table):
         raise AlreadyExists("table", table)
 
     app.logger.info("Bulk Loading")
 
-    # Read the request body into CSV format
-    body = decode_data(request.data)
-
-    try:
-        # Type to a Dict rather than an OrderedDict
-        csv_rows: List[UnprocessedTableRow] = list(csv.DictReader(StringIO(body)))
-    except csv.Error:
-        raise CSVReadError()
-
     # TODO: This temporarily needs to be done here, so that validation of the metadata
     # can be done before the table is actually created. Once the API is updated, this
     # will change.
@@ -105,28 +100,83 @@ def upload(
             raise BadQueryArgument("metadata", metadata)
 
     table_metadata = table_metadata_from_dict(metadata_dict)
-    rows, metadata_validation_errors = process_rows(csv_rows, table_metadata.columns)
 
-    # Perform validation.
-    csv_validation_errors = validate_csv(rows, key, overwrite)
+    # Read the request body as a stream of CSV rows, decoding it line by line, so
+    # that only one batch of rows is held in memory at a time
+    reader = csv.DictReader(decode_data(line) for line in request.stream)
 
-    validation_errors = [*metadata_validation_errors, *csv_validation_errors]
-    if len(validation_errors):
-        raise ValidationFailed(errors=validation_errors)
+    loaded_table: Optional[Table] = None
+    edge = False
+    count = 0
+    rows_read = 0
+    unique_keys: Set[str] = set()
+    header_errors: List[ValidationFailure] = []
+    metadata_validation_errors: List[ValidationFailure] = []
+    csv_validation_errors: List[ValidationFailure] = []
 
-    # Once we reach here, we know that the specified key field must be present,
-    # and either:
-    #   key == "_key"   # noqa: E800
-    #   or key != "_key" and the "_key" field is not present
-    #   or key != "_key" and "_key" is present, but overwrite = True
-    if key != "_key":
-        rows = set_table_key(rows, key)
+    def discard_table() -> None:
+        if loaded_table is not None:
+            loaded_workspace.delete_table(table)
 
-    # Create table and insert the data
-    loaded_table = loaded_workspace.create_table(table, edge=is_edge_table(rows))
+    try:
+        for csv_rows in util.batched(reader, CSV_UPLOAD_BATCH_SIZE):
+            if not rows_read:
+                # The header is only available once the first row has been read
+                fieldnames = reader.fieldnames or []
+                edge = has_edge_fields(fieldnames)
+                header_errors = validate_csv_header(fieldnames, key, overwrite)
+
+            # Rows are only validated once the header is known to be valid
+            rows, errors, validation_errors = process_table_batch(
+                csv_rows,
+                table_metadata.columns,
+                key,
+                edge,
+                rows_read,
+                unique_keys,
+                validate=not header_errors,
+            )
+            metadata_validation_errors.extend(errors)
+            csv_validation_errors.extend(validation_errors)
+
+            rows_read += len(csv_rows)
+
+            # Once any error has been found, keep going so that every error in the
+            # file is reported, but stop inserting data
+            if header_errors or metadata_validation_errors or csv_validation_errors:
+                continue
+
+            # Once we reach here, we know that the specified key field must be
+            # present, and either:
+            #   key == "_key"   # noqa: E800
+            #   or key != "_key" and the "_key" field is not present
+            #   or key != "_key" and "_key" is present, but overwrite = True
+            if key != "_key":
+                rows = set_table_key(rows, key)
+
+            # Create table and set its metadata once the first batch is validated
+            if loaded_table is None:
+                loaded_table = loaded_workspace.create_table(table, edge=edge)
+                loaded_table.set_metadata(metadata_dict)
+
+            count += loaded_table.insert(rows).created
+    except csv.Error:
+        discard_table()
+        raise CSVReadError()
+    except Exception:
+        discard_table()
+        raise
+
+    validation_errors = [
+        *metadata_validation_errors,
+        *header_errors,
+        *csv_validation_errors,
+    ]
+    if not rows_read:
+        validation_errors = [MissingBody()]
 
-    # Set table metadata
-    loaded_table.set_metadata(metadata_dict)
+    if len(validation_errors):
+        discard_table()
+        raise ValidationFailed(errors=validation_errors)
 
-    results = loaded_table.insert(rows)
-    return {"count": len(results)}
+    return {"count": count}
@@ -5,7 +5,6 @@ from flasgger import swag_from
 from collections import OrderedDict
 
 from multinet import util
-from multinet.db.models.workspace import Workspace
 from multinet.auth.util import require_writer
 from multinet.errors import ValidationFailed, AlreadyExists
 from multinet.util import decode_data
@@ -73,7 +72,7 @@ def upload(workspace: str, graph: str) -> Any:
     `data` - the json data, passed in the request body. The json data should contain
     nodes: [] and links: []
     """
-    loaded_workspace = Workspace(workspace)
+    loaded_workspace = util.get_workspace(workspace)
     if loaded_workspace.has_graph(graph):
         raise AlreadyExists("graph", graph)
 
@@ -102,21 +101,33 @@ def upload(workspace: str, graph: str) -> Any:
         del link["source"]
         del link["target"]
 
-    # Create or retrieve the node and edge tables
+    # Create or retrieve the node and edge tables, noting the ones created here
+    created_tables: List[str] = []
+
+    def discard_tables() -> None:
+        for table in created_tables:
+            loaded_workspace.delete_table(table)
+
     if loaded_workspace.has_table(node_table_name):
         node_table = loaded_workspace.table(node_table_name)
     else:
         node_table = loaded_workspace.create_table(node_table_name, edge=False)
+        created_tables.append(node_table_name)
 
     if loaded_workspace.has_table(edge_table_name):
         edge_table = loaded_workspace.table(edge_table_name)
     else:
         edge_table = loaded_workspace.create_table(edge_table_name, edge=True)
+        created_tables.append(edge_table_name)
 
-    # Insert data
-    node_table.insert(nodes)
-    edge_table.insert(links)
+    # Insert data, removing the tables created above if any of it is rejected
+    try:
+        node_table.insert(nodes)
+        edge_table.insert(links)
 
-    loaded_workspace.create_graph(graph, edge_table_name)
+        loaded_workspace.create_graph(graph, edge_table_name)
+    except Exception:
+        discard_tables()
+        raise
 
     return {"nodecount": len(nodes), "edgecount": len(links)}
@@ -4,7 +4,6 @@ import itertools
 import json
 
 from multinet import util
-from multinet.db.models.workspace import Workspace
 from multinet.auth.util import require_writer
 from multinet.errors import AlreadyExists
 
@@ -16,17 +15,16 @@ bp = Blueprint("nested_json", __name__)
 bp.before_request(util.require_db)
 
 
-def analyze_nested_json(
-    raw_data: str, int_table_name: str, leaf_table_name: str
+def read_nested_json(
+    data: dict, int_table_name: str, leaf_table_name: str
 ) -> Tuple[List[List[dict]], List[dict]]:
     """
-    Transform nested JSON data into MultiNet format.
+    Transform a parsed nested JSON tree into MultiNet format.
 
-    `data` - the text of a nested_json file
+    `data` - the root of the tree
     `(nodes, edges)` - a node and edge table describing the tree.
     """
     ident = itertools.count(100)
-    data = json.loads(raw_data)
 
     def keyed(rec: dict) -> dict:
         if "_key" in rec:
@@ -36,11 +34,16 @@ def analyze_nested_json(
 
         return rec
 
-    # The helper function will collect nodes and edges into these two lists.
+    # The tree walk will collect nodes and edges into these two lists.
     nodes: List[List[dict]] = [[], []]
     edges = []
 
-    def helper(tree: dict) -> None:
+    # Walk the tree with an explicit stack of subtrees, rather than recursively, so
+    # that the depth of the tree is not limited by the recursion limit.
+    stack = [data]
+    while stack:
+        tree = stack.pop()
+
         # Grab the root node of the subtree, and the child nodes.
         root = keyed(tree.get("node_data", {}))
         children = tree.get("children", [])
@@ -67,15 +70,24 @@ def analyze_nested_json(
             edge["_to"] = f'{int_table_name}/{root["_key"]}'
             edges.append(edge)
 
-        # Recursively add the child subtrees.
-        for child in children:
-            helper(child)
+        # Visit the child subtrees next, in order.
+        stack.extend(reversed(children))
 
-    # Kick off the analysis.
-    helper(data)
     return (nodes, edges)
 
 
+def analyze_nested_json(
+    raw_data: str, int_table_name: str, leaf_table_name: str
+) -> Tuple[List[List[dict]], List[dict]]:
+    """
+    Transform nested JSON data into MultiNet format.
+
+    `data` - the text of a nested_json file
+    `(nodes, edges)` - a node and edge table describing the tree.
+    """
+    return read_nested_json(json.loads(raw_data), int_table_name, leaf_table_name)
+
+
 @bp.route("/<workspace>/<graph>", methods=["POST"])
 @require_writer
 @swag_from("swagger/nested_json.yaml")
@@ -87,7 +99,7 @@ def upload(workspace: str, graph: str) -> Any:
     `graph` - the target graph.
     `data` - the nested_json data, passed in the request body.
     """
-    loaded_workspace = Workspace(workspace)
+    loaded_workspace = util.get_workspace(workspace)
     if loaded_workspace.has_graph(graph):
         raise AlreadyExists("graph", graph)
 
@@ -98,32 +110,48 @@ def upload(workspace: str, graph: str) -> Any:
     int_nodetable_name = f"{graph}_internal_nodes"
     leaf_nodetable_name = f"{graph}_leaf_nodes"
 
-    # Set up the database targets.
+    # Set up the database targets, noting the ones created here.
+    created_tables: List[str] = []
+
+    def discard_tables() -> None:
+        for table in created_tables:
+            loaded_workspace.delete_table(table)
+
     if loaded_workspace.has_table(edgetable_name):
         edgetable = loaded_workspace.table(edgetable_name)
     else:
         edgetable = loaded_workspace.create_table(edgetable_name, edge=True)
+        created_tables.append(edgetable_name)
 
     if loaded_workspace.has_table(int_nodetable_name):
         int_nodetable = loaded_workspace.table(int_nodetable_name)
     else:
         int_nodetable = loaded_workspace.create_table(int_nodetable_name, edge=False)
+        created_tables.append(int_nodetable_name)
 
     if loaded_workspace.has_table(leaf_nodetable_name):
         leaf_nodetable = loaded_workspace.table(leaf_nodetable_name)
     else:
         leaf_nodetable = loaded_workspace.create_table(leaf_nodetable_name, edge=False)
-
-    # Analyze the nested_json data into a node and edge table.
-    (nodes, edges) = analyze_nested_json(data, int_nodetable_name, leaf_nodetable_name)
-
-    # Upload the data to the database.
-    edgetable.insert(edges)
-    int_nodetable.insert(nodes[0])
-    leaf_nodetable.insert(nodes[1])
-
-    # Create graph
-    loaded_workspace.create_graph(graph, edgetable_name)
+        created_tables.append(leaf_nodetable_name)
+
+    try:
+        # Analyze the nested_json data into a node and edge table.
+        (nodes, edges) = analyze_nested_json(
+            data, int_nodetable_name, leaf_nodetable_name
+        )
+
+        # Upload the data to the database.
+        edgetable.insert(edges)
+        int_nodetable.insert(nodes[0])
+        leaf_nodetable.insert(nodes[1])
+
+        # Create graph
+        loaded_workspace.create_graph(graph, edgetable_name)
+    except Exception:
+        # Remove the tables created above, so that a retry starts from scratch
+        discard_tables()
+        raise
 
     return {
         "edgecount": len(edges),
@@ -4,7 +4,6 @@ import uuid
 import newick
 
 from multinet import util
-from multinet.db.models.workspace import Workspace
 from multinet.auth.util import require_writer
 from multinet.errors import ValidationFailed, AlreadyExists
 from multinet.util import decode_data
@@ -13,7 +12,7 @@ from multinet.validation import ValidationFailure, DuplicateKey
 from flask import Blueprint, request
 from flask import current_app as app
 
-from typing import Any, Optional, List, Set, Tuple
+from typing import Any, Dict, Optional, List, Set, Tuple
 
 bp = Blueprint("newick", __name__)
 bp.before_request(util.require_db)
@@ -27,35 +26,63 @@ class DuplicateEdge(ValidationFailure):
     length: int
 
 
-def validate_newick(tree: List[newick.Node]) -> None:
-    """Validate newick tree."""
+def read_newick(
+    tree: newick.Node, nodetable_name: str
+) -> Tuple[List[Dict], List[Dict], List[ValidationFailure]]:
+    """
+    Read the node and edge rows of a newick tree, validating them along the way.
+
+    Returns the rows for the node and edge tables, and any validation errors. The
+    tree is walked with an explicit stack rather than recursion, so that the depth
+    of the tree is not limited by the interpreter's recursion limit.
+    """
+    nodes: List[Dict] = []
+    edges: List[Dict] = []
     data_errors: List[ValidationFailure] = []
     unique_keys: Set[str] = set()
     unique_edges: Set[Tuple[str, str, float]] = set()
 
-    def read_tree(parent: Optional[str], node: newick.Node) -> None:
+    stack: List[Tuple[Optional[str], newick.Node]] = [(None, tree)]
+    while stack:
+        parent, node = stack.pop()
         key = node.name or uuid.uuid4().hex
 
         if key in unique_keys:
             data_errors.append(DuplicateKey(key=key))
         else:
             unique_keys.add(key)
-
-        for desc in node.descendants:
-            read_tree(key, desc)
+            nodes.append({"_key": key})
 
         if parent:
             unique = (parent, key, node.length)
             if unique in unique_edges:
                 data_errors.append(
                     DuplicateEdge(
-                        _from=f"table/{parent}", _to=f"table/{key}", length=node.length
+                        _from=f"{nodetable_name}/{parent}",
+                        _to=f"{nodetable_name}/{key}",
+                        length=node.length,
                     )
                 )
             else:
                 unique_edges.add(unique)
 
-    read_tree(None, tree[0])
+            edges.append(
+                {
+                    "_from": f"{nodetable_name}/{parent}",
+                    "_to": f"{nodetable_name}/{key}",
+                    "length": node.length,
+                }
+            )
+
+        # Push the descendants in reverse, so they're visited in their tree order
+        stack.extend((key, desc) for desc in reversed(node.descendants))
+
+    return (nodes, edges, data_errors)
+
+
+def validate_newick(tree: List[newick.Node]) -> None:
+    """Validate newick tree."""
+    _, _, data_errors = read_newick(tree[0], "table")
 
     if len(data_errors) > 0:
         raise ValidationFailed(data_errors)
@@ -74,16 +101,27 @@ def upload(workspace: str, graph: str) -> Any:
     """
     app.logger.info("newick tree")
 
-    loaded_workspace = Workspace(workspace)
+    loaded_workspace = util.get_workspace(workspace)
     if loaded_workspace.has_graph(graph):
         raise AlreadyExists("graph", graph)
 
+    edgetable_name = f"{graph}_edges"
+    nodetable_name = f"{graph}_nodes"
+
     body = decode_data(request.data)
     tree = newick.loads(body)
-    validate_newick(tree)
 
-    edgetable_name = f"{graph}_edges"
-    nodetable_name = f"{graph}_nodes"
+    # Validate the tree and flatten it into rows in a single pass
+    nodes, edges, data_errors = read_newick(tree[0], nodetable_name)
+    if len(data_errors) > 0:
+        raise ValidationFailed(data_errors)
+
+    # Note the tables created here, to be removed if the upload fails
+    created_tables: List[str] = []
+
+    def discard_tables() -> None:
+        for table in created_tables:
+            loaded_workspace.delete_table(table)
 
     if loaded_workspace.has_table(edgetable_name):
         edgetable = loaded_workspace.table(edgetable_name)
@@ -91,38 +129,22 @@ def upload(workspace: str, graph: str) -> Any:
         # Note that edge=True must be set or the _from and _to keys
         # will be ignored below.
         edgetable = loaded_workspace.create_table(edgetable_name, edge=True)
+        created_tables.append(edgetable_name)
 
     if loaded_workspace.has_table(nodetable_name):
         nodetable = loaded_workspace.table(nodetable_name)
     else:
         nodetable = loaded_workspace.create_table(nodetable_name, edge=False)
+        created_tables.append(nodetable_name)
 
-    edgecount = 0
-    nodecount = 0
-
-    def read_tree(parent: Optional[str], node: newick.Node) -> None:
-        nonlocal nodecount
-        nonlocal edgecount
-        key = node.name or uuid.uuid4().hex
-        if not nodetable.row(key):
-            nodetable.insert([{"_key": key}])
-        nodecount = nodecount + 1
-        for desc in node.descendants:
-            read_tree(key, desc)
-        if parent:
-            edgetable.insert(
-                [
-                    {
-                        "_from": f"{nodetable_name}/{parent}",
-                        "_to": f"{nodetable_name}/{key}",
-                        "length": node.length,
-                    }
-                ]
-            )
-            edgecount += 1
-
-    read_tree(None, tree[0])
+    try:
+        # Nodes already present in the table are left as they are
+        nodetable.insert(nodes, on_duplicate="ignore")
+        edgecount = edgetable.insert(edges).created
 
-    loaded_workspace.create_graph(graph, edgetable_name)
+        loaded_workspace.create_graph(graph, edgetable_name)
+    except Exception:
+        discard_tables()
+        raise
 
-    return {"edgecount": edgecount, "nodecount": nodecount}
+    return {"edgecount": edgecount, "nodecount": len(nodes)}
@@ -1,22 +1,35 @@
 """Utility functions."""
 import os
 import json
+import binascii
 import fnmatch
+import itertools
 
+from base64 import urlsafe_b64decode, urlsafe_b64encode
 from copy import deepcopy
 from functools import lru_cache
+from queue import Full, Queue
+from threading import Event, Thread
 from uuid import uuid1, uuid4
-from flask import Response, current_app
-from typing import Any, Generator, Dict, Set, List, Iterable
+from flask import Response, current_app, g, has_app_context
+from typing import Any, Generator, Dict, Set, List, Iterable, TypeVar
 
 from multinet import db
+from multinet.serialization import encode_json_list
 from multinet.db.models import workspace
 
-from multinet.errors import DatabaseNotLive, DecodeFailed, SecretKeyNotSet
+from multinet.errors import (
+    BadQueryArgument,
+    DatabaseNotLive,
+    DecodeFailed,
+    SecretKeyNotSet,
+)
 
 TEST_DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../test/data"))
 restricted_document_keys = {"_rev", "_id"}
 
+T = TypeVar("T")
+
 
 # TODO: Remove once permission storage is updated
 # https://github.com/multinet-app/multinet-server/issues/456
@@ -87,21 +100,119 @@ def generate_filtered_docs(rows: Iterable[Dict]) -> Generator[Dict, None, None]:
         yield filter_unwanted_keys(row)
 
 
-def generate(iterator: Iterable[Any]) -> Generator[str, None, None]:
+def generate(iterator: Iterable[Any]) -> Generator[bytes, None, None]:
     """Return a generator that yields an iterator's contents into a JSON list."""
-    yield "["
+    return encode_json_list(iterator)
+
+
+def batched(iterable: Iterable[T], size: int) -> Generator[List[T], None, None]:
+    """Yield successive lists of (at most) `size` items from `iterable`."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+
+        yield batch
 
-    comma = ""
-    for row in iterator:
-        yield f"{comma}{json.dumps(row)}"
-        comma = ","
 
-    yield "]"
+def prefetch(iterable: Iterable[T], maxsize: int = 1) -> Generator[T, None, None]:
+    """
+    Yield the items of `iterable`, reading them ahead on a background thread.
+
+    At most `maxsize` items are read ahead of the consumer, so that reading the next
+    item (e.g. fetching the next batch of a database cursor) overlaps with the use
+    of the current one. Any exception raised while reading is raised in the
+    consumer.
+    """
+    items: Queue = Queue(maxsize)
+    stopped = Event()
+    end = object()
+
+    def put(item: Any) -> None:
+        # Give up if the consumer has gone away, rather than blocking forever
+        while not stopped.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return
+            except Full:
+                continue
+
+    def read() -> None:
+        try:
+            for item in iterable:
+                put((item, None))
+                if stopped.is_set():
+                    return
+
+            put((end, None))
+        except BaseException as e:
+            put((end, e))
+
+    reader = Thread(target=read, daemon=True)
+    reader.start()
+
+    try:
+        while True:
+            item, error = items.get()
+            if item is end:
+                if error is not None:
+                    raise error
+
+                return
+
+            yield item
+    finally:
+        stopped.set()
+        reader.join()
 
 
 def stream(iterator: Iterable[Any]) -> Response:
-    """Convert an iterator to a Flask response."""
-    return Response(generate(iterator), mimetype="application/json")
+    """
+    Convert an iterator to a Flask response.
+
+    If the iterator holds query results that are known to have been cut short by a
+    row limit, the response is marked with an `X-Truncated` header.
+    """
+    response = Response(generate(iterator), mimetype="application/json")
+    if getattr(iterator, "truncated", None):
+        response.headers["X-Truncated"] = "true"
+
+    return response
+
+
+def encode_cursor(key: str) -> str:
+    """Encode the key of the last row of a page into an opaque pagination cursor."""
+    return urlsafe_b64encode(json.dumps({"after": key}).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> str:
+    """Decode a pagination cursor back into the key that the next page follows."""
+    try:
+        key = json.loads(urlsafe_b64decode(cursor.encode()))["after"]
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise BadQueryArgument("cursor", cursor)
+
+    if not isinstance(key, str):
+        raise BadQueryArgument("cursor", cursor)
+
+    return key
+
+
+def get_workspace(name: str) -> workspace.Workspace:
+    """
+    Return the workspace `name`, loading it at most once per request.
+
+    Every caller within the same request receives the same `Workspace` object.
+    """
+    if not has_app_context():
+        return workspace.Workspace(name)
+
+    loaded = g.setdefault("workspaces", {})
+    if name not in loaded:
+        loaded[name] = workspace.Workspace(name)
+
+    return loaded[name]
 
 
 def require_db() -> None:
@@ -47,3 +47,10 @@ class TypeConversionFailure(ValidationFailure):
     row: int
     column: str
     message: str
+
+
+class InsertFailure(ValidationFailure):
+    """The database rejected a document when it was inserted into a table."""
+
+    batch: int
+    message: str
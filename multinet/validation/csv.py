@@ -1,7 +1,7 @@
 """Utilities for validating tabular data for upload to Multinet."""
 
 import re
-from typing import Set, MutableMapping, Sequence, List
+from typing import Any, Collection, Set, MutableMapping, Sequence, List, Optional
 
 from multinet.validation import ValidationFailure, DuplicateKey, UnsupportedTable
 
@@ -29,30 +29,49 @@ class MissingBody(ValidationFailure):
     """Missing body in a CSV file."""
 
 
+def has_edge_fields(fieldnames: Collection[Optional[str]]) -> bool:
+    """Determine if a table with these fields should be treated as an edge table."""
+    return "_from" in fieldnames and "_to" in fieldnames
+
+
+def has_node_fields(fieldnames: Collection[Optional[str]], key_field: str) -> bool:
+    """Determine if a table with these fields should be treated as a node table."""
+    return key_field != "_key" or "_key" in fieldnames
+
+
 def is_edge_table(rows: Sequence[MutableMapping]) -> bool:
     """Determine if this table should be treated as an edge table."""
-    fieldnames = rows[0].keys()
-    return "_from" in fieldnames and "_to" in fieldnames
+    return has_edge_fields(rows[0].keys())
 
 
 def is_node_table(rows: Sequence[MutableMapping], key_field: str) -> bool:
     """Determine if this table should be treated as a node table."""
-    fieldnames = rows[0].keys()
-    return key_field != "_key" or "_key" in fieldnames
+    return has_node_fields(rows[0].keys(), key_field)
 
 
-def validate_edge_table(rows: Sequence[MutableMapping]) -> List[ValidationFailure]:
-    """Validate that the given table is a valid edge table."""
+def validate_edge_table(
+    rows: Sequence[MutableMapping], start: int = 0
+) -> List[ValidationFailure]:
+    """
+    Validate that the given table is a valid edge table.
+
+    `start` is the index of the first of `rows` within the whole table, so that
+    row numbers are reported correctly when a table is validated in batches.
+    """
     validation_errors: List[ValidationFailure] = []
 
     # Checks that a cell has the form table_name/key
     valid_cell = re.compile("[^/]+/[^/]+")
 
-    for i, row in enumerate(rows):
+    def is_valid(cell: Any) -> bool:
+        # Cells read from typed formats (e.g. Arrow) may be null, or not strings
+        return isinstance(cell, str) and bool(valid_cell.match(cell))
+
+    for i, row in enumerate(rows, start):
         fields: List[str] = []
-        if not valid_cell.match(row["_from"]):
+        if not is_valid(row["_from"]):
             fields.append("_from")
-        if not valid_cell.match(row["_to"]):
+        if not is_valid(row["_to"]):
             fields.append("_to")
 
         if fields:
@@ -62,30 +81,55 @@ def validate_edge_table(rows: Sequence[MutableMapping]) -> List[ValidationFailur
     return validation_errors
 
 
-def validate_node_table(
-    rows: Sequence[MutableMapping], key_field: str, overwrite: bool
+def validate_node_fields(
+    fieldnames: Collection[Optional[str]], key_field: str, overwrite: bool
 ) -> List[ValidationFailure]:
-    """Validate that the given table is a valid node table."""
-    fieldnames = rows[0].keys()
-    validation_errors: List[ValidationFailure] = []
-
+    """Validate that the key field of a node table can be used."""
     if key_field != "_key" and key_field not in fieldnames:
-        validation_errors.append(KeyFieldDoesNotExist(key=key_field))
+        return [KeyFieldDoesNotExist(key=key_field)]
 
-    elif "_key" in fieldnames and key_field != "_key" and not overwrite:
-        validation_errors.append(KeyFieldAlreadyExists(key=key_field))
-    else:
-        keys = (row[key_field] for row in rows)
-        unique_keys: Set[str] = set()
-        for key in keys:
-            if key in unique_keys:
-                validation_errors.append(DuplicateKey(key=key))
-            else:
-                unique_keys.add(key)
+    if "_key" in fieldnames and key_field != "_key" and not overwrite:
+        return [KeyFieldAlreadyExists(key=key_field)]
+
+    return []
+
+
+def validate_unique_keys(
+    rows: Sequence[MutableMapping],
+    key_field: str,
+    unique_keys: Optional[Set[str]] = None,
+) -> List[ValidationFailure]:
+    """
+    Validate that no key appears more than once in `rows`.
+
+    If `unique_keys` is passed, it is treated as the set of keys already seen in
+    previous batches of the same table, and is updated with the keys of `rows`.
+    """
+    if unique_keys is None:
+        unique_keys = set()
+
+    validation_errors: List[ValidationFailure] = []
+    for row in rows:
+        key = row[key_field]
+        if key in unique_keys:
+            validation_errors.append(DuplicateKey(key=key))
+        else:
+            unique_keys.add(key)
 
     return validation_errors
 
 
+def validate_node_table(
+    rows: Sequence[MutableMapping], key_field: str, overwrite: bool
+) -> List[ValidationFailure]:
+    """Validate that the given table is a valid node table."""
+    validation_errors = validate_node_fields(rows[0].keys(), key_field, overwrite)
+    if validation_errors:
+        return validation_errors
+
+    return validate_unique_keys(rows, key_field)
+
+
 def validate_csv(
     rows: Sequence[MutableMapping], key_field: str, overwrite: bool
 ) -> List[ValidationFailure]:
@@ -99,3 +143,40 @@ def validate_csv(
         return validate_node_table(rows, key_field, overwrite)
     else:
         return [UnsupportedTable()]
+
+
+def validate_csv_header(
+    fieldnames: Collection[Optional[str]], key_field: str, overwrite: bool
+) -> List[ValidationFailure]:
+    """
+    Validate the header of a CSV file, independent of the rows that follow it.
+
+    These are the table-wide checks of `validate_csv`, for use when the rows are
+    validated in batches with `validate_csv_batch`.
+    """
+    if has_edge_fields(fieldnames):
+        return []
+    elif has_node_fields(fieldnames, key_field):
+        return validate_node_fields(fieldnames, key_field, overwrite)
+    else:
+        return [UnsupportedTable()]
+
+
+def validate_csv_batch(
+    rows: Sequence[MutableMapping],
+    key_field: str,
+    edge: bool,
+    start: int,
+    unique_keys: Set[str],
+) -> List[ValidationFailure]:
+    """
+    Validate one batch of rows from a CSV file whose header is already validated.
+
+    `start` is the index of the first row of the batch within the whole file, and
+    `unique_keys` holds the keys seen so far, so that duplicate keys are detected
+    across batches.
+    """
+    if edge:
+        return validate_edge_table(rows, start)
+
+    return validate_unique_keys(rows, key_field, unique_keys)
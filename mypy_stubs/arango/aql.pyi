@@ -1,7 +1,9 @@
-from typing import Dict, Optional, Union
+from typing import Any, Callable, Dict, List, Optional, Union
 from arango.connection import Connection  # type: ignore
 from arango.executor import Executor  # type: ignore
 from arango.cursor import Cursor
+from arango.request import Request
+from arango.response import Response
 
 class AQL:
     """AQL (ArangoDB Query Language) API wrapper.
@@ -12,8 +14,21 @@ class AQL:
     :type executor: arango.executor.Executor
     """
 
+    _conn: Connection
     def __init__(self, connection: Connection, executor: Executor): ...
+    def _execute(
+        self, request: Request, response_handler: Callable[[Response], Any]
+    ) -> Any: ...
     def validate(self, query: str) -> Dict: ...
+    def explain(
+        self,
+        query: str,
+        all_plans: bool = False,
+        max_plans: Optional[int] = None,
+        opt_rules: Optional[List[str]] = None,
+    ) -> Dict: ...
+    def queries(self) -> List[Dict]: ...
+    def kill(self, query_id: str) -> bool: ...
     def execute(
         self,
         query: str,
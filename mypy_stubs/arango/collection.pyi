@@ -4,6 +4,7 @@ from typing import Any, Optional, Dict, Union, List, Mapping
 
 class Collection:
     def count(self) -> int: ...
+    def revision(self) -> str: ...
     def has(
         self, document: Any, rev: Optional[Any] = ..., check_rev: bool = ...
     ) -> bool: ...
@@ -36,6 +37,23 @@ class StandardCollection(Collection):
         overwrite: bool = ...,
         return_old: bool = ...,
     ) -> List[Union[Dict, ArangoError]]: ...
+    def add_persistent_index(
+        self,
+        fields: List[str],
+        unique: Optional[bool] = None,
+        sparse: Optional[bool] = None,
+    ) -> Dict: ...
+    def import_bulk(
+        self,
+        documents: Any,
+        halt_on_error: bool = ...,
+        details: bool = ...,
+        from_prefix: Optional[str] = ...,
+        to_prefix: Optional[str] = ...,
+        overwrite: Optional[bool] = ...,
+        on_duplicate: Optional[str] = ...,
+        sync: Optional[bool] = ...,
+    ) -> Dict: ...
     def delete(
         self,
         document: Union[Dict, str],
@@ -1,4 +1,4 @@
-from typing import Any
+from typing import Any, Dict, Optional
 
 # Below is autogenerated with stubgen
 class Cursor:
@@ -16,6 +16,9 @@ class Cursor:
     def type(self) -> Any: ...
     def has_more(self) -> bool: ...
     def count(self) -> int: ...
+    def statistics(self) -> Dict[str, Any]: ...
     def empty(self) -> bool: ...
     def next(self) -> Any: ...
     def pop(self) -> Any: ...
+    def close(self, ignore_missing: bool = False) -> Optional[bool]: ...
+    def batch(self) -> Any: ...
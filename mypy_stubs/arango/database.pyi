@@ -5,6 +5,7 @@ from arango.graph import Graph
 from arango.aql import AQL  # type: ignore
 
 class StandardDatabase:
+    name: str
     aql: AQL
     def has_database(self, name: str) -> bool: ...
     def has_graph(self, name: str) -> bool: ...
@@ -2,4 +2,6 @@ class DatabaseCreateError(Exception): ...
 class EdgeDefinitionCreateError(Exception): ...
 class AQLQueryValidateError(Exception): ...
 class AQLQueryExecuteError(Exception): ...
+class AQLQueryExplainError(Exception): ...
+class ArangoServerError(Exception): ...
 class DocumentGetError(Exception): ...
@@ -0,0 +1,7 @@
+from requests import Session
+
+class HTTPClient: ...
+
+class DefaultHTTPClient(HTTPClient):
+    _session: Session
+    def __init__(self) -> None: ...
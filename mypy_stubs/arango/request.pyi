@@ -0,0 +1,14 @@
+from typing import Any, Dict, Optional
+
+class Request:
+    def __init__(
+        self,
+        method: str,
+        endpoint: str,
+        headers: Optional[Dict[str, str]] = None,
+        params: Optional[Dict[str, Any]] = None,
+        data: Optional[Any] = None,
+        command: Optional[str] = None,
+        read: Optional[Any] = None,
+        write: Optional[Any] = None,
+    ) -> None: ...
@@ -0,0 +1,13 @@
+from typing import Any, Dict, Optional
+
+class Response:
+    method: str
+    url: str
+    headers: Dict[str, str]
+    status_code: int
+    status_text: str
+    raw_body: str
+    body: Any
+    error_code: Optional[int]
+    error_message: Optional[str]
+    is_success: bool
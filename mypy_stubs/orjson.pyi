@@ -0,0 +1,8 @@
+from typing import Any, Callable, Optional
+
+class JSONEncodeError(TypeError): ...
+
+def dumps(
+    obj: Any, default: Optional[Callable[[Any], Any]] = ..., option: int = ...
+) -> bytes: ...
+def loads(obj: Any) -> Any: ...
@@ -2,7 +2,9 @@ from typing import Any
 
 class fields:
     @staticmethod
-    def Int() -> Any: ...
+    def Int(required: bool = False, location: str = "json") -> Any: ...
+    @staticmethod
+    def Float(required: bool = False, location: str = "json") -> Any: ...
     @staticmethod
     def Str(required: bool = False, location: str = "json") -> Any: ...
     @staticmethod
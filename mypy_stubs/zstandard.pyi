@@ -0,0 +1,7 @@
+from typing import Any
+
+COMPRESSOBJ_FLUSH_BLOCK: int
+
+class ZstdCompressor:
+    def __init__(self, level: int = 3, **kwargs: Any): ...
+    def compressobj(self, size: int = -1) -> Any: ...
@@ -0,0 +1,81 @@
+"""Benchmark the encoding of streamed JSON responses."""
+
+import json
+import time
+import click
+
+from typing import Any, Callable, Dict, Generator, Iterable, List
+
+from multinet.serialization import encode_json_list, encoders
+
+
+def row_by_row(iterator: Iterable[Any]) -> Generator[str, None, None]:
+    """Encode a JSON list one row (and one chunk) at a time, as the server used to."""
+    yield "["
+
+    comma = ""
+    for row in iterator:
+        yield f"{comma}{json.dumps(row)}"
+        comma = ","
+
+    yield "]"
+
+
+def sample_rows(count: int) -> List[Dict]:
+    """Return `count` rows resembling the documents of a node table."""
+    return [
+        {
+            "_key": str(i),
+            "_id": f"nodes/{i}",
+            "_rev": "_bXq3gN2---",
+            "name": f"Node {i}",
+            "group": i % 10,
+            "weight": i * 0.5,
+            "active": i % 2 == 0,
+            "tags": ["a", "b", "c"],
+        }
+        for i in range(count)
+    ]
+
+
+def measure(generate: Callable[[], Iterable[Any]]) -> Dict:
+    """Consume a response generator, returning the time taken and chunks produced."""
+    start = time.perf_counter()
+
+    chunks = 0
+    size = 0
+    for chunk in generate():
+        chunks += 1
+        size += len(chunk)
+
+    return {"seconds": time.perf_counter() - start, "chunks": chunks, "size": size}
+
+
+@click.command()
+@click.option("--rows", default=200000, help="The number of rows to encode")
+@click.option("--repeat", default=3, help="The number of times to run each encoder")
+def main(rows: int, repeat: int) -> None:
+    """Compare the throughput of row-by-row and coalesced JSON encoding."""
+    data = sample_rows(rows)
+
+    candidates: Dict[str, Callable[[], Iterable[Any]]] = {
+        "row by row (json)": lambda: row_by_row(data)
+    }
+    for name, encoder in encoders.items():
+        candidates[f"coalesced ({name})"] = lambda e=encoder: encode_json_list(data, e)
+
+    baseline = None
+    for name, generate in candidates.items():
+        best = min(
+            (measure(generate) for _ in range(repeat)), key=lambda r: r["seconds"]
+        )
+        baseline = baseline or best["seconds"]
+
+        click.echo(
+            f"{name:<24} {best['seconds']:8.3f}s {rows / best['seconds']:12,.0f} rows/s"
+            f" {best['chunks']:8} chunks {baseline / best['seconds']:6.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
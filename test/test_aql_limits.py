@@ -0,0 +1,298 @@
+"""Test the limits applied to running AQL queries, against a fake database."""
+import json
+import re
+import time
+
+import pytest
+from arango.cursor import Cursor
+
+import multinet.db
+from multinet.db import (
+    AQLQueryOptions,
+    QueryResults,
+    _kill_query_after,
+    _run_aql_query,
+    admit_aql_query,
+)
+from multinet.errors import AQLExecutionError, QueryTooExpensive
+
+
+class FakeResponse:
+    """A response from the database's HTTP API."""
+
+    def __init__(self, status_code, body):
+        """Create a response with a JSON body."""
+        self.method = "post"
+        self.url = "/_api/cursor"
+        self.headers = {}
+        self.status_code = status_code
+        self.status_text = "Error" if status_code >= 400 else "OK"
+        self.body = body
+        self.error_code = body.get("errorNum")
+        self.error_message = body.get("errorMessage")
+        self.is_success = status_code < 400
+
+
+class FakeAQL:
+    """An AQL API wrapper that answers every query with the same rows."""
+
+    def __init__(self, rows=None, error=None, plan=None):
+        """Return `rows` in response to queries, or fail with `error`."""
+        self._conn = None
+        self.rows = rows or []
+        self.error = error
+        self.plan = plan or {}
+        self.requests = []
+        self.running = []
+        self.killed = []
+
+    def _execute(self, request, response_handler):
+        """Respond to a request, returning a single batch of results."""
+        self.requests.append(json.loads(request.data))
+        if request.endpoint == "/_api/explain":
+            return response_handler(FakeResponse(200, {"plan": self.plan}))
+
+        if self.error is not None:
+            return response_handler(
+                FakeResponse(400, {"errorNum": 1500, "errorMessage": self.error})
+            )
+
+        return response_handler(
+            FakeResponse(201, {"result": list(self.rows), "hasMore": False})
+        )
+
+    def queries(self):
+        """Return the queries running on the server."""
+        return list(self.running)
+
+    def kill(self, query_id):
+        """Kill a running query."""
+        self.killed.append(query_id)
+        return True
+
+
+class FakeDatabase:
+    """A database handle, with a fake AQL API."""
+
+    name = "workspace"
+
+    def __init__(self, aql):
+        """Create a handle using `aql`."""
+        self.aql = aql
+
+
+class FakeCursor:
+    """A cursor whose first batch is followed by one more batch of rows."""
+
+    def __init__(self, first_batch, rest):
+        """Hold `first_batch`, and `rest` to be fetched later."""
+        self.first_batch = first_batch
+        self.rest = rest
+        self.fetched = False
+        self.closed = False
+
+    def batch(self):
+        """Return the current batch of rows."""
+        return self.rest if self.fetched else self.first_batch
+
+    def has_more(self):
+        """Indicate whether more rows are to be fetched."""
+        return bool(self.rest) and not self.fetched
+
+    def __iter__(self):
+        """Yield every row, fetching the second batch once the first is read."""
+        yield from self.first_batch
+
+        self.fetched = True
+        yield from self.rest
+
+    def close(self, ignore_missing=False):
+        """Release the cursor."""
+        self.closed = True
+
+
+def test_query_request_limits():
+    """Test that the runtime limit is sent to the server with the query."""
+    aql = FakeAQL(rows=[1, 2, 3])
+    options = AQLQueryOptions(
+        batch_size=10, stream=True, ttl=30, max_runtime=5, max_rows=50
+    )
+
+    results = _run_aql_query(aql, "RETURN 1", {"a": 1}, options, validate=False)
+
+    # The query is tagged, to be told apart from other runs of it
+    query = aql.requests[0]["query"]
+    assert re.fullmatch(r"/\* [0-9a-f]{32} \*/\nRETURN 1", query)
+
+    assert aql.requests == [
+        {
+            "query": query,
+            "bindVars": {"a": 1},
+            "batchSize": 51,
+            "ttl": 30,
+            "options": {"stream": True, "maxRuntime": 5},
+        }
+    ]
+    assert results.truncated is False
+    assert list(results) == [1, 2, 3]
+
+
+def test_query_error_before_results():
+    """Test that a query failing on the server fails before any rows are read."""
+    aql = FakeAQL(error="query killed")
+    options = AQLQueryOptions(max_runtime=5)
+
+    with pytest.raises(AQLExecutionError) as error:
+        _run_aql_query(aql, "RETURN 1", options=options, validate=False)
+
+    assert "query killed" in error.value.message
+
+
+def test_query_without_limits():
+    """Test that a query without limits returns the cursor itself."""
+    aql = FakeAQL(rows=[1, 2])
+
+    results = _run_aql_query(aql, "RETURN 1", validate=False)
+
+    assert isinstance(results, Cursor)
+    assert aql.requests == [{"query": "RETURN 1"}]
+
+
+def test_truncation_known_from_first_batch():
+    """Test that truncation is reported when the first batch shows it."""
+    cursor = FakeCursor([1, 2, 3], [4])
+    results = QueryResults(cursor, max_rows=2, deadline=None, watchdog=None)
+
+    assert results.truncated is True
+    assert list(results) == [1, 2]
+    assert cursor.closed
+
+
+def test_complete_results_known_from_first_batch():
+    """Test that complete results are known from a final first batch."""
+    results = QueryResults(FakeCursor([1, 2], []), 2, deadline=None, watchdog=None)
+
+    assert results.truncated is False
+    assert list(results) == [1, 2]
+
+
+def test_row_limit_larger_than_batch(monkeypatch):
+    """Test that a row limit over the batch size still ends the results cleanly."""
+    monkeypatch.setattr(multinet.db, "AQL_BATCH_SIZE", 2)
+    aql = FakeAQL(rows=list(range(10)))
+    options = AQLQueryOptions(batch_size=2, max_rows=5)
+
+    results = _run_aql_query(aql, "RETURN 1", options=options, validate=False)
+
+    # The first batch is large enough to show that rows will be dropped
+    assert aql.requests[0]["batchSize"] == 6
+    assert results.truncated is True
+    assert list(results) == [0, 1, 2, 3, 4]
+
+
+def test_deadline_until_last_batch():
+    """Test that the deadline only applies while the server is still running."""
+    expired = time.monotonic() - 1
+
+    results = QueryResults(FakeCursor([1, 2], [3]), None, expired, watchdog=None)
+    with pytest.raises(AQLExecutionError, match="maximum runtime"):
+        list(results)
+
+    # A client reading slowly, once every batch has been returned, isn't cut off
+    results = QueryResults(FakeCursor([1, 2], []), None, expired, watchdog=None)
+    assert list(results) == [1, 2]
+
+
+def test_admission_with_bind_vars(monkeypatch):
+    """Test that queries are estimated with their bind vars, once per set of values."""
+    monkeypatch.setattr(multinet.db, "AQL_MAX_ESTIMATED_COST", 100)
+    monkeypatch.setattr(multinet.db, "_admitted_queries", multinet.db.TTLCache(8, 60))
+
+    aql = FakeAQL(plan={"estimatedCost": 10, "nodes": []})
+    handle = FakeDatabase(aql)
+    query = "FOR d IN @@table RETURN d"
+
+    admit_aql_query(handle, query, {"@table": "small"})
+    admit_aql_query(handle, query, {"@table": "small"})
+    assert aql.requests == [{"query": query, "bindVars": {"@table": "small"}}]
+
+    aql.plan = {
+        "estimatedCost": 1000,
+        "nodes": [{"type": "EnumerateCollectionNode", "collection": "large"}],
+    }
+    with pytest.raises(QueryTooExpensive) as error:
+        admit_aql_query(handle, query, {"@table": "large"})
+
+    assert error.value.flask_response()[0]["full_scans"] == ["large"]
+
+
+def running_query(query_id, query):
+    """Return the description of a running query, as python-arango lists it."""
+    return {
+        "id": query_id,
+        "query": query,
+        "bind_vars": {},
+        "started": "2020-01-01T00:00:00Z",
+        "runtime": 10.0,
+        "state": "executing",
+    }
+
+
+def test_watchdog_kills_only_its_query():
+    """Test that the watchdog kills the run it was started for, and no other."""
+    aql = FakeAQL()
+    aql.running = [
+        running_query("1", "RETURN 1"),
+        running_query("2", "/* tag */\nRETURN 1"),
+        running_query("3", "/* other */\nRETURN 1"),
+    ]
+
+    watchdog = _kill_query_after(aql, "/* tag */", 0.01)
+    watchdog.join(1)
+
+    assert aql.killed == ["2"]
+
+
+def test_watchdog_kills_long_query():
+    """Test that a long query is found, though the server lists only its start."""
+    aql = FakeAQL(rows=[1])
+    options = AQLQueryOptions(max_runtime=0.01)
+    long_query = "RETURN " + " + ".join(["1"] * 2000)
+
+    results = _run_aql_query(aql, long_query, options=options, validate=False)
+
+    # The server truncates the queries it lists to 4096 characters by default
+    query = aql.requests[0]["query"]
+    assert len(query) > 4096
+    aql.running = [running_query("9", query[:4096])]
+
+    results.watchdog.join(1)
+    assert aql.killed == ["9"]
+
+
+def test_watchdog_cancelled():
+    """Test that a query finishing in time cancels its watchdog."""
+    aql = FakeAQL(rows=[1])
+    options = AQLQueryOptions(max_runtime=1)
+
+    results = _run_aql_query(aql, "RETURN 1", options=options, validate=False)
+    aql.running = [running_query("1", aql.requests[0]["query"])]
+    assert list(results) == [1]
+
+    results.watchdog.join(1)
+    assert aql.killed == []
+
+
+def test_watchdog_kills_slow_query():
+    """Test that a query still running past its maximum runtime is killed."""
+    aql = FakeAQL(rows=[1])
+    options = AQLQueryOptions(max_runtime=0.01)
+
+    results = _run_aql_query(aql, "RETURN 1", options=options, validate=False)
+    aql.running = [running_query("7", aql.requests[0]["query"])]
+
+    results.watchdog.join(1)
+    assert aql.killed == ["7"]
+
+    # The rows already returned by the server are still read
+    assert list(results) == [1]
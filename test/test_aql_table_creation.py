@@ -1,6 +1,7 @@
 """Tests for creating a table from an AQL query."""
 
 import conftest
+import multinet.db
 
 
 def test_malformed_aql(managed_workspace, managed_user, server):
@@ -111,3 +112,21 @@ def test_unsupported_table(populated_workspace, managed_user, server):
 
     assert resp.status_code == 400
     assert "UnsupportedTable" in error_types
+
+
+def test_expensive_aql(populated_workspace, managed_user, server, monkeypatch):
+    """Test that a query estimated to cost more than the limit is rejected."""
+    workspace, _, node_table, _ = populated_workspace
+    monkeypatch.setattr(multinet.db, "AQL_MAX_ESTIMATED_COST", 1)
+
+    aql = f"FOR a in {node_table} FOR b in {node_table} RETURN [a, b]"
+
+    with conftest.login(managed_user, server):
+        resp = server.post(
+            f"/api/workspaces/{workspace.name}/tables",
+            data=aql,
+            query_string={"table": "expensive_table"},
+        )
+
+    assert resp.status_code == 400
+    assert resp.json["full_scans"] == [node_table, node_table]
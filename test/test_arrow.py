@@ -0,0 +1,261 @@
+"""Test the conversion of tables to and from Parquet and Arrow data."""
+import io
+import math
+from datetime import date, datetime
+
+import pytest
+
+import conftest
+from multinet.types import EntityMetadata
+from multinet.validation.csv import InvalidRow, validate_csv_batch
+
+pyarrow = pytest.importorskip("pyarrow")
+import pyarrow.ipc  # noqa: E402
+import pyarrow.parquet  # noqa: E402
+
+from multinet.downloaders import arrow as arrow_downloader  # noqa: E402
+from multinet.downloaders.arrow import ChunkSink, write_table  # noqa: E402
+from multinet.uploaders.arrow import (  # noqa: E402
+    batch_rows,
+    read_batches,
+    table_metadata,
+)
+
+
+class FakeCursor(list):
+    """A database cursor over a list of rows."""
+
+    def close(self, ignore_missing=False):
+        """Release the cursor."""
+
+
+class FakeTable:
+    """A table whose rows and metadata are held in memory."""
+
+    def __init__(self, rows, metadata):
+        """Create a table holding `rows`, described by `metadata`."""
+        self.rows = rows
+        self.metadata = metadata
+
+    def get_metadata(self):
+        """Return the metadata of this table."""
+        return EntityMetadata(item_id="table", table=self.metadata)
+
+    def headers(self):
+        """Return the fields of the first row, then those only on other rows."""
+        first = list(self.rows[0]) if self.rows else []
+        rest = {key for row in self.rows for key in row} - set(first)
+        return first + sorted(rest)
+
+    def stream_rows(self, batch_size):
+        """Return a cursor over the rows of this table."""
+        return FakeCursor(self.rows)
+
+
+def upload_rows(table, file_format, key="_key"):
+    """Write an Arrow table in `file_format`, and read it back as table rows."""
+    body = io.BytesIO()
+    if file_format == "parquet":
+        pyarrow.parquet.write_table(table, body)
+    elif file_format == "file":
+        with pyarrow.ipc.new_file(body, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        with pyarrow.ipc.new_stream(body, table.schema) as writer:
+            writer.write_table(table)
+
+    body.seek(0)
+    return [row for batch in read_batches(body) for row in batch_rows(batch, key)]
+
+
+def download_table(rows, metadata, file_format):
+    """Write rows through the downloader, and read them back as an Arrow table."""
+    sink = ChunkSink()
+    data = b""
+    for _ in write_table(FakeTable(rows, metadata), file_format, sink):
+        data += sink.take()
+
+    if file_format == "parquet":
+        return pyarrow.parquet.read_table(io.BytesIO(data))
+
+    return pyarrow.ipc.open_stream(data).read_all()
+
+
+def test_batch_rows_converts_values():
+    """Test that values are converted into ones that can be stored as JSON."""
+    table = pyarrow.table(
+        {
+            "id": [1, 2],
+            "score": [1.5, math.nan],
+            "ratio": [math.inf, -math.inf],
+            "when": [date(2020, 1, 2), None],
+            "blob": [b"\x00\x01", b""],
+            "events": [[datetime(2020, 1, 2, 3, 4)], []],
+            "nested": [{"at": date(2021, 5, 6), "raw": b"\xff"}, None],
+        }
+    )
+
+    rows = upload_rows(table, "stream", key="id")
+
+    assert rows == [
+        {
+            "_key": "1",
+            "id": 1,
+            "score": 1.5,
+            "ratio": None,
+            "when": "2020-01-02",
+            "blob": "AAE=",
+            "events": ["2020-01-02T03:04:00"],
+            "nested": {"at": "2021-05-06", "raw": "/w=="},
+        },
+        {
+            "_key": "2",
+            "id": 2,
+            "score": None,
+            "ratio": None,
+            "when": None,
+            "blob": "",
+            "events": [],
+            "nested": None,
+        },
+    ]
+
+
+def test_batch_rows_stringifies_key():
+    """Test that `_key` is always a string, even when it's the key column."""
+    rows = upload_rows(pyarrow.table({"_key": [1, 2]}), "stream")
+
+    assert [row["_key"] for row in rows] == ["1", "2"]
+
+
+def test_invalid_edge_cells():
+    """Test that null or non-string edge cells are validation errors."""
+    table = pyarrow.table(
+        {"_from": ["people/1", None, "people/3"], "_to": ["people/2", "people/1", None]}
+    )
+    rows = upload_rows(table, "stream") + upload_rows(
+        pyarrow.table({"_from": ["people/4"], "_to": [5]}), "stream"
+    )
+
+    assert validate_csv_batch(rows, "_key", True, 10, set()) == [
+        InvalidRow(row=13, columns=["_from"]),
+        InvalidRow(row=14, columns=["_to"]),
+        InvalidRow(row=15, columns=["_to"]),
+    ]
+
+
+@pytest.mark.parametrize("file_format", ["parquet", "file", "stream"])
+def test_upload_round_trip(file_format):
+    """Test that a table is read back as it was written, in each format."""
+    table = pyarrow.table(
+        {
+            "_key": ["a", "b", "c"],
+            "count": [1, None, 3],
+            "flag": [True, False, None],
+            "label": pyarrow.array(["x", "y", "x"]).dictionary_encode(),
+        }
+    )
+
+    rows = upload_rows(table, file_format)
+
+    assert rows == table.to_pylist()
+    assert [(col.key, col.type) for col in table_metadata(table.schema).columns] == [
+        ("count", "number"),
+        ("flag", "boolean"),
+        ("label", "category"),
+    ]
+
+
+@pytest.mark.parametrize("file_format", ["parquet", "arrow"])
+def test_download_round_trip(file_format):
+    """Test that a downloaded table uploads back to the same rows."""
+    table = pyarrow.table(
+        {
+            "_key": ["a", "b", "c"],
+            "count": [1.5, None, 3.0],
+            "flag": [True, False, None],
+            "when": [datetime(2020, 1, 2, 3, 4, 5), None, datetime(2021, 1, 1)],
+            "name": ["x", None, "z"],
+        }
+    )
+    rows = upload_rows(table, "stream")
+    metadata = table_metadata(table.schema)
+
+    downloaded = download_table(rows, metadata, file_format)
+
+    assert downloaded.schema.field("count").type == pyarrow.float64()
+    assert downloaded.schema.field("flag").type == pyarrow.bool_()
+    assert downloaded.schema.field("when").type == pyarrow.timestamp("us")
+    assert downloaded.schema.field("name").type == pyarrow.string()
+    assert upload_rows(downloaded, "stream") == rows
+
+
+def test_download_mistyped_entries():
+    """Test that entries not matching their column type are written as nulls."""
+    metadata = table_metadata(
+        pyarrow.schema([("count", pyarrow.int64()), ("when", pyarrow.date32())])
+    )
+    rows = [
+        {"_key": "a", "count": "many", "when": "not a date", "extra": {"b": 1}},
+        {"_key": "b", "count": 2, "when": "2020-01-02T03:04:05+01:00", "extra": 1},
+    ]
+
+    downloaded = download_table(rows, metadata, "arrow")
+
+    assert downloaded.to_pylist() == [
+        {"_key": "a", "count": None, "extra": '{"b": 1}', "when": None},
+        {
+            "_key": "b",
+            "count": 2.0,
+            "extra": "1",
+            "when": datetime(2020, 1, 2, 2, 4, 5),
+        },
+    ]
+
+
+def test_download_differing_keys(monkeypatch):
+    """Test that fields missing from the first rows are still downloaded."""
+    monkeypatch.setattr(arrow_downloader, "ARROW_DOWNLOAD_BATCH_SIZE", 2)
+    rows = [
+        {"_key": "a", "name": "x"},
+        {"_key": "b", "size": 2},
+        {"_key": "c", "name": "z"},
+        {"_key": "d", "late": True},
+    ]
+
+    downloaded = download_table(rows, table_metadata(pyarrow.schema([])), "arrow")
+
+    assert downloaded.column_names == ["_key", "name", "late", "size"]
+    assert downloaded.to_pylist() == [
+        {"_key": "a", "name": "x", "late": None, "size": None},
+        {"_key": "b", "name": None, "late": None, "size": "2"},
+        {"_key": "c", "name": "z", "late": None, "size": None},
+        {"_key": "d", "name": None, "late": "true", "size": None},
+    ]
+
+
+@pytest.mark.parametrize("file_format", ["parquet", "arrow"])
+def test_download_table_differing_keys(
+    server, managed_workspace, managed_user, file_format
+):
+    """Test that a stored table is downloaded with the fields of all its rows."""
+    rows = [{"_key": str(i), "name": f"row {i}"} for i in range(10)]
+    rows[7]["extra"] = "only here"
+    managed_workspace.create_table("rows", edge=False).insert(rows)
+
+    with conftest.login(managed_user, server):
+        resp = server.get(
+            f"/api/workspaces/{managed_workspace.name}/tables/rows/download/"
+            f"{file_format}"
+        )
+
+    assert resp.status_code == 200
+    if file_format == "parquet":
+        downloaded = pyarrow.parquet.read_table(io.BytesIO(resp.data))
+    else:
+        downloaded = pyarrow.ipc.open_stream(resp.data).read_all()
+
+    assert set(downloaded.column_names) == {"_key", "name", "extra"}
+    assert sorted(downloaded.to_pylist(), key=lambda row: int(row["_key"])) == [
+        {"extra": None, **row} for row in rows
+    ]
@@ -0,0 +1,117 @@
+"""Test the batched import of documents, against an in-memory collection."""
+import threading
+
+from multinet.db.bulk import bulk_insert, import_batch
+
+
+class FakeCollection:
+    """A collection that stores imported documents, rejecting duplicate keys."""
+
+    def __init__(self):
+        """Create an empty collection."""
+        self.documents = {}
+        self.lock = threading.Lock()
+
+    def import_bulk(self, documents, halt_on_error, details, on_duplicate):
+        """Import `documents`, describing each one that's rejected."""
+        result = {
+            "created": 0,
+            "errors": 0,
+            "empty": 0,
+            "updated": 0,
+            "ignored": 0,
+            "details": [],
+        }
+
+        with self.lock:
+            for position, document in enumerate(documents):
+                key = document["_key"]
+                if key not in self.documents:
+                    self.documents[key] = document
+                    result["created"] += 1
+                elif on_duplicate == "ignore":
+                    result["ignored"] += 1
+                else:
+                    result["errors"] += 1
+                    result["details"].append(
+                        f"at position {position}: unique constraint violated; "
+                        f"conflicting key: {key}"
+                    )
+
+        return result
+
+
+def documents(*keys):
+    """Return a document for each key."""
+    return [{"_key": str(key)} for key in keys]
+
+
+def test_import_batch_counts_errors():
+    """Test that a batch reports each document the collection rejects."""
+    collection = FakeCollection()
+    result = import_batch(collection, 3, documents(1, 2, 1))
+
+    assert result.batch == 3
+    assert result.created == 2
+    assert result.errors == 1
+    assert result.details == [
+        "at position 2: unique constraint violated; conflicting key: 1"
+    ]
+
+
+def test_bulk_insert_combines_batches():
+    """Test that results of concurrent batches are combined in batch order."""
+    collection = FakeCollection()
+    progress = []
+
+    result = bulk_insert(
+        collection,
+        iter(documents(*range(10))),
+        batch_size=3,
+        threads=2,
+        progress=lambda batch: progress.append(batch.batch),
+    )
+
+    assert result.created == 10
+    assert result.errors == 0
+    assert result.failures() == []
+    assert [batch.batch for batch in result.batches] == [0, 1, 2, 3]
+    assert progress == [0, 1, 2, 3]
+    assert sorted(collection.documents, key=int) == [str(key) for key in range(10)]
+
+
+def test_bulk_insert_failures():
+    """Test that rejected documents are reported with the batch they were in."""
+    collection = FakeCollection()
+
+    result = bulk_insert(
+        collection, documents(1, 2, 3, 1, 4, 2), batch_size=2, threads=1
+    )
+
+    assert result.created == 4
+    assert result.errors == 2
+    assert [failure.dict() for failure in result.failures()] == [
+        {
+            "batch": 1,
+            "message": "at position 1: unique constraint violated; conflicting key: 1",
+            "type": "InsertFailure",
+        },
+        {
+            "batch": 2,
+            "message": "at position 1: unique constraint violated; conflicting key: 2",
+            "type": "InsertFailure",
+        },
+    ]
+
+
+def test_bulk_insert_ignored_duplicates():
+    """Test that ignored duplicates aren't reported as failures."""
+    collection = FakeCollection()
+
+    result = bulk_insert(
+        collection, documents(1, 1, 2), batch_size=2, threads=1, on_duplicate="ignore"
+    )
+
+    assert result.created == 2
+    assert result.ignored == 1
+    assert result.failures() == []
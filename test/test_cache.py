@@ -0,0 +1,183 @@
+"""Test the expiring caches used for workspace metadata and query results."""
+import time
+
+from multinet.cache import TTLCache, ttl_cache
+from multinet.db.query_cache import QueryResultCache
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    """Test that a full cache drops the entry used least recently."""
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+
+    assert cache.get("a") == 1
+
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_ttl_cache_expires_entries():
+    """Test that entries are no longer returned once they expire."""
+    cache = TTLCache(maxsize=2, ttl=0.01)
+    cache.set("a", None)
+
+    assert cache.get("a", "missing") is None
+    time.sleep(0.02)
+    assert cache.get("a", "missing") == "missing"
+
+
+def test_revision_change_clears_cache():
+    """Test that cached results are discarded when the revision changes."""
+    revision = [1]
+    calls = []
+
+    @ttl_cache(maxsize=8, ttl=60, revision=lambda: revision[0])
+    def lookup(name):
+        calls.append(name)
+        return name.upper()
+
+    assert lookup("a") == "A"
+    assert lookup("a") == "A"
+    assert calls == ["a"]
+
+    revision[0] = 2
+    assert lookup("a") == "A"
+    assert calls == ["a", "a"]
+
+    info = lookup.cache_info()
+    assert (info.hits, info.misses) == (1, 2)
+
+
+class FakeCollection:
+    """A collection whose revision is looked up in a shared dict."""
+
+    def __init__(self, revisions, name):
+        """Create the collection."""
+        self.revisions = revisions
+        self.name = name
+
+    def revision(self):
+        """Return the current revision."""
+        return self.revisions[self.name]
+
+
+class FakeAQL:
+    """An AQL API whose parser only recognizes calls to RAND, and traversals."""
+
+    def validate(self, query):
+        """Return a minimal parse of `query`."""
+        nodes = []
+        if "RAND" in query:
+            nodes.append({"type": "function call", "name": "RAND", "subNodes": []})
+        if "ANY" in query:
+            nodes.append({"type": "traversal", "subNodes": []})
+
+        ast = [{"type": "root", "subNodes": [{"type": "for", "subNodes": nodes}]}]
+        return {"collections": ["table1"], "ast": ast}
+
+
+class FakeDatabase:
+    """A database holding a table, and the edges between its rows."""
+
+    name = "workspace"
+    aql = FakeAQL()
+
+    def __init__(self):
+        """Create the database."""
+        self.revisions = {"table1": "1", "edges": "1"}
+
+    def collection(self, name):
+        """Return the collection `name`."""
+        return FakeCollection(self.revisions, name)
+
+    def collections(self):
+        """Return a description of every collection."""
+        return [{"name": name, "system": False} for name in self.revisions]
+
+
+def test_query_cache_invalidated_by_revision():
+    """Test that cached query results are discarded when their tables change."""
+    cache = QueryResultCache(maxsize=8, ttl=60, revalidate=0, max_rows=100)
+    handle = FakeDatabase()
+    calls = []
+
+    def execute():
+        calls.append(1)
+        return iter([{"a": len(calls)}])
+
+    query = "FOR d IN table1 RETURN d"
+    assert list(cache.run(handle, query, None, execute)) == [{"a": 1}]
+    assert list(cache.run(handle, query, None, execute)) == [{"a": 1}]
+    assert len(calls) == 1
+
+    handle.revisions["table1"] = "2"
+    assert list(cache.run(handle, query, None, execute)) == [{"a": 2}]
+
+    # Non-deterministic queries are never cached
+    list(cache.run(handle, "RETURN RAND()", None, execute))
+    list(cache.run(handle, "RETURN RAND()", None, execute))
+    assert len(calls) == 4
+
+    info = cache.info()
+    assert (info.hits, info.misses) == (1, 2)
+
+
+def test_query_cache_traversal_reads_every_collection():
+    """Test that traversals are invalidated by changes to any collection."""
+    cache = QueryResultCache(maxsize=8, ttl=60, revalidate=0, max_rows=100)
+    handle = FakeDatabase()
+    calls = []
+
+    def execute():
+        calls.append(1)
+        return iter([len(calls)])
+
+    # The parser lists only `table1`, but vertices of any collection may be read
+    for query in [
+        "FOR v IN 1 ANY 'table1/a' table1 RETURN v",
+        "FOR v IN 1 OUTBOUND 'table1/a' table1 RETURN v",
+        "FOR v IN OUTBOUND SHORTEST_PATH 'table1/a' TO 'table1/b' table1 RETURN v",
+    ]:
+        calls.clear()
+        assert list(cache.run(handle, query, None, execute)) == [1]
+        assert list(cache.run(handle, query, None, execute)) == [1]
+
+        handle.revisions["edges"] += "1"
+        assert list(cache.run(handle, query, None, execute)) == [2]
+
+
+def test_query_cache_streams_results():
+    """Test that results are streamed as they're cached, up to the row limit."""
+    cache = QueryResultCache(maxsize=8, ttl=60, revalidate=60, max_rows=3)
+    handle = FakeDatabase()
+    read = []
+
+    def execute(count):
+        def rows():
+            for row in range(count):
+                read.append(row)
+                yield row
+
+        return rows
+
+    # Rows are passed on as they're read
+    results = cache.run(handle, "FOR d IN table1 RETURN 1", None, execute(3))
+    assert next(iter(results)) == 0
+    assert read == [0]
+
+    # Results that weren't read to the end aren't cached
+    assert cache.info().currsize == 0
+    assert list(results) == [1, 2]
+    assert cache.info().currsize == 1
+
+    # Results over the row limit aren't cached
+    assert list(cache.run(handle, "FOR d IN table1 RETURN 2", None, execute(4))) == [
+        0,
+        1,
+        2,
+        3,
+    ]
+    assert cache.info().currsize == 1
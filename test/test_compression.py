@@ -0,0 +1,151 @@
+"""Test the compression of responses."""
+import gzip
+import zlib
+
+import pytest
+from flask import Flask, Response
+
+from multinet import compression
+from multinet.compression import compress_response
+from multinet.errors import AQLExecutionError, ServerError
+
+LARGE = b"".join(b'{"row": %d},' % i for i in range(2000))
+SMALL = b'{"row": 1}'
+
+
+@pytest.fixture
+def client():
+    """Return a test client for an app that compresses its responses."""
+    app = Flask(__name__)
+    app.after_request(compress_response)
+
+    @app.errorhandler(ServerError)
+    def handle_error(error):
+        return error.flask_response()
+
+    @app.route("/large")
+    def large():
+        return Response(LARGE, mimetype="application/json")
+
+    @app.route("/small")
+    def small():
+        return Response(SMALL, mimetype="application/json")
+
+    @app.route("/stream/<int:size>")
+    def stream(size):
+        # Chunks of both str and bytes may be streamed
+        def chunks():
+            for i in range(0, size, 100):
+                chunk = LARGE[i : min(i + 100, size)]
+                yield chunk.decode() if i % 200 else chunk
+
+        response = Response(chunks(), mimetype="application/json")
+        if size < len(SMALL) * 2:
+            response.headers["Content-Length"] = str(size)
+
+        return response
+
+    @app.route("/stream/fails")
+    def stream_fails():
+        def chunks():
+            yield b"["
+            raise AQLExecutionError("query killed")
+
+        return Response(chunks(), mimetype="application/json")
+
+    @app.route("/image")
+    def image():
+        return Response(LARGE, mimetype="image/png")
+
+    return app.test_client()
+
+
+@pytest.mark.parametrize(
+    "accept,encoding",
+    [
+        (None, None),
+        ("identity", None),
+        ("br", None),
+        ("gzip", "gzip"),
+        ("deflate, gzip;q=0.5", "gzip"),
+        ("zstd, gzip;q=0.5", "gzip"),
+        ("*", "gzip"),
+    ],
+)
+def test_negotiate_encoding(client, monkeypatch, accept, encoding):
+    """Test that a supported encoding is only used when the client accepts it."""
+    monkeypatch.setattr(compression, "zstandard", None)
+    headers = {"Accept-Encoding": accept} if accept else {}
+
+    resp = client.get("/large", headers=headers)
+
+    assert resp.headers.get("Content-Encoding") == encoding
+    assert "Accept-Encoding" in resp.headers["Vary"]
+
+    data = gzip.decompress(resp.data) if encoding else resp.data
+    assert data == LARGE
+
+
+def test_uncompressible_mimetype(client):
+    """Test that responses of other types aren't compressed."""
+    resp = client.get("/image", headers={"Accept-Encoding": "gzip"})
+
+    assert "Content-Encoding" not in resp.headers
+    assert resp.data == LARGE
+
+
+def test_small_response_passthrough(client):
+    """Test that responses under the minimum size are sent uncompressed."""
+    resp = client.get("/small", headers={"Accept-Encoding": "gzip"})
+
+    assert "Content-Encoding" not in resp.headers
+    assert resp.data == SMALL
+
+
+@pytest.mark.parametrize("size", [1, compression.COMPRESSION_MIN_SIZE, len(LARGE)])
+def test_streamed_response(client, size):
+    """Test that a streamed response decompresses back to the same bytes."""
+    resp = client.get(f"/stream/{size}", headers={"Accept-Encoding": "gzip"})
+
+    # Streamed responses are compressed unless they declare a small size
+    if size < len(SMALL) * 2:
+        assert "Content-Encoding" not in resp.headers
+        assert resp.data == LARGE[:size]
+    else:
+        assert resp.headers["Content-Encoding"] == "gzip"
+        assert gzip.decompress(resp.data) == LARGE[:size]
+
+
+def test_streamed_chunks_flushed(client):
+    """Test that each streamed chunk can be decompressed as soon as it's received."""
+    resp = client.get(
+        f"/stream/{len(LARGE)}", headers={"Accept-Encoding": "gzip"}, buffered=False
+    )
+
+    decompressor = zlib.decompressobj(31)
+    received = b""
+    sizes = []
+    for chunk in resp.response:
+        received += decompressor.decompress(chunk)
+        sizes.append(len(received))
+
+    resp.close()
+    assert received == LARGE
+
+    # Every chunk of 100 bytes is decompressed in full, before the end of the stream
+    chunk_ends = list(range(100, len(LARGE), 100)) + [len(LARGE)]
+    assert sizes == chunk_ends + [len(LARGE)]
+
+
+@pytest.mark.parametrize("accept", [None, "gzip"])
+def test_streamed_error(client, accept):
+    """Test that an error while streaming isn't raised before the response is sent."""
+    headers = {"Accept-Encoding": accept} if accept else {}
+    resp = client.get("/stream/fails", headers=headers, buffered=False)
+
+    # The body is only read once the response has started
+    assert resp.status_code == 200
+    assert resp.headers.get("Content-Encoding") == accept
+
+    with pytest.raises(AQLExecutionError):
+        list(resp.response)
@@ -6,7 +6,13 @@ import pytest
 
 import conftest
 from multinet.errors import DecodeFailed
+from multinet.processing import process_rows
+from multinet.processing import parallel
+from multinet.processing.parallel import process_table_batch
+from multinet.types import ColumnMetadata
+from multinet.uploaders import csv as csv_uploader
 from multinet.uploaders.csv import decode_data
+from multinet.util import batched
 from multinet.validation import DuplicateKey, UnsupportedTable
 from multinet.validation.csv import (
     validate_csv,
@@ -134,3 +140,132 @@ def test_decode_failed():
     """Test that the DecodeFailed validation error is raised."""
     test_data = b"\xff\xfe_\x00k\x00e\x00y\x00,\x00n\x00a\x00m\x00e\x00\n"
     pytest.raises(DecodeFailed, decode_data, test_data)
+
+
+def process_in_batches(rows, columns, key_field, edge, batch_size):
+    """Process and validate rows in batches, as the CSV uploader does."""
+    unique_keys = set()
+    processing_errors = []
+    validation_errors = []
+
+    start = 0
+    for batch in batched(rows, batch_size):
+        _, batch_processing_errors, batch_validation_errors = process_table_batch(
+            batch, columns, key_field, edge, start, unique_keys
+        )
+        processing_errors.extend(batch_processing_errors)
+        validation_errors.extend(batch_validation_errors)
+        start += len(batch)
+
+    return (processing_errors, validation_errors)
+
+
+def test_duplicate_keys_across_batches():
+    """Test that duplicate keys are found when they're in different batches."""
+    rows = read_csv("clubs_invalid_duplicate_keys.csv")
+    _, errors = process_in_batches(rows, [], "_key", False, batch_size=2)
+
+    assert [err.dict() for err in errors] == [
+        DuplicateKey(key="5").dict(),
+        DuplicateKey(key="2").dict(),
+    ]
+
+
+def test_invalid_edges_across_batches():
+    """Test that invalid edges after the first batch are reported at the right row."""
+    rows = read_csv("membership_invalid_syntax.csv")
+    _, errors = process_in_batches(rows, [], "_key", True, batch_size=2)
+
+    assert [err.dict() for err in errors] == [
+        InvalidRow(row=3, columns=["_from"]).dict(),
+        InvalidRow(row=4, columns=["_to"]).dict(),
+        InvalidRow(row=5, columns=["_from", "_to"]).dict(),
+    ]
+    whole_file_errors = validate_csv(rows, key_field="_key", overwrite=False)
+    assert [err.dict() for err in errors] == [err.dict() for err in whole_file_errors]
+
+
+def test_conversion_errors_across_batches():
+    """Test that conversion errors report the same rows in batches as in one go."""
+    rows = [{"_key": str(i), "size": str(i)} for i in range(7)]
+    rows[1]["size"] = "small"
+    rows[4]["size"] = "large"
+    rows[6]["size"] = "huge"
+    columns = [ColumnMetadata(key="size", type="number")]
+
+    errors, _ = process_in_batches(rows, columns, "_key", False, batch_size=3)
+    _, expected = process_rows(rows, columns)
+
+    assert [err.dict() for err in errors] == [err.dict() for err in expected]
+    assert [err.row for err in errors] == [1, 4, 6]
+
+
+@pytest.fixture
+def upload_workers(monkeypatch):
+    """Process uploads in a pool of two workers, sending them small chunks."""
+    monkeypatch.setattr(parallel, "UPLOAD_WORKER_PROCESSES", 2)
+    monkeypatch.setattr(parallel, "UPLOAD_WORKER_CHUNK_SIZE", 2)
+
+    upload_executor = parallel.upload_executor
+    upload_executor.cache_clear()
+    executor = upload_executor()
+
+    yield executor
+
+    executor.shutdown()
+    upload_executor.cache_clear()
+
+
+@pytest.mark.parametrize(
+    "filename,edge",
+    [
+        ("clubs_invalid_duplicate_keys.csv", False),
+        ("membership_invalid_syntax.csv", True),
+    ],
+)
+def test_parallel_processing_matches_serial(
+    upload_workers, monkeypatch, filename, edge
+):
+    """Test that processing in worker processes gives the same results as serially."""
+    rows = read_csv(filename)
+    rows[1]["size"] = "small"
+    rows[3]["size"] = "large"
+    columns = [ColumnMetadata(key="size", type="number")]
+
+    # The rows are split across chunks, and the duplicate keys in the clubs are in
+    # different chunks, so they're only found once the chunks are merged
+    assert upload_workers is not None
+    assert len(rows) > parallel.UPLOAD_WORKER_CHUNK_SIZE
+    in_parallel = process_table_batch(rows, columns, "_key", edge, 10, set())
+
+    monkeypatch.setattr(parallel, "upload_executor", lambda: None)
+    serially = process_table_batch(rows, columns, "_key", edge, 10, set())
+
+    assert in_parallel[0] == serially[0]
+    for parallel_errors, serial_errors in zip(in_parallel[1:], serially[1:]):
+        assert parallel_errors
+        assert [err.dict() for err in parallel_errors] == [
+            err.dict() for err in serial_errors
+        ]
+
+
+def test_batched_upload_errors(
+    server, managed_workspace, managed_user, data_directory, monkeypatch
+):
+    """Test that an upload read in small batches reports every invalid row."""
+    monkeypatch.setattr(csv_uploader, "CSV_UPLOAD_BATCH_SIZE", 2)
+
+    with open(data_directory / "membership_invalid_syntax.csv") as csv_file:
+        request_body = csv_file.read()
+
+    with conftest.login(managed_user, server):
+        resp = server.post(
+            f"/api/csv/{managed_workspace.name}/membership", data=request_body
+        )
+
+    assert resp.status_code == 400
+    assert [(err["row"], err["columns"]) for err in resp.json["errors"]] == [
+        (3, ["_from"]),
+        (4, ["_to"]),
+        (5, ["_from", "_to"]),
+    ]
@@ -3,6 +3,7 @@ import json
 import os
 from collections import OrderedDict
 
+import conftest
 from multinet.util import data_path
 from multinet.uploaders.d3_json import (
     validate_d3_json,
@@ -44,3 +45,30 @@ def test_validate_d3_json():
     assert len(outcome4) == 2
     assert outcome4[0] == InvalidLinkKeys()
     assert outcome4[1] == InconsistentLinkKeys()
+
+
+def test_failed_upload_discards_tables(server, managed_workspace, managed_user):
+    """Test that an upload failing partway leaves no tables behind to be reused."""
+    nodes = [{"id": "a"}, {"id": "b"}]
+    links = [
+        {"_key": "link", "source": "a", "target": "b"},
+        {"_key": "link", "source": "b", "target": "a"},
+    ]
+    data = json.dumps({"nodes": nodes, "links": links})
+
+    # The nodes are inserted, but the duplicate link key is rejected
+    with conftest.login(managed_user, server):
+        resp = server.post(f"/api/d3_json/{managed_workspace.name}/graph", data=data)
+
+    assert resp.status_code == 400
+    assert list(managed_workspace.tables()) == []
+    assert not managed_workspace.has_graph("graph")
+
+    # A corrected upload starts from empty tables
+    links[1]["_key"] = "other"
+    data = json.dumps({"nodes": nodes, "links": links})
+    with conftest.login(managed_user, server):
+        resp = server.post(f"/api/d3_json/{managed_workspace.name}/graph", data=data)
+
+    assert resp.status_code == 200
+    assert resp.json == {"nodecount": 2, "edgecount": 2}
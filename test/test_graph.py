@@ -0,0 +1,122 @@
+"""Test reading the nodes and edges of a graph."""
+import pytest
+
+PEOPLE = ["p0", "p1", "p2", "p3", "p4"]
+PLACES = ["x0", "x1", "x2"]
+
+# Node tables are paged in name order, and each table in `_key` order
+NODE_IDS = [f"people/{key}" for key in PEOPLE] + [f"places/{key}" for key in PLACES]
+
+# The edges of `people/p0`, including one that loops back to it
+EDGES = {
+    "out_place": ("people/p0", "places/x0"),
+    "out_person": ("people/p0", "people/p1"),
+    "in_person": ("people/p2", "people/p0"),
+    "loop": ("people/p0", "people/p0"),
+    "unrelated": ("people/p1", "places/x1"),
+}
+
+
+@pytest.fixture
+def graph(managed_workspace):
+    """Create a graph whose nodes are split between two tables."""
+    # Insert in reverse, so that pages aren't in insertion order by chance
+    people = managed_workspace.create_table("people", edge=False)
+    people.insert([{"_key": key} for key in reversed(PEOPLE)])
+    places = managed_workspace.create_table("places", edge=False)
+    places.insert([{"_key": key} for key in reversed(PLACES)])
+
+    managed_workspace.create_table("visits", edge=True).insert(
+        [
+            {"_key": key, "_from": from_id, "_to": to_id}
+            for key, (from_id, to_id) in EDGES.items()
+        ]
+    )
+    managed_workspace.create_graph("visits_graph", "visits")
+
+    return managed_workspace.graph("visits_graph")
+
+
+@pytest.mark.parametrize(
+    "offset,limit",
+    [
+        (None, None),
+        (None, 3),
+        (3, 4),  # Ends in the second table
+        (5, 2),  # Starts at the first row of the second table
+        (4, 1),  # The last row of the first table
+        (7, 5),  # Runs past the last row
+        (8, 3),  # Starts just past the last row
+        (20, 5),
+        (6, None),
+    ],
+)
+def test_graph_nodes_pages(graph, offset, limit):
+    """Test that node tables are paged through as if they were one table."""
+    nodes = graph.nodes(offset, limit)
+
+    start = offset or 0
+    end = None if limit is None else start + limit
+    assert nodes["count"] == len(NODE_IDS)
+    assert [node["_id"] for node in nodes["nodes"]] == NODE_IDS[start:end]
+
+
+def test_graph_nodes_consecutive_pages(graph):
+    """Test that consecutive pages visit every node once, in order."""
+    node_ids = []
+    for offset in range(0, len(NODE_IDS), 3):
+        node_ids.extend(node["_id"] for node in graph.nodes(offset, 3)["nodes"])
+
+    assert node_ids == NODE_IDS
+
+
+def edge_ids(edges):
+    """Return the sorted IDs of a list of edges."""
+    return sorted(edge["edge"] for edge in edges)
+
+
+@pytest.mark.parametrize(
+    "direction,expected",
+    [
+        ("outgoing", ["out_place", "out_person", "loop"]),
+        ("incoming", ["in_person", "loop"]),
+    ],
+)
+def test_node_edges_direction(graph, direction, expected):
+    """Test that only the edges in the requested direction are returned."""
+    edges = graph.node_edges("people", "p0", direction)
+
+    assert edges["count"] == len(expected)
+    assert edge_ids(edges["edges"]) == sorted(f"visits/{key}" for key in expected)
+    for edge in edges["edges"]:
+        key = edge["edge"].split("/")[1]
+        assert (edge["from"], edge["to"]) == EDGES[key]
+
+
+def test_node_edges_all(graph):
+    """Test that all edges are those in either direction, and counted as returned."""
+    outgoing = graph.node_edges("people", "p0", "outgoing")["edges"]
+    incoming = graph.node_edges("people", "p0", "incoming")["edges"]
+    edges = graph.node_edges("people", "p0", "all")
+
+    assert edges["count"] == len(edges["edges"])
+    assert set(edge_ids(edges["edges"])) == set(edge_ids(outgoing + incoming))
+    assert "visits/unrelated" not in edge_ids(edges["edges"])
+
+
+@pytest.mark.parametrize("direction", ["all", "incoming", "outgoing"])
+@pytest.mark.parametrize("limit", [1, 2, 10])
+def test_node_edges_pages(graph, direction, limit):
+    """Test that a page of edges is counted as if it weren't limited."""
+    edges = graph.node_edges("people", "p0", direction)
+    total = edges["count"]
+
+    paged = []
+    for offset in range(0, total + limit, limit):
+        page = graph.node_edges("people", "p0", direction, offset, limit)
+
+        assert page["count"] == total
+        assert len(page["edges"]) == max(min(limit, total - offset), 0)
+        paged.extend(page["edges"])
+
+    assert edge_ids(paged) == edge_ids(edges["edges"])
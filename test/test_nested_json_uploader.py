@@ -0,0 +1,40 @@
+"""Tests functions in the nested JSON Uploader Flask Blueprint."""
+import sys
+
+from multinet.uploaders.nested_json import analyze_nested_json, read_nested_json
+
+
+def test_analyze_nested_json():
+    """Test that internal and leaf nodes are split, with edges to their parents."""
+    data = """{
+        "node_data": {"_key": "root"},
+        "children": [
+            {"node_data": {"_key": "a"}, "children": [{"node_data": {"_key": "b"}}]},
+            {"node_data": {"_key": "c"}, "edge_data": {"weight": 2}}
+        ]
+    }"""
+
+    nodes, edges = analyze_nested_json(data, "internal", "leaves")
+
+    assert nodes == [[{"_key": "root"}, {"_key": "a"}], [{"_key": "b"}, {"_key": "c"}]]
+    assert edges == [
+        {"_from": "internal/a", "_to": "internal/root"},
+        {"_from": "leaves/c", "_to": "internal/root", "weight": 2},
+        {"_from": "leaves/b", "_to": "internal/a"},
+    ]
+
+
+def test_read_deep_nested_json():
+    """Test that a tree deeper than the recursion limit can be read."""
+    depth = sys.getrecursionlimit() * 2
+
+    tree = {"node_data": {"_key": "leaf"}}
+    for index in range(depth):
+        tree = {"node_data": {"_key": str(index)}, "children": [tree]}
+
+    nodes, edges = read_nested_json(tree, "internal", "leaves")
+
+    assert len(nodes[0]) == depth
+    assert nodes[1] == [{"_key": "leaf"}]
+    assert len(edges) == depth
+    assert edges[-1] == {"_from": "leaves/leaf", "_to": "internal/0"}
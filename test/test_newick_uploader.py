@@ -1,11 +1,12 @@
 """Tests functions in the Neick Uploader Flask Blueprint."""
 import newick
 import os
+import sys
 import pytest
 
 from multinet.errors import ValidationFailed, DecodeFailed
 from multinet.validation import DuplicateKey
-from multinet.uploaders.newick import validate_newick, decode_data
+from multinet.uploaders.newick import read_newick, validate_newick, decode_data
 
 TEST_DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "data"))
 
@@ -34,3 +35,25 @@ def test_validate_newick():
         b"\x00C\x00,\x00E\x00)\x00,\x00D\x00)\x00;\x00\n\x00"
     )
     pytest.raises(DecodeFailed, decode_data, test_data)
+
+
+def test_read_deep_newick():
+    """Test that a tree deeper than the recursion limit can be read."""
+    depth = sys.getrecursionlimit() * 2
+
+    root = node = newick.Node("root")
+    for index in range(depth):
+        child = newick.Node(str(index), length=str(index))
+        node.add_descendant(child)
+        node = child
+
+    nodes, edges, errors = read_newick(root, "table")
+
+    assert errors == []
+    assert len(nodes) == depth + 1
+    assert len(edges) == depth
+    assert edges[-1] == {
+        "_from": f"table/{depth - 2}",
+        "_to": f"table/{depth - 1}",
+        "length": depth - 1,
+    }
@@ -0,0 +1,83 @@
+"""Test paging through the rows of a table with cursor tokens."""
+import math
+
+import pytest
+
+import conftest
+from multinet.errors import BadQueryArgument
+from multinet.util import decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    """Test that a cursor decodes back to the key it was made from."""
+    for key in ["1", "Jean Valjean", "ünïcode/key"]:
+        assert decode_cursor(encode_cursor(key)) == key
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "not a cursor",
+        "e30",  # Incorrectly padded
+        "e30=",  # {}
+        "WzFd",  # [1]
+        "eyJhZnRlciI6IDF9",  # {"after": 1}
+        "__8=",  # Not UTF-8
+    ],
+)
+def test_malformed_cursor(cursor):
+    """Test that a malformed cursor is reported as a bad argument."""
+    with pytest.raises(BadQueryArgument) as error:
+        decode_cursor(cursor)
+
+    _, status = error.value.flask_response()
+    assert status.startswith("400")
+
+
+# The miserables node table has 77 rows: 7 divides it exactly, so its last page is
+# full, while 10 leaves a partial last page
+@pytest.mark.parametrize("limit", [7, 10])
+def test_page_through_table(populated_workspace, managed_user, server, limit):
+    """Test that following cursors visits every row once, ending with no cursor."""
+    workspace, _, node_table, _ = populated_workspace
+    url = f"/api/workspaces/{workspace.name}/tables/{node_table}"
+
+    with conftest.login(managed_user, server):
+        pages = []
+        params = {"limit": limit}
+        while True:
+            resp = server.get(url, query_string=params)
+            assert resp.status_code == 200
+
+            pages.append(resp.json)
+            if resp.json["next"] is None:
+                break
+
+            params["cursor"] = resp.json["next"]
+
+    count = pages[0]["count"]
+    keys = [row["_key"] for page in pages for row in page["rows"]]
+    assert count == 77
+    assert len(keys) == count
+    assert keys == sorted(set(keys))
+
+    # Every page is full except possibly the last, and only the last has no cursor
+    assert len(pages) == math.ceil(count / limit)
+    assert all(len(page["rows"]) == limit for page in pages[:-1])
+    assert len(pages[-1]["rows"]) == count - limit * (len(pages) - 1)
+    assert all(page["next"] is not None for page in pages[:-1])
+    assert pages[-1]["next"] is None
+
+
+def test_page_with_malformed_cursor(populated_workspace, managed_user, server):
+    """Test that a malformed cursor is rejected with a 400 error."""
+    workspace, _, node_table, _ = populated_workspace
+
+    with conftest.login(managed_user, server):
+        resp = server.get(
+            f"/api/workspaces/{workspace.name}/tables/{node_table}",
+            query_string={"limit": 10, "cursor": "not a cursor"},
+        )
+
+    assert resp.status_code == 400
+    assert resp.json == {"argument": "cursor", "value": "not a cursor"}
@@ -0,0 +1,162 @@
+"""Test the conversion of table rows to the types given by column metadata."""
+from datetime import datetime
+
+import pytest
+
+from multinet.processing import process_rows
+from multinet.processing import processors
+from multinet.processing.processors import (
+    infer_date_format,
+    process_date_column,
+    process_date_entry,
+)
+from multinet.types import ColumnMetadata
+from multinet.validation import MissingColumn, TypeConversionFailure
+
+
+def columns(**types):
+    """Return metadata giving each column its type."""
+    return [ColumnMetadata(key=key, type=type_) for key, type_ in types.items()]
+
+
+def conversion_failure(row, column, entry, type_):
+    """Return the error reported when `entry` can't be converted."""
+    return TypeConversionFailure(
+        row=row,
+        column=column,
+        message=f"Cannot convert entry '{entry}' to type: {type_}",
+    )
+
+
+def test_process_rows_converts_entries():
+    """Test that entries are converted to the type of their column."""
+    rows = [
+        {"name": "a", "count": "1", "ratio": "0.5", "flag": "yes", "when": ""},
+        {
+            "name": "b",
+            "count": "20",
+            "ratio": "3",
+            "flag": "false",
+            "when": "2020-01-02",
+        },
+    ]
+    metadata = columns(
+        name="label", count="number", ratio="number", flag="boolean", when="date"
+    )
+
+    processed, errors = process_rows(rows, metadata)
+
+    assert errors == []
+    assert processed == [
+        {"name": "a", "count": 1, "ratio": 0.5, "flag": True, "when": None},
+        {
+            "name": "b",
+            "count": 20,
+            "ratio": 3,
+            "flag": False,
+            "when": "2020-01-02T00:00:00",
+        },
+    ]
+
+    # The input rows are left unchanged
+    assert rows[0]["count"] == "1"
+
+
+def test_process_rows_reports_failures():
+    """Test that failures are reported in row, then column, order."""
+    rows = [
+        {"count": "1", "flag": "maybe"},
+        {"count": "many", "flag": "true"},
+        {"count": "lots", "flag": "nope"},
+        {"flag": "0"},
+    ]
+
+    processed, errors = process_rows(rows, columns(count="number", flag="boolean"))
+
+    assert errors == [
+        conversion_failure(0, "flag", "maybe", "boolean"),
+        conversion_failure(1, "count", "many", "number"),
+        conversion_failure(2, "count", "lots", "number"),
+        conversion_failure(2, "flag", "nope", "boolean"),
+        MissingColumn(key="count"),
+    ]
+
+    # Entries that fail conversion are left as they were
+    assert processed == [
+        {"count": 1, "flag": "maybe"},
+        {"count": "many", "flag": True},
+        {"count": "lots", "flag": "nope"},
+        {"flag": False},
+    ]
+
+
+def test_process_rows_offsets_failure_rows():
+    """Test that failures are reported relative to the start of the table."""
+    rows = [{"count": "1"}, {"count": "x"}]
+
+    _, errors = process_rows(rows, columns(count="number"), start=100)
+
+    assert errors == [conversion_failure(101, "count", "x", "number")]
+
+
+@pytest.mark.parametrize(
+    "sample,entry,expected",
+    [
+        (["2020-01-02", "2020-12-31"], "2021-03-04", datetime(2021, 3, 4)),
+        (["2020-01-02 03:04:05"], "2020-01-02 03:04:05", datetime(2020, 1, 2, 3, 4, 5)),
+        (["01/02/2020", "12/31/2020"], "03/04/2021", datetime(2021, 3, 4)),
+        (["Jan 02 2020"], "Mar 04 2021", datetime(2021, 3, 4)),
+        (["2 January 2020"], "4 March 2021", datetime(2021, 3, 4)),
+    ],
+)
+def test_infer_date_format(sample, entry, expected):
+    """Test that the format of a sample is inferred, and reads other dates."""
+    parse = infer_date_format(sample)
+
+    assert parse is not None
+    assert parse(entry) == expected
+
+
+def test_infer_ambiguous_date_format():
+    """Test that ambiguous dates are only given a format dateutil agrees with."""
+    # Read month first, as dateutil reads them
+    parse = infer_date_format(["01/02/2020", "03/04/2020"])
+    assert parse is not None
+    assert parse("01/02/2020") == datetime(2020, 1, 2)
+
+    # The second date can only be read day first, so no single format fits
+    assert infer_date_format(["01/02/2020", "13/02/2020"]) is None
+    assert infer_date_format(["not a date"]) is None
+
+
+@pytest.mark.parametrize(
+    "entries",
+    [
+        ["2020-01-02", "2020-01-02", "2020-12-31"],
+        ["01/02/2020", "12/31/2020", "13/02/2020"],
+        ["01/02/2020", "13/02/2020", "1577836800"],
+        ["Jan 02 2020", "2020-01-02", "2 January 2020"],
+    ],
+)
+def test_process_date_column(entries):
+    """Test that a column of dates is read just as each entry would be."""
+    assert process_date_column(entries) == (
+        [process_date_entry(entry) for entry in entries],
+        [],
+    )
+
+
+def test_process_date_column_outside_sample(monkeypatch):
+    """Test that dates after the sample that don't fit its format still convert."""
+    monkeypatch.setattr(processors, "DATE_FORMAT_SAMPLE_SIZE", 2)
+    entries = ["01/02/2020", "03/04/2020", "13/02/2020", "not a date"]
+
+    processed, failed = process_date_column(entries)
+
+    assert processed == [
+        "2020-01-02T00:00:00",
+        "2020-03-04T00:00:00",
+        "2020-02-13T00:00:00",
+        "not a date",
+    ]
+    assert failed == [3]
@@ -0,0 +1,103 @@
+"""Tests for saving AQL queries, and running them by name."""
+import json
+from pathlib import Path
+
+import conftest
+import multinet.db
+
+
+def test_save_and_run_query(populated_workspace, managed_user, server, data_directory):
+    """Test that a saved query can be run with values for its bind vars."""
+    workspace, _, node_table, _ = populated_workspace
+    aql = f"FOR doc IN {node_table} FILTER doc.group == @group RETURN doc"
+
+    with open(Path(data_directory) / "miserables.json") as miserables:
+        nodes = json.load(miserables)["nodes"]
+
+    with conftest.login(managed_user, server):
+        resp = server.post(
+            f"/api/workspaces/{workspace.name}/queries/by_group", data=aql
+        )
+        assert resp.status_code == 200
+        assert resp.json == {"name": "by_group", "query": aql, "bind_vars": ["group"]}
+
+        resp = server.get(f"/api/workspaces/{workspace.name}/queries")
+        assert resp.status_code == 200
+        assert [query["name"] for query in resp.json] == ["by_group"]
+
+        resp = server.post(
+            f"/api/workspaces/{workspace.name}/queries/by_group/run",
+            json={"group": 1},
+        )
+        assert resp.status_code == 200
+        assert len(resp.json) == len([node for node in nodes if node["group"] == 1])
+
+        resp = server.delete(f"/api/workspaces/{workspace.name}/queries/by_group")
+        assert resp.status_code == 200
+
+        resp = server.get(f"/api/workspaces/{workspace.name}/queries/by_group")
+        assert resp.status_code == 404
+
+
+def test_run_query_missing_bind_vars(populated_workspace, managed_user, server):
+    """Test that running a saved query without its bind vars fails."""
+    workspace, _, node_table, _ = populated_workspace
+    aql = f"FOR doc IN {node_table} FILTER doc.group == @group RETURN doc"
+
+    with conftest.login(managed_user, server):
+        resp = server.post(
+            f"/api/workspaces/{workspace.name}/queries/by_group", data=aql
+        )
+        assert resp.status_code == 200
+
+        resp = server.post(f"/api/workspaces/{workspace.name}/queries/by_group/run")
+
+    assert resp.status_code == 400
+    assert resp.json == {"missing": ["group"]}
+
+
+def test_save_malformed_query(managed_workspace, managed_user, server):
+    """Test that a malformed query is rejected when it's saved."""
+    with conftest.login(managed_user, server):
+        resp = server.post(
+            f"/api/workspaces/{managed_workspace.name}/queries/malformed",
+            data="FOR members RETURN member",
+        )
+
+        assert resp.status_code == 400
+
+        resp = server.get(f"/api/workspaces/{managed_workspace.name}/queries")
+
+    assert resp.json == []
+
+
+def test_save_expensive_query(populated_workspace, managed_user, server, monkeypatch):
+    """Test that a query estimated to be too expensive can't be saved."""
+    workspace, _, node_table, _ = populated_workspace
+    monkeypatch.setattr(multinet.db, "AQL_MAX_ESTIMATED_COST", 1)
+    aql = f"FOR a IN {node_table} FOR b IN {node_table} RETURN [a, b]"
+
+    with conftest.login(managed_user, server):
+        resp = server.post(f"/api/workspaces/{workspace.name}/queries/pairs", data=aql)
+
+    assert resp.status_code == 400
+    assert resp.json["full_scans"] == [node_table, node_table]
+
+
+def test_run_expensive_query(populated_workspace, managed_user, server, monkeypatch):
+    """Test that a saved query is checked against the cost limits when it's run."""
+    workspace, _, node_table, _ = populated_workspace
+    aql = "FOR a IN @@table FOR b IN @@table RETURN [a, b]"
+
+    with conftest.login(managed_user, server):
+        resp = server.post(f"/api/workspaces/{workspace.name}/queries/pairs", data=aql)
+        assert resp.status_code == 200
+
+        monkeypatch.setattr(multinet.db, "AQL_MAX_ESTIMATED_COST", 1)
+        resp = server.post(
+            f"/api/workspaces/{workspace.name}/queries/pairs/run",
+            json={"@table": node_table},
+        )
+
+    assert resp.status_code == 400
+    assert resp.json["full_scans"] == [node_table, node_table]
@@ -0,0 +1,92 @@
+"""Test the JSON encoding of streamed responses."""
+import json
+import math
+
+import pytest
+
+from multinet import serialization
+from multinet.errors import DependencyMissing
+from multinet.serialization import encode_json_list, get_encoder, stdlib_dumps
+
+VALUES = [
+    {"name": "Valjean", "group": 1, "score": 0.5, "tags": ["a", "é"], "none": None},
+    [1, [2, [3]], {"nested": {"deep": True}}],
+    2**70,
+    "text",
+]
+
+
+@pytest.mark.parametrize("name", sorted(serialization.encoders))
+def test_encoders_agree(name):
+    """Test that each encoder produces the same JSON."""
+    encode = get_encoder(name)
+
+    assert json.loads(encode(VALUES)) == VALUES
+    assert encode(VALUES) == stdlib_dumps(VALUES)
+
+
+@pytest.mark.parametrize("name", sorted(serialization.encoders))
+def test_encoders_replace_non_finite_floats(name):
+    """Test that NaN and infinite floats are encoded as null by every encoder."""
+    encode = get_encoder(name)
+    value = [math.nan, {"a": math.inf, "b": [-math.inf, 1.5]}]
+
+    assert encode(value) == b'[null,{"a":null,"b":[null,1.5]}]'
+
+
+def test_get_encoder_auto(monkeypatch):
+    """Test that orjson is used automatically only when it's installed."""
+    monkeypatch.setattr(serialization, "JSON_ENCODER", "auto")
+
+    monkeypatch.setattr(serialization, "encoders", {"json": stdlib_dumps})
+    assert get_encoder() is stdlib_dumps
+
+    orjson_dumps = serialization.orjson_dumps
+    monkeypatch.setitem(serialization.encoders, "orjson", orjson_dumps)
+    assert get_encoder() is orjson_dumps
+
+
+def test_get_encoder_configured(monkeypatch):
+    """Test that the configured encoder is used, and must be installed."""
+    monkeypatch.setattr(serialization, "JSON_ENCODER", "json")
+    assert get_encoder() is stdlib_dumps
+
+    monkeypatch.setattr(serialization, "encoders", {"json": stdlib_dumps})
+    with pytest.raises(DependencyMissing):
+        get_encoder("orjson")
+
+
+@pytest.mark.parametrize("count", [0, 1, 255, 256, 257, 1000])
+def test_encode_json_list(count, monkeypatch):
+    """Test that the chunks of an encoded list join into the whole list."""
+    monkeypatch.setattr(serialization, "JSON_ENCODE_BATCH_SIZE", 256)
+    rows = [
+        {"row": i, "value": math.nan if i % 7 == 0 else i / 2} for i in range(count)
+    ]
+
+    chunks = list(encode_json_list(iter(rows), stdlib_dumps, buffer_size=1024))
+
+    expected = [
+        {"row": i, "value": None if i % 7 == 0 else i / 2} for i in range(count)
+    ]
+    assert json.loads(b"".join(chunks)) == expected
+    assert all(chunks)
+
+
+def test_encode_json_list_flushes_first_batch(monkeypatch):
+    """Test that the first batch is yielded before more items are read."""
+    monkeypatch.setattr(serialization, "JSON_ENCODE_BATCH_SIZE", 2)
+    read = []
+
+    def rows():
+        for row in range(10):
+            read.append(row)
+            yield row
+
+    chunks = encode_json_list(rows(), stdlib_dumps, buffer_size=1 << 20)
+
+    assert next(chunks) == b"[0,1"
+    assert read == [0, 1]
+
+    # Later batches are collected until the buffer fills, or the list ends
+    assert b"".join(chunks) == b",2,3,4,5,6,7,8,9]"
@@ -0,0 +1,51 @@
+"""Test the utility functions shared by the API endpoints."""
+import itertools
+import threading
+
+import pytest
+
+from multinet.util import prefetch
+
+
+def test_prefetch_yields_items_in_order():
+    """Test that every item is yielded, in order."""
+    assert list(prefetch(range(100), maxsize=3)) == list(range(100))
+
+
+def test_prefetch_raises_producer_errors():
+    """Test that an error raised while reading ahead is raised in the consumer."""
+
+    def produce():
+        yield 1
+        yield 2
+        raise KeyError("broken")
+
+    items = prefetch(produce())
+
+    assert next(items) == 1
+    assert next(items) == 2
+    with pytest.raises(KeyError, match="broken"):
+        next(items)
+
+
+def test_prefetch_stops_when_consumer_quits():
+    """Test that the reader thread stops once the consumer stops reading."""
+    produced = []
+
+    def produce():
+        for item in itertools.count():
+            produced.append(item)
+            yield item
+
+    threads = threading.active_count()
+    items = prefetch(produce(), maxsize=2)
+
+    assert next(items) == 0
+    assert threading.active_count() == threads + 1
+
+    # Closing the generator waits for the reader thread to finish
+    items.close()
+    assert threading.active_count() == threads
+
+    # Only a bounded number of items were read ahead
+    assert len(produced) <= 5
@@ -1,5 +1,9 @@
 """Test that workspace operations act like we expect them to."""
 from uuid import uuid4
+
+import pytest
+
+import conftest
 from multinet.db import workspace_mapping
 from multinet.db.models.workspace import Workspace
 
@@ -95,3 +99,31 @@ def test_workspace_rename(generated_workspace):
 
     assert new_exists
     assert not old_exists
+
+
+@pytest.mark.parametrize(
+    "table_type,expected",
+    [
+        ("all", ["clubs", "members", "membership"]),
+        ("node", ["clubs", "members"]),
+        ("edge", ["membership"]),
+    ],
+)
+def test_workspace_tables_by_type(
+    managed_workspace, managed_user, server, table_type, expected
+):
+    """Test that node and edge tables in one workspace are listed by their type."""
+    managed_workspace.create_table("members", edge=False)
+    managed_workspace.create_table("membership", edge=True)
+    managed_workspace.create_table("clubs", edge=False)
+
+    assert sorted(managed_workspace.tables(table_type)) == expected
+
+    with conftest.login(managed_user, server):
+        resp = server.get(
+            f"/api/workspaces/{managed_workspace.name}/tables",
+            query_string={"type": table_type},
+        )
+
+    assert resp.status_code == 200
+    assert sorted(resp.json) == expected